@@ -0,0 +1,304 @@
+"""
+AI 自对弈擂台：在进程池中让两种 AI 配置对弈 N 局，统计胜率（含置信区间）、平均手数与每步耗时分位数。
+
+用法示例：
+    python arena.py heuristic-hard search-medium -n 200 --seed 1
+    python arena.py --list
+
+两个配置轮流执黑。每局的随机数种子由 --seed 与局序号决定，开局随机落下的几手与
+随机/启发式 AI 的平手选择都来自该种子；搜索类 AI 默认只按深度限制搜索（不看时间），
+因此同一条命令的结果完全可复现。加上 --timed 则按各难度的时间预算搜索，结果随机器负载变化。
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game_engine import Game, ai_move_heuristic, ai_move_random
+from game_record import RecordWriter
+from gomoku_ai import DIFFICULTY_BUDGETS, GRID_SIZE, SearchEngine
+from profiler import percentile
+
+# 不限时搜索时使用的“时间预算”（毫秒），实际上只受深度限制
+UNLIMITED_MS = 10**9
+
+# 不限时搜索时各难度的固定深度，以及威胁求解的节点上限
+DETERMINISTIC_DEPTHS = {"Common": 2, "Medium": 3, "Hard": 4}
+DETERMINISTIC_THREAT_NODES = 200
+
+# 不限时的 MCTS 各难度每步的模拟局数
+DETERMINISTIC_PLAYOUTS = {"Common": 2048, "Medium": 8192, "Hard": 32768}
+
+
+class RandomPlayer:
+    """“测试”难度：完全随机落子"""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self, game):
+        return ai_move_random(game.board, self.rng)
+
+
+class HeuristicPlayer:
+    """原 Common/Medium/Hard 的一层启发式：按进攻/防守权重贪心落子"""
+
+    def __init__(self, rng, attack_factor, defend_factor):
+        self.rng = rng
+        self.attack_factor = attack_factor
+        self.defend_factor = defend_factor
+
+    def choose(self, game):
+        return ai_move_heuristic(
+            game.board,
+            game.current_player,
+            self.attack_factor,
+            self.defend_factor,
+            self.rng,
+        )
+
+
+class SearchPlayer:
+    """alpha-beta 搜索引擎；timed=False 时只按深度限制，保证结果可复现"""
+
+    def __init__(self, rng, difficulty, timed=False):
+        budget = DIFFICULTY_BUDGETS[difficulty]
+        self.engine = SearchEngine(
+            time_ms=budget["time_ms"] if timed else UNLIMITED_MS,
+            max_depth=(
+                budget["max_depth"] if timed else DETERMINISTIC_DEPTHS[difficulty]
+            ),
+        )
+        if not timed and self.engine.threat_solver is not None:
+            # 威胁求解只受节点数限制
+            self.engine.threat_solver.time_ms = UNLIMITED_MS
+            self.engine.threat_solver.max_nodes = DETERMINISTIC_THREAT_NODES
+
+    def choose(self, game):
+        result = self.engine.search(
+            game.board,
+            game.evaluator,
+            game.candidates,
+            game.current_player,
+            game.zobrist,
+            game.shapes,
+        )
+        return result.move
+
+
+class MCTSPlayer(SearchPlayer):
+    """蒙特卡洛树搜索（需要 numpy）；timed=False 时按固定的模拟局数，随机数种子取自 rng"""
+
+    def __init__(self, rng, difficulty, timed=False):
+        from mcts import MCTSEngine
+
+        budget = DIFFICULTY_BUDGETS[difficulty]
+        self.engine = MCTSEngine(
+            time_ms=budget["time_ms"] if timed else UNLIMITED_MS,
+            max_playouts=None if timed else DETERMINISTIC_PLAYOUTS[difficulty],
+            seed=rng.getrandbits(64),
+        )
+        if not timed and self.engine.threat_solver is not None:
+            self.engine.threat_solver.time_ms = UNLIMITED_MS
+            self.engine.threat_solver.max_nodes = DETERMINISTIC_THREAT_NODES
+
+
+# 配置名 -> 创建 AI 的函数 (rng, timed) -> player
+AI_CONFIGS = {
+    "测试": lambda rng, timed: RandomPlayer(rng),
+    "random": lambda rng, timed: RandomPlayer(rng),
+    "heuristic-common": lambda rng, timed: HeuristicPlayer(rng, 1.0, 1.1),
+    "heuristic-medium": lambda rng, timed: HeuristicPlayer(rng, 1.5, 1.2),
+    "heuristic-hard": lambda rng, timed: HeuristicPlayer(rng, 2.0, 1.3),
+    "search-common": lambda rng, timed: SearchPlayer(rng, "Common", timed),
+    "search-medium": lambda rng, timed: SearchPlayer(rng, "Medium", timed),
+    "search-hard": lambda rng, timed: SearchPlayer(rng, "Hard", timed),
+    "mcts-common": lambda rng, timed: MCTSPlayer(rng, "Common", timed),
+    "mcts-medium": lambda rng, timed: MCTSPlayer(rng, "Medium", timed),
+    "mcts-hard": lambda rng, timed: MCTSPlayer(rng, "Hard", timed),
+}
+
+
+def game_seed(seed, index):
+    """由总种子与局序号得到每局的种子，与进程调度顺序无关"""
+    return seed * 1000003 + index
+
+
+def random_opening(game, rng, moves):
+    """在天元附近随机落下 moves 手作为开局，避免确定性 AI 之间每局都一样"""
+    center = GRID_SIZE // 2
+    for _ in range(moves):
+        while True:
+            x = center + rng.randint(-2, 2)
+            y = center + rng.randint(-2, 2)
+            if game.is_legal(x, y):
+                game.place(x, y)
+                break
+
+
+def play_game(task):
+    """
+    在工作进程中下一局。task 为 (局序号, 配置A, 配置B, 种子, 开局手数, 最大手数, 是否限时)，
+    局序号为偶数时 A 执黑。返回 {"winner": "A"/"B"/None, "moves": 手数, "latency": {"A": [...], "B": [...]},
+    "record": (落子列表, 胜者 1/2/None, 是否结束, 开始时间, 用时毫秒)}
+    """
+    index, config_a, config_b, seed, opening, max_moves, timed = task
+    rng = random.Random(game_seed(seed, index))
+    sides = {1: "A", 2: "B"} if index % 2 == 0 else {1: "B", 2: "A"}
+    configs = {"A": config_a, "B": config_b}
+    players = {
+        side: AI_CONFIGS[configs[side]](random.Random(rng.getrandbits(64)), timed)
+        for side in ("A", "B")
+    }
+    latency = {"A": [], "B": []}
+
+    game = Game(seed=rng.getrandbits(64))
+    started = time.perf_counter()
+    random_opening(game, rng, opening)
+    while not game.ended and len(game.history) < max_moves:
+        side = sides[game.current_player]
+        start = time.perf_counter()
+        move = players[side].choose(game)
+        latency[side].append(time.perf_counter() - start)
+        if move is None:
+            break
+        game.place(*move)
+
+    winner = sides[game.winner] if game.winner is not None else None
+    record = (
+        game.moves,
+        game.winner,
+        game.ended,
+        game.start_time,
+        (time.perf_counter() - started) * 1000,
+    )
+    return {
+        "winner": winner,
+        "moves": len(game.history),
+        "latency": latency,
+        "record": record,
+    }
+
+
+def wilson_interval(successes, total, z=1.96):
+    """胜率的 Wilson 置信区间（默认 95%）"""
+    if total == 0:
+        return 0.0, 1.0
+    p = successes / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    half = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def run_arena(
+    config_a,
+    config_b,
+    games,
+    seed=0,
+    workers=None,
+    opening=2,
+    max_moves=GRID_SIZE * GRID_SIZE,
+    timed=False,
+    record=None,
+):
+    """跑完全部对局并汇总结果；结果与 workers 数量无关。record 为对局记录文件路径（追加写入）"""
+    tasks = [
+        (i, config_a, config_b, seed, opening, max_moves, timed) for i in range(games)
+    ]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [play_game(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(play_game, tasks))
+
+    if record:
+        with RecordWriter(record, GRID_SIZE) as writer:
+            for r in results:
+                moves, winner, ended, start, duration = r["record"]
+                writer.write(moves, winner, ended, start=start, duration_ms=duration)
+
+    wins_a = sum(1 for r in results if r["winner"] == "A")
+    wins_b = sum(1 for r in results if r["winner"] == "B")
+    draws = games - wins_a - wins_b
+    # 和棋按半局计
+    score_a = wins_a + draws / 2
+    low, high = wilson_interval(score_a, games)
+    latency = {
+        side: [t for r in results for t in r["latency"][side]] for side in ("A", "B")
+    }
+    return {
+        "games": games,
+        "wins_a": wins_a,
+        "wins_b": wins_b,
+        "draws": draws,
+        "score_a": score_a / games if games else 0.0,
+        "interval": (low, high),
+        "avg_moves": sum(r["moves"] for r in results) / games if games else 0.0,
+        "latency": latency,
+    }
+
+
+def print_report(config_a, config_b, summary):
+    games = summary["games"]
+    low, high = summary["interval"]
+    print(f"{config_a} (A) vs {config_b} (B)，共 {games} 局")
+    print(f"A 胜 {summary['wins_a']}  B 胜 {summary['wins_b']}  和 {summary['draws']}")
+    print(f"A 得分率 {summary['score_a']:.1%}  95% 置信区间 [{low:.1%}, {high:.1%}]")
+    print(f"平均手数 {summary['avg_moves']:.1f}")
+    for side, name in (("A", config_a), ("B", config_b)):
+        values = summary["latency"][side]
+        p50, p90, p99 = (percentile(values, q) * 1000 for q in (50, 90, 99))
+        print(
+            f"{side} {name} 每步耗时(ms)：p50 {p50:.1f}  p90 {p90:.1f}  p99 {p99:.1f}"
+            f"  共 {len(values)} 步"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋 AI 自对弈擂台")
+    parser.add_argument("config_a", nargs="?", help="AI 配置 A")
+    parser.add_argument("config_b", nargs="?", help="AI 配置 B")
+    parser.add_argument("-n", "--games", type=int, default=100, help="对局数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="进程数，默认使用全部核心"
+    )
+    parser.add_argument("--opening", type=int, default=2, help="随机开局手数")
+    parser.add_argument(
+        "--max-moves", type=int, default=GRID_SIZE * GRID_SIZE, help="每局最多手数"
+    )
+    parser.add_argument(
+        "--timed", action="store_true", help="搜索类 AI 按时间预算搜索（结果不可复现）"
+    )
+    parser.add_argument("--record", help="把全部对局追加写入该对局记录文件（.gmk）")
+    parser.add_argument("--list", action="store_true", help="列出可用的 AI 配置")
+    args = parser.parse_args(argv)
+
+    if args.list or not (args.config_a and args.config_b):
+        print("可用的 AI 配置：" + "  ".join(AI_CONFIGS))
+        return
+    for name in (args.config_a, args.config_b):
+        if name not in AI_CONFIGS:
+            parser.error(f"未知的 AI 配置: {name}")
+
+    summary = run_arena(
+        args.config_a,
+        args.config_b,
+        args.games,
+        seed=args.seed,
+        workers=args.workers,
+        opening=args.opening,
+        max_moves=args.max_moves,
+        timed=args.timed,
+        record=args.record,
+    )
+    print_report(args.config_a, args.config_b, summary)
+
+
+if __name__ == "__main__":
+    main()
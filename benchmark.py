@@ -0,0 +1,533 @@
+"""
+AI 与胜负判定热点函数的基准测试，无界面运行。
+
+在一组固定局面（开局、约 40 子的中盘、棋子密集的残局）上分别测量各函数的单次耗时与
+内存峰值，并与保存的基准文件比较，任何一项变慢或内存增长超过容差时以非零状态退出，
+可以直接作为 CI 的一步。
+
+耗时与机器有关，因此每一项前后都测一段固定的纯 Python 校准循环，耗时换算成
+校准循环耗时的倍数再保存与比较，换一台更快或更慢的机器不会整体超出容差；
+超出容差的项会重测（--retries），排除偶发的机器负载。
+
+--verify 不计时，只在随机局面上核对各项优化与原始实现的结果一致、对局记录读写往返无损（见 CHECKS），
+有不一致时同样以非零状态退出。
+
+用法示例：
+    python benchmark.py                 # 与 benchmark_baseline.json 比较
+    python benchmark.py --save          # 重新生成基准文件
+    python benchmark.py --only heuristic_score --tolerance 0.5
+    python benchmark.py --verify --seed 1
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from game_engine import DIFFICULTIES, ai_move_heuristic
+from game_record import RecordWriter, read_records, result_code
+from gomoku_ai import (
+    GRID_SIZE,
+    CandidateGenerator,
+    PatternEvaluator,
+    SearchEngine,
+    check_winner,
+    check_winner_at,
+    heuristic_score,
+)
+from line_patterns import LineShapes
+
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"
+)
+
+# 局面名 -> (种子, 棋子数, 落子范围距天元的最大格数)
+POSITIONS = {
+    "opening": (1, 6, 3),
+    "midgame": (2, 40, 6),
+    "lategame": (3, 300, GRID_SIZE),
+}
+
+
+def make_position(seed, stones, spread):
+    """
+    由种子生成一个固定局面：黑白交替在天元附近随机落子，跳过会形成五连的落点，
+    保证局面上还没有分出胜负
+    """
+    rng = random.Random(seed)
+    board = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+    center = GRID_SIZE // 2
+    low = max(0, center - spread)
+    high = min(GRID_SIZE - 1, center + spread)
+    player = 1
+    placed = 0
+    while placed < stones:
+        x = rng.randint(low, high)
+        y = rng.randint(low, high)
+        if board[x][y] != 0:
+            continue
+        board[x][y] = player
+        if check_winner_at(board, x, y, player):
+            board[x][y] = 0
+            continue
+        placed += 1
+        player = 3 - player
+    return board
+
+
+def _search(board):
+    """固定深度（不限时）的一次完整搜索"""
+    engine = SearchEngine(time_ms=10**9, max_depth=2, use_threats=False, use_book=False)
+    return engine.search(
+        board, PatternEvaluator(board), CandidateGenerator(board), 1
+    ).move
+
+
+# --save 时运行的轮数
+SAVE_ROUNDS = 3
+
+# 函数名 -> 以局面为参数的被测调用
+BENCHMARKS = {
+    "check_winner": lambda board: check_winner(board, 1),
+    "heuristic_score": lambda board: heuristic_score(board, 1),
+    "ai_move_heuristic": lambda board: ai_move_heuristic(
+        board, 2, rng=random.Random(0)
+    ),
+    "PatternEvaluator": PatternEvaluator,
+    "CandidateGenerator.moves": lambda board: CandidateGenerator(board).moves(),
+    "LineShapes": LineShapes,
+    "SearchEngine.search": _search,
+}
+
+
+def calibration_loop(_board=None):
+    """校准用的固定工作量：与被测函数相近的纯 Python 循环、列表下标、整数位运算与函数调用"""
+    data = list(range(256))
+    get = data.__getitem__
+    total = 0
+    for i in range(20000):
+        total += get(i & 255) ^ (data[(i >> 3) & 255] << 1)
+    return total
+
+
+def calibrate(min_time=0.1):
+    """校准循环的单次耗时（微秒），作为本机耗时的单位"""
+    return measure(calibration_loop, None, min_time)[0]
+
+
+def measure_relative(func, board, min_time=0.2):
+    """
+    返回 (耗时 / 校准循环耗时, 单次耗时微秒, 内存峰值字节)。
+    校准循环紧挨着被测函数前后各测一次取较快的一次，机器负载的变化对两者的影响相近
+    """
+    unit = calibrate(min_time / 2)
+    us, peak = measure(func, board, min_time)
+    unit = min(unit, calibrate(min_time / 2))
+    return us / unit, us, peak
+
+
+def random_board(rng, max_stones=300):
+    """随机局面：在随机大小的区域内交替落下随机数量的棋子，可能已有五连"""
+    board = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+    center = GRID_SIZE // 2
+    spread = rng.randint(2, center)
+    stones = rng.randint(0, min(max_stones, (2 * spread + 1) ** 2))
+    player = 1
+    for _ in range(stones):
+        x = rng.randint(center - spread, center + spread)
+        y = rng.randint(center - spread, center + spread)
+        if board[x][y] == 0:
+            board[x][y] = player
+            player = 3 - player
+    return board
+
+
+def check_pattern_evaluator(rng, boards):
+    """PatternEvaluator 的分数与增量 delta/place/remove 都与 heuristic_score 全盘扫描一致"""
+    failures = []
+    for n in range(boards):
+        board = random_board(rng)
+        evaluator = PatternEvaluator(board)
+        for player in (1, 2):
+            if evaluator.score(player) != heuristic_score(board, player):
+                failures.append(f"局面 {n}: player {player} 的初始分数不一致")
+        empty = [
+            (x, y)
+            for x in range(GRID_SIZE)
+            for y in range(GRID_SIZE)
+            if board[x][y] == 0
+        ]
+        placed = []
+        for x, y in rng.sample(empty, min(20, len(empty))):
+            player = rng.randint(1, 2)
+            expected = evaluator.score(player) + evaluator.delta(x, y, player)
+            board[x][y] = player
+            evaluator.place(x, y, player)
+            placed.append((x, y, player))
+            if evaluator.score(player) != expected or expected != heuristic_score(
+                board, player
+            ):
+                failures.append(f"局面 {n}: 在 ({x}, {y}) 落子后的分数不一致")
+        for x, y, player in reversed(placed):
+            board[x][y] = 0
+            evaluator.remove(x, y, player)
+        for player in (1, 2):
+            if evaluator.score(player) != heuristic_score(board, player):
+                failures.append(f"局面 {n}: player {player} 撤销落子后的分数不一致")
+    return failures
+
+
+# 原始实现中每颗棋子向前数到的连子长度 -> 分值
+_REFERENCE_SCORES = {2: 10, 3: 100, 4: 1000, 5: 100000}
+
+
+def reference_check_winner(board, player):
+    """原始的逐格扫描：是否有五连"""
+    for x in range(GRID_SIZE):
+        for y in range(GRID_SIZE):
+            if board[x][y] != player:
+                continue
+            for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                if all(
+                    0 <= x + k * dx < GRID_SIZE
+                    and 0 <= y + k * dy < GRID_SIZE
+                    and board[x + k * dx][y + k * dy] == player
+                    for k in range(5)
+                ):
+                    return True
+    return False
+
+
+def reference_heuristic_score(board, player):
+    """原始的逐格扫描：每颗棋子沿四个方向向前最多数 5 颗"""
+    score = 0
+    for x in range(GRID_SIZE):
+        for y in range(GRID_SIZE):
+            if board[x][y] != player:
+                continue
+            for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                count = 1
+                while (
+                    count < 5
+                    and 0 <= x + count * dx < GRID_SIZE
+                    and 0 <= y + count * dy < GRID_SIZE
+                    and board[x + count * dx][y + count * dy] == player
+                ):
+                    count += 1
+                score += _REFERENCE_SCORES.get(count, 0)
+    return score
+
+
+def reference_candidates(board, radius):
+    """原始的逐格扫描：与任意棋子横竖斜距离不超过 radius 的空位"""
+    return [
+        (x, y)
+        for x in range(GRID_SIZE)
+        for y in range(GRID_SIZE)
+        if board[x][y] == 0
+        and any(
+            board[nx][ny]
+            for nx in range(max(0, x - radius), min(GRID_SIZE, x + radius + 1))
+            for ny in range(max(0, y - radius), min(GRID_SIZE, y + radius + 1))
+        )
+    ]
+
+
+def check_bitboard(rng, boards):
+    """
+    位棋盘实现的 check_winner、heuristic_score 与 CandidateGenerator 都与原始的逐格扫描一致；
+    安装了 numpy 时，numpy_board 的向量化实现也一并核对
+    """
+    try:
+        import numpy_board
+    except ImportError:
+        numpy_board = None
+    failures = []
+    for n in range(boards):
+        board = random_board(rng)
+        for player in (1, 2):
+            expected = (
+                reference_check_winner(board, player),
+                reference_heuristic_score(board, player),
+            )
+            actual = (check_winner(board, player), heuristic_score(board, player))
+            if actual != expected:
+                failures.append(f"局面 {n}: player {player} 的位棋盘结果不一致")
+            if numpy_board is not None:
+                array = numpy_board.to_array(board)
+                if (
+                    check_winner(array, player),
+                    heuristic_score(array, player),
+                ) != expected:
+                    failures.append(f"局面 {n}: player {player} 的 numpy 结果不一致")
+        candidates = CandidateGenerator(board)
+        if candidates.moves() != reference_candidates(board, candidates.radius):
+            failures.append(f"局面 {n}: 候选点不一致")
+        # 增量落子/撤销后候选点仍与重新扫描一致
+        for _ in range(10):
+            x, y = rng.randrange(GRID_SIZE), rng.randrange(GRID_SIZE)
+            if board[x][y]:
+                board[x][y] = 0
+                candidates.remove(x, y)
+            else:
+                board[x][y] = rng.randint(1, 2)
+                candidates.place(x, y)
+        if candidates.moves() != reference_candidates(board, candidates.radius):
+            failures.append(f"局面 {n}: 增量更新后的候选点不一致")
+    if numpy_board is None:
+        print("    （未安装 numpy，跳过 numpy_board 的核对）")
+    return failures
+
+
+def random_game(rng):
+    """随机的落子序列：大多落在上一手附近，偶尔跳到远处（对应记录中的两字节编码）"""
+    cells = [(x, y) for x in range(GRID_SIZE) for y in range(GRID_SIZE)]
+    rng.shuffle(cells)
+    moves = []
+    seen = set()
+    x = y = GRID_SIZE // 2
+    for _ in range(rng.randint(0, 200)):
+        if rng.random() < 0.9:
+            x = min(GRID_SIZE - 1, max(0, x + rng.randint(-3, 3)))
+            y = min(GRID_SIZE - 1, max(0, y + rng.randint(-3, 3)))
+        else:
+            x, y = cells.pop()
+        if (x, y) not in seen:
+            seen.add((x, y))
+            moves.append((x, y))
+    return moves
+
+
+def check_game_record(rng, games):
+    """随机对局写入 .gmk 文件（分两次追加）后逐局读回，落子与头部各字段都与写入时一致"""
+    written = []
+    for _ in range(games):
+        winner = rng.choice([1, 2, None])
+        ended = winner is not None or rng.random() < 0.5
+        written.append(
+            (
+                random_game(rng),
+                winner,
+                ended,
+                rng.choice(DIFFICULTIES + [None]),
+                rng.randint(0, 2**32 - 1),
+                rng.randint(0, 2**32 - 1),
+            )
+        )
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "verify.gmk")
+        half = games // 2
+        for part in (written[:half], written[half:]):
+            with RecordWriter(path, GRID_SIZE) as writer:
+                for moves, winner, ended, difficulty, start, duration in part:
+                    writer.write(moves, winner, ended, difficulty, start, duration)
+        records = list(read_records(path))
+    if len(records) != len(written):
+        return [f"写入 {len(written)} 局，读回 {len(records)} 局"]
+    for n, (record, game) in enumerate(zip(records, written)):
+        moves, winner, ended, difficulty, start, duration = game
+        expected = (moves, result_code(winner, ended), difficulty, start, duration)
+        if tuple(record) != expected:
+            failures.append(f"第 {n} 局读回的记录不一致")
+    return failures
+
+
+# 校验名 -> (rng, 局面数) -> 不一致的说明列表
+CHECKS = {
+    "PatternEvaluator": check_pattern_evaluator,
+    "bitboard": check_bitboard,
+    "game_record": check_game_record,
+}
+
+
+def verify(seed=0, boards=100):
+    """运行全部校验，返回不一致的项数"""
+    failed = 0
+    for name, check in CHECKS.items():
+        failures = check(random.Random(seed), boards)
+        if failures:
+            failed += 1
+            print(f"{name:24} 不一致 {len(failures)} 处")
+            for line in failures[:10]:
+                print(f"    {line}")
+        else:
+            print(f"{name:24} 一致（{boards} 个随机样本）")
+    return failed
+
+
+def measure(func, board, min_time=0.2, repeat=5):
+    """
+    返回 (单次耗时微秒, 内存峰值字节)。
+    耗时取 repeat 轮中最快一轮的平均值，每轮至少运行 min_time / repeat 秒；
+    内存峰值用 tracemalloc 单独测一次，不影响计时。
+    """
+    # 估计每轮需要的调用次数
+    start = time.perf_counter()
+    func(board)
+    once = max(time.perf_counter() - start, 1e-7)
+    number = max(1, int(min_time / repeat / once))
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(board)
+        best = min(best, (time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    func(board)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1e6, peak
+
+
+def run_benchmarks(only=None, min_time=0.2, keys=None):
+    """
+    运行全部（或 only 中列出的函数、keys 中列出的项）基准，返回
+    {"函数/局面": {"us": ..., "relative": 耗时 / 校准循环耗时, "peak_bytes": ...}}
+    """
+    results = {}
+    boards = {name: make_position(*args) for name, args in POSITIONS.items()}
+    for func_name, func in BENCHMARKS.items():
+        if only and func_name not in only:
+            continue
+        for position, board in boards.items():
+            key = f"{func_name}/{position}"
+            if keys is not None and key not in keys:
+                continue
+            relative, us, peak = measure_relative(func, board, min_time)
+            results[key] = {
+                "us": round(us, 2),
+                "relative": round(relative, 4),
+                "peak_bytes": peak,
+            }
+    return results
+
+
+def median_results(rounds):
+    """多轮 run_benchmarks 的结果按项取相对耗时的中位数"""
+    merged = {}
+    for key in rounds[0]:
+        values = sorted((r[key] for r in rounds), key=lambda v: v["relative"])
+        merged[key] = values[len(values) // 2]
+    return merged
+
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """与基准比较（按相对校准循环的耗时），返回 (报告行列表, 超出容差的项)"""
+    lines = []
+    regressions = []
+    for key, current in results.items():
+        old = baseline.get(key)
+        if old is None or "relative" not in old:
+            lines.append(f"{key:42} {current['us']:>10.1f}us  (基准中没有)")
+            continue
+        ratio = current["relative"] / old["relative"] if old["relative"] else 1.0
+        mem_ratio = (
+            current["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else 1.0
+        )
+        flags = []
+        if ratio > 1 + tolerance:
+            flags.append("变慢")
+        if mem_ratio > 1 + memory_tolerance:
+            flags.append("内存增长")
+        if flags:
+            regressions.append(key)
+        lines.append(
+            f"{key:42} {current['us']:>10.1f}us  x{ratio:4.2f}"
+            f"  {current['peak_bytes']:>9}B  x{mem_ratio:4.2f}  {' '.join(flags)}"
+        )
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋 AI 热点函数基准测试")
+    parser.add_argument("--save", action="store_true", help="把本次结果写入基准文件")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基准文件路径")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.3, help="允许的耗时增长比例，默认 0.3"
+    )
+    parser.add_argument(
+        "--memory-tolerance", type=float, default=0.1, help="允许的内存峰值增长比例"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="每项至少测量的秒数"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=2, help="超出容差的项最多重测几次"
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), help="只运行指定的函数"
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="不计时，只校验优化后的实现与原始实现一致"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="--verify 的随机数种子")
+    parser.add_argument(
+        "--boards", type=int, default=100, help="--verify 每项校验的随机局面（或对局）数"
+    )
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        failed = verify(args.seed, args.boards)
+        if failed:
+            print(f"{failed} 项校验不一致")
+            return 1
+        print("全部校验一致")
+        return 0
+
+    if args.save:
+        # 基准取多轮的中位数，避免把某一次偶然偏快的结果当作基准
+        results = median_results(
+            [run_benchmarks(args.only, args.min_time) for _ in range(SAVE_ROUNDS)]
+        )
+        # 只运行了部分函数时保留基准文件中的其他项
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                saved = json.load(f)
+        saved.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write("\n")
+        for key, current in results.items():
+            print(f"{key:42} {current['us']:>10.1f}us  {current['peak_bytes']:>9}B")
+        print(f"基准已保存到 {args.baseline}")
+        return 0
+
+    results = run_benchmarks(args.only, args.min_time)
+
+    if not os.path.exists(args.baseline):
+        print(f"找不到基准文件 {args.baseline}，请先运行 python benchmark.py --save")
+        return 2
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    lines, regressions = compare(
+        results, baseline, args.tolerance, args.memory_tolerance
+    )
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        # 重测超出容差的项，保留较快的一次
+        rerun = run_benchmarks(keys=regressions, min_time=args.min_time)
+        for key, value in rerun.items():
+            if value["relative"] < results[key]["relative"]:
+                results[key] = value
+        lines, regressions = compare(
+            results, baseline, args.tolerance, args.memory_tolerance
+        )
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} 项超过容差")
+        return 1
+    print("全部在容差范围内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
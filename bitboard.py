@@ -0,0 +1,104 @@
+"""
+位棋盘：每方棋子用一个 Python 大整数表示，第 x * STRIDE + y 位对应 board[x][y]。
+
+每行末尾留一个恒为 0 的隔离位（STRIDE = SIZE + 1），因此沿横、竖、两条斜线移动一格
+分别对应右移 1、STRIDE、STRIDE + 1、STRIDE - 1 位，越过棋盘边缘时总是落在隔离位或棋盘之外，
+五连、连子统计与邻域扩张都变成整数的移位与按位与，不再逐格访问二维列表。
+"""
+
+# 棋盘边长，与 gomoku_ai.GRID_SIZE 保持一致
+SIZE = 25
+STRIDE = SIZE + 1
+
+# 四个方向 (1, 0)、(0, 1)、(1, 1)、(1, -1) 上前进一格对应的位移，与 heuristic_score 一致
+SHIFTS = (STRIDE, 1, STRIDE + 1, STRIDE - 1)
+
+# 棋盘上全部有效格子（不含隔离位）
+BOARD_MASK = sum(((1 << SIZE) - 1) << (x * STRIDE) for x in range(SIZE))
+
+# 位序号 -> (x, y)，隔离位也有对应项，但不会出现在有效的掩码中
+CELLS = [divmod(index, STRIDE) for index in range(SIZE * STRIDE)]
+
+# 把 bytes(棋盘一行) 中的 0/1/2 分别翻译成某一方的 "0"/"1"，用于 from_board
+_BLACK_DIGITS = bytes.maketrans(b"\x00\x01\x02", b"010")
+_WHITE_DIGITS = bytes.maketrans(b"\x00\x01\x02", b"001")
+
+# 连子长度 -> 分值，与 gomoku_ai.RUN_SCORES 保持一致
+RUN_SCORES = {2: 10, 3: 100, 4: 1000, 5: 100000}
+
+
+def bit(x, y):
+    """(x, y) 对应的单个位"""
+    return 1 << (x * STRIDE + y)
+
+
+def from_board(board):
+    """
+    把列表棋盘转换成 [0, 黑棋位棋盘, 白棋位棋盘]，可以直接用 player 作下标。
+    各行之间插入一个 0 作为隔离位，整盘翻转后按二进制串解析，逐格的循环都在 C 中完成。
+    """
+    digits = b"\x00".join(map(bytes, board))[::-1]
+    return [
+        0,
+        int(digits.translate(_BLACK_DIGITS), 2),
+        int(digits.translate(_WHITE_DIGITS), 2),
+    ]
+
+
+def has_five(mask):
+    """是否存在五连珠"""
+    for shift in SHIFTS:
+        pairs = mask & (mask >> shift)
+        fours = pairs & (pairs >> (2 * shift))
+        if fours & (mask >> (4 * shift)):
+            return True
+    return False
+
+
+def pattern_score(mask):
+    """
+    与 heuristic_score 等价的评分：每颗棋子沿各方向向前数连续棋子（最多数到 5），
+    数到 2/3/4/5 分别计 10/100/1000/100000 分。“向前至少 k 颗”的起点集合逐次按位与得到，
+    恰好为 k 颗的数量即相邻两个集合的位数之差。
+    """
+    score = 0
+    for shift in SHIFTS:
+        current = mask
+        counts = []
+        for k in range(1, 5):
+            current &= mask >> (k * shift)
+            counts.append(current.bit_count())
+            if not current:
+                break
+        counts += [0] * (4 - len(counts))
+        # counts[k - 2]：向前至少 k 颗（k = 2..5）的棋子数
+        for length in range(2, 5):
+            exact = counts[length - 2] - counts[length - 1]
+            score += RUN_SCORES[length] * exact
+        score += RUN_SCORES[5] * counts[3]
+    return score
+
+
+def neighbourhood(mask, radius):
+    """与 mask 中任一棋子横竖斜距离都不超过 radius 的格子（含棋子自身）"""
+    # 先沿 y 方向扩张，每次只移一位并去掉隔离位，避免串到相邻一行
+    spread = mask
+    for _ in range(radius):
+        spread |= ((spread << 1) | (spread >> 1)) & BOARD_MASK
+    # 再沿 x 方向扩张
+    result = spread
+    for _ in range(radius):
+        result |= (result << STRIDE) | (result >> STRIDE)
+    return result & BOARD_MASK
+
+
+def cells(mask):
+    """mask 中所有格子的 (x, y) 列表，按 (x, y) 升序"""
+    # 低位在前的二进制串，逐个查找 "1"
+    digits = bin(mask)[:1:-1]
+    result = []
+    index = digits.find("1")
+    while index >= 0:
+        result.append(CELLS[index])
+        index = digits.find("1", index + 1)
+    return result
@@ -0,0 +1,232 @@
+"""
+无界面的五子棋对局引擎。
+
+Game 保存一局的全部状态（棋盘、轮到谁、走棋记录、胜负），提供落子、悔棋/重做、跳转、判胜与 AI 落子接口，
+不依赖 pygame，可以直接导入用于对弈脚本、自对弈与基准测试；pygame 界面只是它的一层外壳。
+"""
+
+import random
+import time
+
+from gomoku_ai import (
+    DIFFICULTY_BUDGETS,
+    GRID_SIZE,
+    CandidateGenerator,
+    PatternEvaluator,
+    Position,
+    SearchEngine,
+    check_winner_at,
+)
+
+# 难度列表（含新难度）
+DIFFICULTIES = ["测试", "Common", "Medium", "Hard"]
+
+BLACK_PLAYER = 1  # 黑棋先行
+WHITE_PLAYER = 2
+
+
+class Game:
+    """
+    一局五子棋的状态。board[x][y] 取值 0=空，1=黑棋，2=白棋；
+    history 为 {"player": ..., "move": (x, y)} 的列表，与界面显示的对局记录一致；
+    redo_stack 保存悔掉的棋（最近悔掉的在末尾），重做或跳转时按原样落回。
+    :param engine: 搜索引擎，默认为单进程的 SearchEngine；
+        多进程并行搜索需显式传入（如 parallel_search.make_engine(difficulty, workers)）
+    """
+
+    def __init__(self, difficulty="Common", seed=None, engine=None):
+        self.difficulty = difficulty
+        self.rng = random.Random(seed)
+        # 搜索引擎在整局中复用，置换表里的结果可以留给后面几步
+        self.engine = engine if engine is not None else SearchEngine()
+        self.reset()
+
+    def reset(self):
+        """清空棋盘与记录，保留难度与搜索引擎"""
+        self.board = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+        # 评分表、候选点、哈希与棋型编码随棋盘增量维护，悔棋/重做每步只需 make/unmake 一次
+        self.position = Position(self.board)
+        self.evaluator = self.position.evaluator
+        self.candidates = self.position.candidates
+        self.zobrist = self.position.zobrist
+        self.shapes = self.position.shapes
+        self.current_player = BLACK_PLAYER
+        self.history = []
+        self.redo_stack = []
+        self.winner = None
+        self.ended = False
+        self.start_time = time.time()
+
+    def copy(self):
+        """复制当前局面（共用搜索引擎与随机数生成器），供后台线程在副本上计算"""
+        other = Game(self.difficulty, engine=self.engine)
+        other.rng = self.rng
+        for entry in self.history:
+            other.place(*entry["move"])
+        other.winner = self.winner
+        other.ended = self.ended
+        return other
+
+    @property
+    def moves(self):
+        """按顺序的落子 [(x, y), ...]，黑棋先行"""
+        return [entry["move"] for entry in self.history]
+
+    @property
+    def line(self):
+        """当前分支的全部记录：已下的 history 加上可以重做的棋，按手数顺序"""
+        return self.history + self.redo_stack[::-1]
+
+    @property
+    def last_move(self):
+        """最后一手的 (x, y)，还没有落子时为 None"""
+        return self.history[-1]["move"] if self.history else None
+
+    def is_legal(self, x, y):
+        return (
+            not self.ended
+            and 0 <= x < GRID_SIZE
+            and 0 <= y < GRID_SIZE
+            and self.board[x][y] == 0
+        )
+
+    def place(self, x, y):
+        """
+        当前玩家在 (x, y) 落子，并更新胜负与轮次；返回该手是否获胜。
+        与可重做的下一手相同时保留后面的记录，否则清空重做记录。
+        非法落子抛出 ValueError。
+        """
+        if not self.is_legal(x, y):
+            raise ValueError(f"非法落子: ({x}, {y})")
+        player = self.current_player
+        self.position.make(x, y, player)
+        entry = {"player": player, "move": (x, y)}
+        if self.redo_stack and self.redo_stack[-1] == entry:
+            self.redo_stack.pop()
+        else:
+            self.redo_stack.clear()
+        self.history.append(entry)
+
+        if check_winner_at(self.board, x, y, player):
+            self.winner = player
+            self.ended = True
+        elif len(self.history) == GRID_SIZE * GRID_SIZE:
+            self.ended = True  # 棋盘下满，和棋
+        else:
+            self.current_player = 3 - player
+        return self.winner == player
+
+    def undo(self):
+        """撤销最后一手（可用 redo 恢复），返回被撤销的 (x, y)；没有可撤销的棋时返回 None"""
+        if not self.history:
+            return None
+        entry = self.history.pop()
+        self.redo_stack.append(entry)
+        player = entry["player"]
+        x, y = entry["move"]
+        self.position.unmake(x, y, player)
+        self.current_player = player
+        self.winner = None
+        self.ended = False
+        return (x, y)
+
+    def redo(self):
+        """重新落下最近悔掉的一手，返回其 (x, y)；没有可重做的棋或对局已结束（如认输）时返回 None"""
+        if not self.redo_stack or self.ended:
+            return None
+        move = self.redo_stack[-1]["move"]
+        self.place(*move)
+        return move
+
+    def jump_to(self, ply):
+        """
+        跳到当前分支的第 ply 手之后（0 为空棋盘），超出范围时取最近的一端；
+        逐手悔棋或重做，每手只做一次增量更新
+        """
+        ply = max(0, min(ply, len(self.history) + len(self.redo_stack)))
+        while len(self.history) > ply:
+            self.undo()
+        while len(self.history) < ply and self.redo() is not None:
+            pass
+
+    def resign(self, player):
+        """player 认输，对方获胜"""
+        self.winner = 3 - player
+        self.ended = True
+
+    def choose_ai_move(self, difficulty=None):
+        """按难度为当前玩家计算一手（不落子）；无处可下时返回 None"""
+        difficulty = difficulty or self.difficulty
+        player = self.current_player
+        # 完全随机
+        if difficulty == "测试":
+            return ai_move_random(self.board, self.rng)
+
+        # Common / Medium / Hard：按难度分配搜索时间与深度
+        budget = DIFFICULTY_BUDGETS[difficulty]
+        self.engine.time_ms = budget["time_ms"]
+        self.engine.max_depth = budget["max_depth"]
+        result = self.engine.search(
+            self.board,
+            self.evaluator,
+            self.candidates,
+            player,
+            self.zobrist,
+            self.shapes,
+        )
+        return result.move
+
+    def play_ai(self, difficulty=None):
+        """为当前玩家计算并落下一手，返回该手的 (x, y)"""
+        move = self.choose_ai_move(difficulty)
+        if move is not None:
+            self.place(*move)
+        return move
+
+
+def ai_move_random(board, rng=random):
+    """AI随机落子"""
+    size = len(board)
+    empty_cells = [(x, y) for x in range(size) for y in range(size) if board[x][y] == 0]
+    if not empty_cells:
+        return None
+    return rng.choice(empty_cells)
+
+
+def ai_move_heuristic(
+    board, player=2, attack_factor=1.0, defend_factor=1.1, rng=random
+):
+    """使用启发式评分，考虑进攻和防守（一层贪心，不做搜索）"""
+    evaluator = PatternEvaluator(board)
+    candidates = CandidateGenerator(board)
+    opponent = 3 - player
+    best_score = -float("inf")
+    best_moves = []
+    # 只考虑已有棋子附近的空位；棋盘上没有棋子时退回到全部空位
+    empty_cells = candidates.moves()
+    if not empty_cells:
+        size = len(board)
+        empty_cells = [
+            (x, y) for x in range(size) for y in range(size) if board[x][y] == 0
+        ]
+    if not empty_cells:
+        return None
+
+    # 落子只会改变落子方自己的分数，因此用增量评分表直接求出落子后的分数
+    base_ai = evaluator.score(player)
+    base_player = evaluator.score(opponent)
+    for x, y in empty_cells:
+        # AI落子分数
+        score_ai = base_ai + evaluator.delta(x, y, player)
+        # 玩家潜在分数
+        score_player = base_player + evaluator.delta(x, y, opponent)
+
+        # 综合分数：更注重进攻(attack_factor) 和 防守(defend_factor)
+        total_score = attack_factor * score_ai + defend_factor * score_player
+        if total_score > best_score:
+            best_score = total_score
+            best_moves = [(x, y)]
+        elif abs(total_score - best_score) < 1e-9:
+            best_moves.append((x, y))
+
+    return rng.choice(best_moves)
@@ -0,0 +1,198 @@
+"""
+紧凑的对局记录格式，以及流式的读写器。
+
+文件由文件头和依次追加的对局组成（小端）：
+    文件头  b"GMKR"、版本 u8、棋盘边长 u8
+    对局头  结果 u8、难度 u8、手数 u16、落子字节数 u16、开始时间 u32（Unix 秒）、用时 u32（毫秒）
+    落子    每手相对上一手（第一手相对天元）编码：
+            横纵偏移都在 ±7 以内时占 1 字节：(dx + 7) * 15 + (dy + 7)，取值 0~224；
+            否则占 2 字节：225 + 格子序号 // 256、格子序号 % 256，格子序号为 x * 边长 + y。
+五子棋的落子大多紧挨着上一手，平均每手约 1 字节。
+
+写入时只追加到文件末尾，读取时逐局解码，不会把整个文件读进内存：
+    with RecordWriter("games.gmk") as writer:
+        writer.write(game.moves, winner=game.winner, difficulty=game.difficulty)
+    for record in read_records("games.gmk"):
+        print(record.moves, record.winner)
+"""
+
+import os
+import struct
+import time
+from collections import namedtuple
+
+MAGIC = b"GMKR"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sBB")
+GAME_HEADER = struct.Struct("<BBHHII")
+
+# 对局结果
+UNFINISHED = 0
+BLACK_WIN = 1
+WHITE_WIN = 2
+DRAW = 3
+
+# 难度 -> 编码（与 game_engine.DIFFICULTIES 的顺序一致），其余记为 UNKNOWN_DIFFICULTY
+DIFFICULTY_CODES = {"测试": 0, "Common": 1, "Medium": 2, "Hard": 3}
+DIFFICULTY_NAMES = {code: name for name, code in DIFFICULTY_CODES.items()}
+UNKNOWN_DIFFICULTY = 255
+
+# 相对偏移编码的范围与远距离落子的起始字节
+NEAR = 7
+SPAN = 2 * NEAR + 1
+FAR = SPAN * SPAN
+
+
+class GameRecord(
+    namedtuple("GameRecord", ["moves", "result", "difficulty", "start", "duration_ms"])
+):
+    """一局记录；difficulty 为难度名（未知时为 None），start 为 Unix 秒"""
+
+    __slots__ = ()
+
+    @property
+    def winner(self):
+        """胜者 1/2，和棋或未下完时为 None"""
+        return self.result if self.result in (BLACK_WIN, WHITE_WIN) else None
+
+
+def encode_moves(moves, size):
+    """把 [(x, y), ...] 编码为字节串"""
+    out = bytearray()
+    px = py = size // 2
+    for x, y in moves:
+        dx = x - px
+        dy = y - py
+        if -NEAR <= dx <= NEAR and -NEAR <= dy <= NEAR:
+            out.append((dx + NEAR) * SPAN + dy + NEAR)
+        else:
+            index = x * size + y
+            out.append(FAR + (index >> 8))
+            out.append(index & 0xFF)
+        px, py = x, y
+    return bytes(out)
+
+
+def decode_moves(data, size):
+    """encode_moves 的逆操作"""
+    moves = []
+    px = py = size // 2
+    i = 0
+    length = len(data)
+    while i < length:
+        code = data[i]
+        if code < FAR:
+            dx, dy = divmod(code, SPAN)
+            px += dx - NEAR
+            py += dy - NEAR
+            i += 1
+        else:
+            px, py = divmod(((code - FAR) << 8) | data[i + 1], size)
+            i += 2
+        moves.append((px, py))
+    return moves
+
+
+def result_code(winner, ended=True):
+    """由胜者（1/2/None）与是否结束得到结果编码"""
+    if winner in (BLACK_WIN, WHITE_WIN):
+        return winner
+    return DRAW if ended else UNFINISHED
+
+
+class RecordWriter:
+    """
+    追加写入对局记录。path 不存在时新建并写入文件头，已存在时检查文件头后追加。
+    写入经过文件缓冲，close()（或离开 with）时落盘。
+    """
+
+    def __init__(self, path, size=25):
+        self.size = size
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as f:
+                _check_header(f.read(FILE_HEADER.size), path, size)
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION, size))
+        self.count = 0
+
+    def write(
+        self, moves, winner=None, ended=True, difficulty=None, start=None, duration_ms=0
+    ):
+        """
+        追加一局。moves 为 [(x, y), ...]（黑棋先行）；winner 为 1/2/None；
+        ended=False 表示未下完的对局；start 默认为当前时间
+        """
+        data = encode_moves(moves, self.size)
+        self.file.write(
+            GAME_HEADER.pack(
+                result_code(winner, ended),
+                DIFFICULTY_CODES.get(difficulty, UNKNOWN_DIFFICULTY),
+                len(moves),
+                len(data),
+                int(time.time() if start is None else start),
+                int(duration_ms),
+            )
+        )
+        self.file.write(data)
+        self.count += 1
+
+    def flush(self):
+        """把已写入的对局落盘，长时间运行的写入方（如服务器）每局之后调用"""
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_header(data, path, size=None):
+    """检查文件头，返回记录中的棋盘边长"""
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"不是有效的对局记录文件: {path}")
+    magic, version, board_size = FILE_HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"不是有效的对局记录文件: {path}")
+    if size is not None and board_size != size:
+        raise ValueError(f"{path} 的棋盘边长为 {board_size}，与 {size} 不一致")
+    return board_size
+
+
+def is_record_file(path):
+    """文件是否以对局记录的文件头开始"""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_records(path):
+    """逐局读取对局记录（生成器），每次只读入一局的数据"""
+    with open(path, "rb") as f:
+        size = _check_header(f.read(FILE_HEADER.size), path)
+        while True:
+            header = f.read(GAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < GAME_HEADER.size:
+                raise ValueError(f"{path} 末尾的对局记录不完整")
+            result, difficulty, count, length, start, duration = GAME_HEADER.unpack(
+                header
+            )
+            data = f.read(length)
+            if len(data) < length:
+                raise ValueError(f"{path} 末尾的对局记录不完整")
+            moves = decode_moves(data, size)
+            if len(moves) != count:
+                raise ValueError(f"{path} 中的对局记录已损坏")
+            yield GameRecord(
+                moves,
+                result,
+                DIFFICULTY_NAMES.get(difficulty),
+                start,
+                duration,
+            )
@@ -0,0 +1,482 @@
+"""
+多局对战服务器：一个 asyncio 进程同时托管成千上万局人机或双人对局，客户端通过 TCP 连接。
+
+协议为每行一条 JSON 消息（UTF-8），一条连接上可以同时进行多局。客户端发送：
+    {"op": "new", "mode": "pve", "difficulty": "Common"}   新开人机对局，玩家执黑
+    {"op": "new", "mode": "pvp"}                          新开双人对局，等待对手加入
+    {"op": "join", "game": 7}                             以白棋加入双人对局
+    {"op": "move", "game": 7, "x": 12, "y": 12}           落子
+    {"op": "resign", "game": 7}                           认输
+    {"op": "leave", "game": 7}                            离开，对局随之结束
+    {"op": "stats"}                                       服务器统计
+服务器回复：
+    joined    加入了对局（game、player、mode、difficulty、已有的 moves）
+    opponent  双人对局的对手已加入
+    move      一手棋（game、player、x、y、winner、ended），发给对局双方，含 AI 的落子
+    over      对局因认输、离开或 AI 计算出错而结束（game、winner、reason：resign/left/error）
+    stats     服务器统计
+    error     请求无效（message；请求中带有 game 时原样附上）
+
+每局只保存紧凑的状态（GameState：一维 bytearray 棋盘与每手 2 字节的落子记录）。
+AI 的计算交给有界的进程池：同时交给进程池的局数不超过进程数的两倍，其余在事件循环中排队，
+慢的搜索不会阻塞其他连接。工作进程按落子记录重建局面，同一难度的搜索引擎（与置换表）在进程内复用。
+发给每条连接、尚未写出的数据不超过 MAX_BUFFER，读得太慢的客户端会被断开，服务器的内存不会无限增长。
+
+    python game_server.py --port 8765 --workers 4 --record server_games.gmk
+    python games_online.py --mode pve --difficulty Medium
+    python load_test.py --games 2000 --connections 50
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from game_engine import DIFFICULTIES, Game
+from game_record import RecordWriter
+from gomoku_ai import GRID_SIZE, SearchEngine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 一行消息的最大长度（字节），超过时断开连接
+MAX_LINE = 64 * 1024
+
+# 发往一条连接、积压未写出的数据上限（字节），超过时断开该连接
+MAX_BUFFER = 1024 * 1024
+
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+def encode(message):
+    """消息 -> 一行 UTF-8 编码的 JSON"""
+    text = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+    return (text + "\n").encode("utf-8")
+
+
+def decode(line):
+    """一行 JSON -> 消息；格式错误时抛出 ValueError"""
+    try:
+        message = json.loads(line)
+    except ValueError:
+        raise ValueError("消息不是有效的 JSON") from None
+    if not isinstance(message, dict) or not isinstance(message.get("op"), str):
+        raise ValueError("消息格式错误")
+    return message
+
+
+def error_reply(text, request=None):
+    """error 消息；请求中带有 game 时原样附上，客户端据此知道是哪一局的请求被拒绝"""
+    reply = {"op": "error", "message": text}
+    if request is not None and "game" in request:
+        reply["game"] = request["game"]
+    return reply
+
+
+class GameState:
+    """
+    服务器上的一局。board 为一维 bytearray（下标 x * GRID_SIZE + y），moves 为每手 x、y 两个字节；
+    players[1]/players[2] 为执黑/执白一方的连接，人机对局中 AI 一方与尚未加入的一方为 None
+    """
+
+    __slots__ = (
+        "id",
+        "mode",
+        "difficulty",
+        "board",
+        "moves",
+        "current_player",
+        "winner",
+        "ended",
+        "players",
+        "start_time",
+    )
+
+    def __init__(self, game_id, mode, difficulty=None):
+        self.id = game_id
+        self.mode = mode
+        self.difficulty = difficulty
+        self.board = bytearray(GRID_SIZE * GRID_SIZE)
+        self.moves = bytearray()
+        self.current_player = 1
+        self.winner = None
+        self.ended = False
+        self.players = [None, None, None]
+        self.start_time = time.time()
+
+    def move_list(self):
+        """按顺序的落子 [(x, y), ...]"""
+        return list(zip(self.moves[::2], self.moves[1::2]))
+
+    def is_legal(self, x, y):
+        return (
+            not self.ended
+            and 0 <= x < GRID_SIZE
+            and 0 <= y < GRID_SIZE
+            and self.board[x * GRID_SIZE + y] == 0
+        )
+
+    def place(self, x, y):
+        """当前玩家在 (x, y) 落子，并更新胜负与轮次（调用前先用 is_legal 检查）"""
+        player = self.current_player
+        self.board[x * GRID_SIZE + y] = player
+        self.moves += bytes((x, y))
+        if self._five_at(x, y, player):
+            self.winner = player
+            self.ended = True
+        elif len(self.moves) == 2 * GRID_SIZE * GRID_SIZE:
+            self.ended = True  # 棋盘下满，和棋
+        else:
+            self.current_player = 3 - player
+
+    def _five_at(self, x, y, player):
+        """与 check_winner_at 相同，只是棋盘为一维"""
+        board = self.board
+        for dx, dy in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                nx, ny = x + sign * dx, y + sign * dy
+                while (
+                    0 <= nx < GRID_SIZE
+                    and 0 <= ny < GRID_SIZE
+                    and board[nx * GRID_SIZE + ny] == player
+                ):
+                    count += 1
+                    nx += sign * dx
+                    ny += sign * dy
+            if count >= 5:
+                return True
+        return False
+
+
+class Connection:
+    """一条客户端连接及其参与的对局"""
+
+    __slots__ = ("writer", "games")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.games = set()
+
+    def send(self, message):
+        """
+        发送一条消息，不等待写出：对手的落子与 AI 的落子可能来自别的连接或任务，无法在这里 drain。
+        客户端读得太慢、积压超过 MAX_BUFFER 时直接断开，由 handle 收尾其参与的对局
+        """
+        writer = self.writer
+        if writer.is_closing():
+            return
+        writer.write(encode(message))
+        if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            writer.transport.abort()
+
+
+# 工作进程中各难度的搜索引擎，在多次计算之间复用置换表
+_engines = {}
+
+
+def choose_move(difficulty, moves):
+    """工作进程入口：按落子记录（每手 x、y 两个字节）重建局面，为轮到的一方计算一手"""
+    engine = _engines.get(difficulty)
+    if engine is None:
+        engine = _engines[difficulty] = SearchEngine()
+    game = Game(difficulty, engine=engine)
+    for i in range(0, len(moves), 2):
+        game.place(moves[i], moves[i + 1])
+    return game.choose_ai_move()
+
+
+class GameServer:
+    """
+    托管全部对局。必须在事件循环中创建；handle 为 asyncio.start_server 的连接回调
+    :param workers: AI 进程数，默认为 CPU 核数
+    :param record: 对局结束时追加写入的对局记录文件（.gmk），None 为不保存
+    """
+
+    def __init__(self, workers=None, record=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        # 同时交给进程池的计算数，多出的在事件循环中排队
+        self.ai_slots = asyncio.Semaphore(2 * self.workers)
+        self.record = RecordWriter(record, GRID_SIZE) if record else None
+        self.games = {}
+        self.ids = itertools.count(1)
+        self.rng = random.Random()
+        self.tasks = set()  # 进行中的 AI 任务，保留引用以免被回收
+        self.connections = 0
+        self.moves_played = 0
+        self.ai_waiting = 0
+        self.handlers = {
+            "new": self.op_new,
+            "join": self.op_join,
+            "move": self.op_move,
+            "resign": self.op_resign,
+            "leave": self.op_leave,
+            "stats": self.op_stats,
+        }
+
+    async def handle(self, reader, writer):
+        conn = Connection(writer)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # 消息过长或连接中断
+                if not line:
+                    break
+                message = None
+                try:
+                    message = decode(line)
+                    handler = self.handlers.get(message["op"])
+                    if handler is None:
+                        raise ValueError(f"未知的请求: {message['op']}")
+                    handler(conn, message)
+                except KeyError as e:
+                    conn.send(error_reply(f"消息缺少字段: {e}", message))
+                except (ValueError, TypeError) as e:
+                    conn.send(error_reply(str(e), message))
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    break
+        finally:
+            self.connections -= 1
+            for game in list(conn.games):
+                self._abandon(game, conn)
+            writer.close()
+
+    def _game(self, conn, message):
+        """消息中 game 对应的、conn 参与的对局"""
+        game = self.games.get(int(message["game"]))
+        if game is None or (conn not in game.players and message["op"] != "join"):
+            raise ValueError(f"没有这一局: {message['game']}")
+        return game
+
+    def op_new(self, conn, message):
+        mode = message.get("mode", "pve")
+        if mode == "pve":
+            difficulty = message.get("difficulty", "Common")
+            if difficulty not in DIFFICULTIES:
+                raise ValueError(f"未知的难度: {difficulty}")
+        elif mode == "pvp":
+            difficulty = None
+        else:
+            raise ValueError(f"未知的对局模式: {mode}")
+        game = GameState(next(self.ids), mode, difficulty)
+        game.players[1] = conn
+        self.games[game.id] = game
+        conn.games.add(game)
+        conn.send(
+            {
+                "op": "joined",
+                "game": game.id,
+                "player": 1,
+                "mode": mode,
+                "difficulty": difficulty,
+                "moves": [],
+            }
+        )
+
+    def op_join(self, conn, message):
+        game = self._game(conn, message)
+        if game.mode != "pvp" or game.players[2] is not None:
+            raise ValueError(f"无法加入这一局: {game.id}")
+        game.players[2] = conn
+        conn.games.add(game)
+        conn.send(
+            {
+                "op": "joined",
+                "game": game.id,
+                "player": 2,
+                "mode": game.mode,
+                "difficulty": None,
+                "moves": game.move_list(),
+            }
+        )
+        game.players[1].send({"op": "opponent", "game": game.id})
+
+    def op_move(self, conn, message):
+        game = self._game(conn, message)
+        x, y = int(message["x"]), int(message["y"])
+        if game.players[game.current_player] is not conn or game.ended:
+            raise ValueError("还没有轮到你")
+        if game.mode == "pvp" and game.players[2] is None:
+            raise ValueError("等待对手加入")
+        if not game.is_legal(x, y):
+            raise ValueError(f"非法落子: ({x}, {y})")
+        self._play(game, x, y)
+        if not game.ended and game.mode == "pve":
+            task = asyncio.create_task(self._ai_turn(game))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    def op_resign(self, conn, message):
+        game = self._game(conn, message)
+        player = 1 if game.players[1] is conn else 2
+        game.winner = 3 - player
+        game.ended = True
+        self._broadcast(
+            game,
+            {"op": "over", "game": game.id, "winner": game.winner, "reason": "resign"},
+        )
+        self._close(game)
+
+    def op_leave(self, conn, message):
+        self._abandon(self._game(conn, message), conn)
+
+    def op_stats(self, conn, message):
+        conn.send(
+            {
+                "op": "stats",
+                "games": len(self.games),
+                "connections": self.connections,
+                "moves": self.moves_played,
+                "ai_waiting": self.ai_waiting,
+                "workers": self.workers,
+            }
+        )
+
+    def _broadcast(self, game, message):
+        for conn in set(game.players[1:]):
+            if conn is not None:
+                conn.send(message)
+
+    def _play(self, game, x, y):
+        player = game.current_player
+        game.place(x, y)
+        self.moves_played += 1
+        self._broadcast(
+            game,
+            {
+                "op": "move",
+                "game": game.id,
+                "player": player,
+                "x": x,
+                "y": y,
+                "winner": game.winner,
+                "ended": game.ended,
+            },
+        )
+        if game.ended:
+            self._close(game)
+
+    async def _ai_turn(self, game):
+        """
+        为人机对局计算并落下 AI 的一手；计算期间对局已结束时丢弃结果。
+        计算出错（工作进程崩溃、返回无效的落子等）时以 reason="error" 结束对局
+        """
+        ply = len(game.moves)
+        if game.difficulty == "测试":
+            # 随机落子不需要搜索，直接在事件循环中完成
+            empty = [i for i, piece in enumerate(game.board) if piece == 0]
+            move = divmod(self.rng.choice(empty), GRID_SIZE)
+        else:
+            self.ai_waiting += 1
+            try:
+                async with self.ai_slots:
+                    if self.games.get(game.id) is not game:
+                        return
+                    loop = asyncio.get_running_loop()
+                    pool = self.pool
+                    move = await loop.run_in_executor(
+                        pool, choose_move, game.difficulty, bytes(game.moves)
+                    )
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool) and pool is self.pool:
+                    # 工作进程异常退出后进程池不能再用，换一个新的
+                    self.pool = ProcessPoolExecutor(max_workers=self.workers)
+                    pool.shutdown(wait=False)
+                if self.games.get(game.id) is game:
+                    self._fail(game, f"{type(e).__name__}: {e}")
+                return
+            finally:
+                self.ai_waiting -= 1
+        if self.games.get(game.id) is not game or len(game.moves) != ply:
+            return
+        if move is None or not game.is_legal(*move):
+            self._fail(game, f"无效的落子: {move}")
+            return
+        self._play(game, *move)
+
+    def _fail(self, game, error):
+        """AI 计算出错：结束对局（不计胜负）并通知玩家"""
+        print(f"对局 {game.id} 的 AI 计算出错: {error}")
+        game.ended = True
+        self._broadcast(
+            game, {"op": "over", "game": game.id, "winner": None, "reason": "error"}
+        )
+        self._close(game)
+
+    def _abandon(self, game, conn):
+        """conn 离开对局：未结束的对局就此结束（不计胜负），并通知另一方"""
+        if self.games.get(game.id) is not game:
+            return
+        conn.games.discard(game)
+        for player in (1, 2):
+            if game.players[player] is conn:
+                game.players[player] = None
+        self._broadcast(
+            game, {"op": "over", "game": game.id, "winner": None, "reason": "left"}
+        )
+        self._close(game)
+
+    def _close(self, game):
+        """对局结束：从服务器移除，有落子时写入对局记录"""
+        del self.games[game.id]
+        for conn in game.players[1:]:
+            if conn is not None:
+                conn.games.discard(game)
+        if self.record is not None and game.moves:
+            self.record.write(
+                game.move_list(),
+                winner=game.winner,
+                ended=game.ended,
+                difficulty=game.difficulty,
+                start=game.start_time,
+                duration_ms=(time.time() - game.start_time) * 1000,
+            )
+            self.record.flush()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        if self.record is not None:
+            self.record.close()
+
+
+async def serve(host, port, workers=None, record=None):
+    server = GameServer(workers, record)
+    listener = await asyncio.start_server(server.handle, host, port, limit=MAX_LINE)
+    print(f"服务器已启动：{host}:{port}，AI 进程数 {server.workers}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋多局对战服务器")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="AI 进程数，默认为 CPU 核数"
+    )
+    parser.add_argument(
+        "--record", default=None, help="把结束的对局追加写入该对局记录文件（.gmk）"
+    )
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.record))
+    except KeyboardInterrupt:
+        print("服务器已关闭")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+联网对战客户端：连接 game_server.py，在服务器上进行人机或双人对局。
+
+    python game_server.py
+    python games_online.py --mode pve --difficulty Medium
+    python games_online.py --mode pvp      # 新开双人对局，窗口标题显示对局编号
+    python games_online.py --join 3        # 以白棋加入编号为 3 的双人对局
+
+网络消息在后台线程中读取，放入队列后发出 NET_EVENT 唤醒主循环；棋盘只按服务器发来的 move 消息更新。
+"""
+
+import argparse
+import queue
+import socket
+import sys
+import threading
+
+import pygame
+
+from game_engine import DIFFICULTIES
+from game_server import DEFAULT_HOST, DEFAULT_PORT, decode, encode
+from gomoku_ai import GRID_SIZE
+
+# --- 全局常量与变量 ---
+BOARD_WIDTH = 700
+BOARD_HEIGHT = 700
+STATUS_HEIGHT = 40
+SCREEN_WIDTH = BOARD_WIDTH
+SCREEN_HEIGHT = BOARD_HEIGHT + STATUS_HEIGHT
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GRAY = (200, 200, 200)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+
+CELL_SIZE = BOARD_WIDTH // GRID_SIZE
+
+NET_EVENT = pygame.USEREVENT + 1  # 后台线程收到服务器消息后发出的事件
+
+# 对局状态，以服务器的消息为准
+board = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+game_id = None
+my_player = None  # 1 为黑棋，2 为白棋
+mode = None
+current_player = 1
+winner = None
+ended = False
+last_move = None
+notice = "正在连接服务器..."  # 状态栏上的提示（错误、对手离开等）
+
+sock = None
+messages = queue.Queue()  # 服务器消息，连接断开时放入 None
+
+screen = None
+font = None
+
+
+def reader_thread(conn):
+    """后台线程：逐行读取服务器消息放入队列"""
+    try:
+        with conn.makefile("rb") as f:
+            for line in f:
+                try:
+                    messages.put(decode(line))
+                except ValueError:
+                    continue
+                post_net_event()
+    except OSError:
+        pass
+    messages.put(None)
+    post_net_event()
+
+
+def post_net_event():
+    try:
+        pygame.event.post(pygame.event.Event(NET_EVENT))
+    except pygame.error:
+        pass  # 窗口已关闭
+
+
+def send(message):
+    global notice
+    try:
+        sock.sendall(encode(message))
+    except OSError:
+        notice = "与服务器的连接已断开"
+
+
+def handle_message(message):
+    """按服务器消息更新对局状态"""
+    global game_id, my_player, mode, current_player, winner, ended, last_move, notice
+    if message is None:
+        if not ended:
+            notice = "与服务器的连接已断开"
+        ended = True
+        return
+    op = message["op"]
+    if op == "joined":
+        game_id = message["game"]
+        my_player = message["player"]
+        mode = message["mode"]
+        for i, (x, y) in enumerate(message["moves"]):
+            board[x][y] = 1 if i % 2 == 0 else 2
+            last_move = (x, y)
+        current_player = 1 if len(message["moves"]) % 2 == 0 else 2
+        if mode == "pvp" and my_player == 1:
+            notice = f"等待对手加入（对局编号 {game_id}）"
+        else:
+            notice = ""
+        pygame.display.set_caption(f"五子棋 - 联网对战 #{game_id}")
+    elif op == "opponent":
+        notice = ""
+    elif op == "move":
+        x, y = message["x"], message["y"]
+        board[x][y] = message["player"]
+        last_move = (x, y)
+        current_player = 3 - message["player"]
+        winner = message["winner"]
+        ended = message["ended"]
+    elif op == "over":
+        winner = message["winner"]
+        ended = True
+        if message.get("reason") == "left":
+            notice = "对方已离开"
+        elif message.get("reason") == "error":
+            notice = "服务器的 AI 计算出错，对局结束"
+    elif op == "error":
+        notice = message["message"]
+
+
+def status_text():
+    """状态栏文字"""
+    if notice:
+        return notice
+    if ended:
+        if winner is None:
+            return "和棋"
+        return "你赢了!" if winner == my_player else "你输了"
+    if current_player == my_player:
+        return f"轮到你（{'黑棋' if my_player == 1 else '白棋'}）"
+    return "AI 正在思考..." if mode == "pve" else "等待对手落子..."
+
+
+def draw():
+    """绘制棋盘、棋子与状态栏"""
+    screen.fill(GRAY)
+    for i in range(GRID_SIZE + 1):
+        pygame.draw.line(
+            screen, BLACK, (i * CELL_SIZE, 0), (i * CELL_SIZE, BOARD_HEIGHT), 1
+        )
+        pygame.draw.line(
+            screen, BLACK, (0, i * CELL_SIZE), (BOARD_WIDTH, i * CELL_SIZE), 1
+        )
+    for i in range(GRID_SIZE):
+        for j in range(GRID_SIZE):
+            if board[i][j]:
+                center = (
+                    i * CELL_SIZE + CELL_SIZE // 2,
+                    j * CELL_SIZE + CELL_SIZE // 2,
+                )
+                color = BLACK if board[i][j] == 1 else WHITE
+                pygame.draw.circle(screen, color, center, CELL_SIZE // 2 - 2)
+                # 最后一手加红色圆环
+                if (i, j) == last_move:
+                    pygame.draw.circle(screen, RED, center, CELL_SIZE // 2 - 2, width=2)
+    text = font.render(status_text(), True, RED if ended else BLUE)
+    screen.blit(text, (10, BOARD_HEIGHT + (STATUS_HEIGHT - text.get_height()) // 2))
+    pygame.display.flip()
+
+
+def click(pos):
+    """轮到自己时把点击的格子发给服务器，落子结果等服务器的 move 消息"""
+    global notice
+    mx, my = pos
+    if ended or game_id is None or current_player != my_player:
+        return
+    if 0 <= mx < BOARD_WIDTH and 0 <= my < BOARD_HEIGHT:
+        x, y = mx // CELL_SIZE, my // CELL_SIZE
+        if board[x][y] == 0:
+            notice = ""
+            send({"op": "move", "game": game_id, "x": x, "y": y})
+
+
+def main(argv=None):
+    global sock, screen, font
+    parser = argparse.ArgumentParser(description="五子棋 - 联网对战客户端")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="服务器地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="服务器端口")
+    parser.add_argument(
+        "--mode", choices=["pve", "pvp"], default="pve", help="人机或双人对局"
+    )
+    parser.add_argument(
+        "--difficulty", choices=DIFFICULTIES, default="Common", help="人机对局的难度"
+    )
+    parser.add_argument("--join", type=int, default=None, help="加入该编号的双人对局")
+    args = parser.parse_args(argv)
+
+    try:
+        sock = socket.create_connection((args.host, args.port))
+    except OSError as e:
+        print(f"无法连接服务器 {args.host}:{args.port}: {e}")
+        return
+
+    pygame.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("五子棋 - 联网对战")
+    font = pygame.font.SysFont("Microsoft YaHei", 20)
+
+    threading.Thread(target=reader_thread, args=(sock,), daemon=True).start()
+    if args.join is not None:
+        send({"op": "join", "game": args.join})
+    else:
+        send({"op": "new", "mode": args.mode, "difficulty": args.difficulty})
+
+    running = True
+    while running:
+        # 空闲时阻塞等待输入或服务器消息
+        for event in [pygame.event.wait()] + pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                click(event.pos)
+        while True:
+            try:
+                handle_message(messages.get_nowait())
+            except queue.Empty:
+                break
+        draw()
+
+    if game_id is not None and not ended:
+        send({"op": "leave", "game": game_id})
+    sock.close()
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,8 @@ current_player = 1  # 当前玩家，1为黑棋，2为白棋
 black_position = [grid_size // 2, grid_size // 2]
 white_position = [grid_size // 2, grid_size // 2]
 
+BUTTON_GUARD_TIME = 0.25  # 对局结束后按钮延迟出现的时间，防止落子的点击误触按钮
+
 
 def draw_board():
     """绘制棋盘"""
@@ -81,7 +83,7 @@ def show_current_player():
 
 
 def check_winner(board, player):
-    """检查是否有玩家获胜"""
+    """检查是否有玩家获胜（全盘扫描，仅作校验用，对局中请用 check_winner_at）"""
     # 检查所有行、列以及两个对角线
     for i in range(grid_size):
         for j in range(grid_size):
@@ -113,6 +115,27 @@ def check_winner(board, player):
     return False
 
 
+def check_winner_at(board, x, y, player):
+    """检查 (x, y) 处刚落下的棋子是否形成五连珠，只沿经过该点的四条线计数"""
+    for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        count = 1
+        # 正方向
+        nx, ny = x + dx, y + dy
+        while 0 <= nx < grid_size and 0 <= ny < grid_size and board[nx][ny] == player:
+            count += 1
+            nx += dx
+            ny += dy
+        # 反方向
+        nx, ny = x - dx, y - dy
+        while 0 <= nx < grid_size and 0 <= ny < grid_size and board[nx][ny] == player:
+            count += 1
+            nx -= dx
+            ny -= dy
+        if count >= 5:
+            return True
+    return False
+
+
 def highlight_square(screen, x, y):
     """高亮显示鼠标所在的格子，根据当前玩家显示不同的高亮颜色"""
     row = x // (width // grid_size)
@@ -138,9 +161,8 @@ def highlight_square(screen, x, y):
 
 
 def draw_button(screen, text, x, y, width, height, color, hover_color, action=None):
-    """绘制半透明按钮并检查是否被点击"""
+    """绘制半透明按钮（点击由 click_button 在 MOUSEBUTTONUP 事件中处理）"""
     mouse = pygame.mouse.get_pos()
-    click = pygame.mouse.get_pressed()
 
     # 创建一个支持透明度的 Surface
     button_surface = pygame.Surface((width, height), pygame.SRCALPHA)
@@ -148,8 +170,6 @@ def draw_button(screen, text, x, y, width, height, color, hover_color, action=No
     # 设置按钮颜色和透明度
     if x + width > mouse[0] > x and y + height > mouse[1] > y:
         button_surface.fill(hover_color + (120,))  # 半透明的悬停颜色
-        if click[0] == 1 and action is not None:
-            action()
     else:
         button_surface.fill(color + (80,))  # 半透明的普通颜色
 
@@ -164,6 +184,47 @@ def draw_button(screen, text, x, y, width, height, color, hover_color, action=No
     screen.blit(button_surface, (x, y))
 
 
+def end_buttons():
+    """对局结束后显示的按钮，参数与 draw_button 一致；落子后稍等片刻才出现，防止误触"""
+    if not game_ended or time.time() - last_click_time <= BUTTON_GUARD_TIME:
+        return []
+    return [
+        (
+            "重新开始",
+            width // 2 - 100,
+            height // 2 + 30,
+            200,
+            40,
+            GRAY,
+            RED,
+            restart_game,
+        ),
+        ("退出游戏", width // 2 - 100, height // 2 + 80, 200, 40, GRAY, RED, quit_game),
+    ]
+
+
+def click_button(pos):
+    """鼠标左键在 pos 处松开时触发该处按钮，一次点击只触发一次"""
+    for text, x, y, w, h, color, hover_color, action in end_buttons():
+        if x + w > pos[0] > x and y + h > pos[1] > y:
+            action()
+            return
+
+
+def wait_events():
+    """
+    阻塞到有事件为止（按钮即将出现时最多等到那一刻），返回期间的全部事件；
+    空闲时不占用 CPU，也不重绘
+    """
+    remaining = last_click_time + BUTTON_GUARD_TIME - time.time()
+    if game_ended and remaining > 0:
+        event = pygame.event.wait(int(remaining * 1000) + 1)
+    else:
+        event = pygame.event.wait()
+    events = [] if event.type == pygame.NOEVENT else [event]
+    return events + pygame.event.get()
+
+
 def restart_game():
     """重置游戏状态以重新开始"""
     global board, current_player, winner, game_over, game_ended
@@ -187,23 +248,27 @@ winner = None
 button_font = pygame.font.SysFont("Microsoft YaHei", 20)
 last_click_time = 0
 while not game_over:
-    mouse_x, mouse_y = pygame.mouse.get_pos()
-    for event in pygame.event.get():
+    for event in wait_events():
         if event.type == pygame.QUIT:
             game_over = True
 
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            click_button(event.pos)
+
         if event.type == pygame.MOUSEBUTTONDOWN and not winner:
+            mouse_x, mouse_y = event.pos
             row = mouse_x // (width // grid_size)
             col = mouse_y // (height // grid_size)
             # 如果该格子为空，则放置棋子并切换玩家
             if board[row][col] == 0:
                 board[row][col] = current_player
-                if check_winner(board, current_player):
+                if check_winner_at(board, row, col, current_player):
                     winner = current_player
                     game_ended = True
                     last_click_time = time.time()
                 current_player = 1 if current_player == 2 else 2
 
+    mouse_x, mouse_y = pygame.mouse.get_pos()
     screen.fill(GRAY)
     draw_board()
     draw_pieces()
@@ -225,30 +290,8 @@ while not game_over:
             ),
         )
         # 绘制重新开始和退出游戏的按钮
-        current_time = time.time()
-        if current_time - last_click_time > 0.25:
-            draw_button(
-                screen,
-                "重新开始",
-                width // 2 - 100,
-                height // 2 + 30,
-                200,
-                40,
-                GRAY,
-                RED,
-                restart_game,
-            )
-            draw_button(
-                screen,
-                "退出游戏",
-                width // 2 - 100,
-                height // 2 + 80,
-                200,
-                40,
-                GRAY,
-                RED,
-                quit_game,
-            )
+        for button in end_buttons():
+            draw_button(screen, *button)
     pygame.display.flip()
 
 pygame.quit()
@@ -1,7 +1,19 @@
+import argparse
+import multiprocessing
 import pygame
 import sys
+from collections import OrderedDict
 import time
-import random
+import queue
+import threading
+import traceback
+
+from game_engine import DIFFICULTIES, Game
+from game_record import RecordWriter
+from profiler import Profiler
+from gomoku_ai import GRID_SIZE
+from parallel_search import make_engine
+from ponder import Ponderer
 
 # --- 全局常量与变量 ---
 # 窗口大小
@@ -23,65 +35,162 @@ BLUE = (0, 0, 255)
 BUTTON_BG_COLOR = (128, 128, 128, 150)  # 灰色，约60%透明
 BUTTON_HOVER_COLOR = (255, 0, 0, 150)  # 红色，约60%透明
 
-# 棋盘网格
-GRID_SIZE = 25
+# 棋盘网格（GRID_SIZE 定义在 gomoku_ai 中）
 CELL_SIZE = BOARD_WIDTH // GRID_SIZE  # 每格像素宽度
 
-# 游戏状态
+# 界面状态；对局本身（棋盘、轮次、走棋记录、胜负）保存在 game 中
 game_state = "menu"  # 可取 "menu" or "playing"
-current_player = 1  # 1=黑棋(玩家), 2=白棋(AI)
-board = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-winner = None
-game_ended = False
+# 玩家执黑(1)，AI 执白(2)；在 main() 中创建，并行搜索的子进程导入本模块时不会构造搜索引擎
+game = None
 game_quit = False
 
-# 走棋记录
-history = []
-
 # AI相关
 ai_thinking = False
 ai_move_time = 0
-AI_DELAY = 1  # 模拟AI思考延迟
+AI_DONE_EVENT = pygame.USEREVENT + 1  # AI 线程算完后发出的事件，唤醒主循环
+AI_DELAY = 0.3  # 搜索本身受时间预算限制，这里只留出显示“思考中”提示的时间
+BUTTON_GUARD_TIME = 0.3  # 对局结束后按钮延迟出现的时间，防止落子的点击误触按钮
+
+# AI 在后台线程中计算，结果以 (ai_token, move) 的形式放入队列
+ai_results = queue.Queue()
+ai_token = 0  # 每次取消或重开对局时加一，过期的计算结果会被丢弃
+ai_thread = None  # 正在计算的工作线程，取消时等它退出
+ai_error = None  # AI 计算出错时的错误信息，显示在棋盘中央，悔棋或重新计算时清除
+ai_result_ready = False
+ai_pending_move = None
+game_end_time = 0
+
+# 后台思考：轮到玩家时预先计算 AI 对玩家最可能几手的应对（--no-ponder 关闭）
+ponderer = Ponderer()
+ponder_enabled = True
+
+# 性能记录（--profile / --overlay 时启用）：AI 每步统计与每帧绘制耗时，F3 切换叠加层
+profiler = None
+profile_path = None
+show_profile = False
+
+# 并行搜索的进程数（--workers），None 为 CPU 核数，1 为只用串行搜索
+search_workers = None
+
+# 每局结束（或中途放弃）时追加到该文件，见 game_record.py
+RECORD_FILE = "game_records.gmk"
+recorded_line = None  # 最近写入记录的 (对局开始时间, 落子列表)，避免重复写入
 
 # 难度列表（含新难度）
-difficulties = ["测试", "Common", "Medium", "Hard"]
+difficulties = DIFFICULTIES
 selected_difficulty = "Common"  # 默认难度
 
 # 新增：AI最后一手的落子坐标(行,列)
 ai_last_move = None
 
-# --- 初始化Pygame ---
-pygame.init()
-pygame.font.init()
+# 局部重绘：缓存的棋盘图层（网格 + 棋子）及其对应的对局与已绘制的落子
+board_layer = None
+layer_game = None
+layer_moves = ()
+layer_marker = None  # 图层上 AI 最后一手标记所在的格子
+
+# 可能需要局部重绘的界面区域
+INFO_RECT = (0, 0, BOARD_WIDTH, 40)
+OVERLAY_RECT = (0, BOARD_HEIGHT // 2 - 40, BOARD_WIDTH, 80)
+HISTORY_RECT = (BOARD_WIDTH, 0, SCREEN_WIDTH - BOARD_WIDTH, SCREEN_HEIGHT)
+PROFILE_RECT = (BOARD_WIDTH - 290, 45, 285, 100)
+
+# 文字渲染缓存：(字体, 文字, 颜色) -> Surface，按最近使用淘汰
+TEXT_CACHE_SIZE = 256
+text_cache = OrderedDict()
+
+# 右侧对局记录面板的缓存，只在记录变化时重画；点击某一行跳到该手
+history_pane = None
+history_pane_key = None
+HISTORY_ROWS = 20  # 面板中最多显示的行数
+HISTORY_TOP = 50  # 第一行相对面板顶部的位置
+HISTORY_ROW_HEIGHT = 20
+
+# 导航按键 -> 由当前手数得到目标手数（越界时由 navigate 截断）
+NAVIGATION_KEYS = {
+    pygame.K_LEFT: lambda ply: ply - 1,
+    pygame.K_RIGHT: lambda ply: ply + 1,
+    pygame.K_HOME: lambda ply: 0,
+    pygame.K_END: lambda ply: GRID_SIZE * GRID_SIZE,
+}
+
+# pygame 相关对象在 init_display() 中创建，导入本模块不会打开窗口
+screen = None
+clock = None
+font_small = font_medium = font_large = None
 
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("五子棋 - 人机对战（低智版）")
-clock = pygame.time.Clock()
 
-# 字体
-font_small = pygame.font.SysFont("Microsoft YaHei", 18)
-font_medium = pygame.font.SysFont("Microsoft YaHei", 24, bold=True)
-font_large = pygame.font.SysFont("Microsoft YaHei", 40, bold=True)
+# --- 函数定义 ---
+def init_display():
+    """初始化 Pygame 窗口与字体"""
+    global screen, clock, font_small, font_medium, font_large
+    pygame.init()
+    pygame.font.init()
+
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("五子棋 - 人机对战（低智版）")
+    clock = pygame.time.Clock()
+
+    # 字体
+    font_small = pygame.font.SysFont("Microsoft YaHei", 18)
+    font_medium = pygame.font.SysFont("Microsoft YaHei", 24, bold=True)
+    font_large = pygame.font.SysFont("Microsoft YaHei", 40, bold=True)
+
+
+def save_record():
+    """
+    把当前对局追加到记录文件。没有落子、或当前落子只是已写入的那一局的前几手（悔棋浏览）时不写；
+    结束后悔棋走出新的分支，再次结束或放弃时作为新的一局写入
+    """
+    global recorded_line
+    moves = game.moves
+    if not moves:
+        return
+    if recorded_line is not None:
+        start, saved = recorded_line
+        if start == game.start_time and saved[: len(moves)] == moves:
+            return
+    recorded_line = (game.start_time, moves)
+    try:
+        with RecordWriter(RECORD_FILE, GRID_SIZE) as writer:
+            writer.write(
+                moves,
+                winner=game.winner,
+                ended=game.ended,
+                difficulty=game.difficulty,
+                start=game.start_time,
+                duration_ms=(time.time() - game.start_time) * 1000,
+            )
+    except (OSError, ValueError) as e:
+        print(f"对局记录保存失败: {e}")
+
+
+def finish_game():
+    """对局结束：记录结束时间（用于延迟显示按钮）并保存对局记录"""
+    global game_end_time
+    game_end_time = time.time()
+    save_record()
 
 
-# --- 函数定义 ---
 # 重新开始游戏(清空棋盘、历史等)，保留当前难度，不退回菜单
 def restart_game():
-    global board, current_player, winner, game_ended
-    global ai_thinking, ai_move_time, history, ai_last_move
-    board = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-    current_player = 1
-    winner = None
-    game_ended = False
+    global game, ai_thinking, ai_move_time, ai_last_move
+    cancel_ai()
+    save_record()
+    # 每局使用新的 Game（含新的搜索引擎）
+    game = Game(
+        selected_difficulty, engine=make_engine(selected_difficulty, search_workers)
+    )
     ai_thinking = False
     ai_move_time = 0
-    history = []
     ai_last_move = None  # 重置AI最后一手
     print("游戏已重置，继续对局")
 
 
 def back_to_menu():
     global game_state
+    cancel_ai()
+    save_record()
     game_state = "menu"
     print("返回菜单")
 
@@ -89,13 +198,37 @@ def back_to_menu():
 # 退出游戏
 def quit_game():
     global game_quit
+    cancel_ai()
+    save_record()
     game_quit = True
 
 
+def resign():
+    """玩家认输，AI 获胜"""
+    cancel_ai()
+    game.resign(1)
+    finish_game()
+    print("玩家认输")
+
+
+def render_text(font, text, color):
+    """带 LRU 缓存的 font.render；中文字体渲染较慢，相同文字只渲染一次"""
+    key = (font, text, color)
+    surface = text_cache.get(key)
+    if surface is None:
+        surface = font.render(text, True, color)
+        text_cache[key] = surface
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return surface
+
+
 # 绘制初始菜单界面
 def draw_menu():
     screen.fill(GRAY)
-    title_text = font_large.render("五子棋 - 人机对战（低智版）", True, RED)
+    title_text = render_text(font_large, "五子棋 - 人机对战（低智版）", RED)
     screen.blit(
         title_text,
         (
@@ -105,7 +238,7 @@ def draw_menu():
     )
 
     # “难度选择：” 文字
-    diff_choice_text = font_medium.render("难度选择：", True, BLUE)
+    diff_choice_text = render_text(font_medium, "难度选择：", BLUE)
     screen.blit(
         diff_choice_text,
         (
@@ -114,6 +247,24 @@ def draw_menu():
         ),
     )
 
+    # 难度按钮与“开始游戏”按钮
+    for button in menu_buttons():
+        draw_button(*button)
+
+    # 当前选择难度
+    diff_text = render_text(font_medium, f"当前难度：{selected_difficulty}", BLUE)
+    screen.blit(
+        diff_text,
+        (
+            SCREEN_WIDTH // 2 - diff_text.get_width() // 2,
+            500,
+        ),
+    )
+
+
+def menu_buttons():
+    """菜单界面的按钮：(文字, x, y, 宽, 高, 颜色, 悬停颜色, 回调, 是否半透明)"""
+    buttons = []
     # 难度按钮
     button_width = 120
     button_height = 50
@@ -125,16 +276,18 @@ def draw_menu():
     for i, diff in enumerate(difficulties):
         x = start_x + i * (button_width + gap)
         y = start_y
-        draw_button(
-            diff,
-            x,
-            y,
-            button_width,
-            button_height,
-            (150, 150, 150),
-            (255, 0, 0),
-            lambda d=diff: set_difficulty(d),
-            transparent=False,
+        buttons.append(
+            (
+                diff,
+                x,
+                y,
+                button_width,
+                button_height,
+                (150, 150, 150),
+                (255, 0, 0),
+                lambda d=diff: set_difficulty(d),
+                False,
+            )
         )
 
     # “开始游戏”按钮
@@ -142,27 +295,48 @@ def draw_menu():
     start_game_btn_h = 60
     start_game_x = SCREEN_WIDTH // 2 - start_game_btn_w // 2
     start_game_y = 400
-    draw_button(
-        "开始游戏",
-        start_game_x,
-        start_game_y,
-        start_game_btn_w,
-        start_game_btn_h,
-        (150, 150, 150),
-        (0, 128, 255),
-        start_game,
-        transparent=False,
-    )
-
-    # 当前选择难度
-    diff_text = font_medium.render(f"当前难度：{selected_difficulty}", True, BLUE)
-    screen.blit(
-        diff_text,
+    buttons.append(
         (
-            SCREEN_WIDTH // 2 - diff_text.get_width() // 2,
-            500,
-        ),
+            "开始游戏",
+            start_game_x,
+            start_game_y,
+            start_game_btn_w,
+            start_game_btn_h,
+            (150, 150, 150),
+            (0, 128, 255),
+            start_game,
+            False,
+        )
     )
+    return buttons
+
+
+def playing_buttons():
+    """对局界面右侧的半透明按钮，格式同 menu_buttons"""
+    btn_w = 150
+    btn_h = 50
+    x = BOARD_WIDTH + 20
+    y_first = BOARD_HEIGHT // 2 + 200
+    y_second = BOARD_HEIGHT // 2 + 280
+    colors = (BUTTON_BG_COLOR, BUTTON_HOVER_COLOR)
+
+    # 对局进行中：可以随时认输或返回主菜单（会取消 AI 的计算）
+    if not game.ended:
+        return [
+            ("认输", x, y_first, btn_w, btn_h, *colors, resign, True),
+            ("返回主菜单", x, y_second, btn_w, btn_h, *colors, back_to_menu, True),
+        ]
+    # 结束后稍等片刻再显示按钮，防止结束对局的那次点击落到按钮上
+    if time.time() - game_end_time > BUTTON_GUARD_TIME:
+        return [
+            ("返回主菜单", x, y_first, btn_w, btn_h, *colors, back_to_menu, True),
+            ("退出游戏", x, y_second, btn_w, btn_h, *colors, quit_game, True),
+        ]
+    return []
+
+
+def current_buttons():
+    return menu_buttons() if game_state == "menu" else playing_buttons()
 
 
 def set_difficulty(diff):
@@ -182,18 +356,15 @@ def start_game():
 
 def draw_button(text, x, y, w, h, color, hover_color, action=None, transparent=False):
     """
-    绘制按钮并检测点击
+    绘制按钮（点击由 click_button 在 MOUSEBUTTONUP 事件中分发）
     :param transparent: 若为 True，使用半透明绘制
     """
     mouse = pygame.mouse.get_pos()
-    click = pygame.mouse.get_pressed()
     btn_rect = pygame.Rect(x, y, w, h)
 
     # 判定鼠标是否在按钮范围内
     if btn_rect.collidepoint(mouse):
         bg_color = hover_color
-        if click[0] == 1 and action:
-            action()
     else:
         bg_color = color
 
@@ -207,369 +378,644 @@ def draw_button(text, x, y, w, h, color, hover_color, action=None, transparent=F
         pygame.draw.rect(screen, bg_color, btn_rect)
 
     # 绘制文字
-    txt_surf = font_medium.render(text, True, WHITE)
+    txt_surf = render_text(font_medium, text, WHITE)
     txt_rect = txt_surf.get_rect(center=btn_rect.center)
     screen.blit(txt_surf, txt_rect)
 
 
-def draw_board():
+def click_button(pos):
+    """
+    鼠标左键在 pos 处松开：触发该处按钮的回调，一次点击只触发一次；
+    返回是否点中了按钮
+    """
+    for text, x, y, w, h, color, hover_color, action, transparent in current_buttons():
+        if action and pygame.Rect(x, y, w, h).collidepoint(pos):
+            action()
+            return True
+    return False
+
+
+def draw_board(surface):
     """绘制棋盘和网格"""
-    pygame.draw.rect(screen, GRAY, (0, 0, BOARD_WIDTH, BOARD_HEIGHT))
+    pygame.draw.rect(surface, GRAY, (0, 0, BOARD_WIDTH, BOARD_HEIGHT))
     for i in range(GRID_SIZE + 1):
         # 垂直线
         start_x = i * CELL_SIZE
-        pygame.draw.line(screen, BLACK, (start_x, 0), (start_x, BOARD_HEIGHT), 1)
+        pygame.draw.line(surface, BLACK, (start_x, 0), (start_x, BOARD_HEIGHT), 1)
         # 水平线
         start_y = i * CELL_SIZE
-        pygame.draw.line(screen, BLACK, (0, start_y), (BOARD_WIDTH, start_y), 1)
-
-
-def draw_pieces():
-    """绘制棋子，并对AI最新落子做标识"""
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            piece = board[i][j]
-            center_x = i * CELL_SIZE + CELL_SIZE // 2
-            center_y = j * CELL_SIZE + CELL_SIZE // 2
-
-            if piece == 1:
-                # 黑棋
-                pygame.draw.circle(
-                    screen, BLACK, (center_x, center_y), CELL_SIZE // 2 - 2
-                )
-            elif piece == 2:
-                # 白棋
-                pygame.draw.circle(
-                    screen, WHITE, (center_x, center_y), CELL_SIZE // 2 - 2
-                )
-
-                # 如果这颗白棋是AI刚刚下的那一子，则额外绘制一个红色圆环标识
-                if ai_last_move is not None and (i, j) == ai_last_move:
-                    pygame.draw.circle(
-                        screen,
-                        RED,
-                        (center_x, center_y),
-                        CELL_SIZE // 2 - 2,
-                        width=2,  # 圆环边框宽度
-                    )
+        pygame.draw.line(surface, BLACK, (0, start_y), (BOARD_WIDTH, start_y), 1)
+
+
+def draw_piece(surface, i, j):
+    """绘制 (i, j) 处的棋子，并对AI最新落子做标识"""
+    piece = game.board[i][j]
+    center_x = i * CELL_SIZE + CELL_SIZE // 2
+    center_y = j * CELL_SIZE + CELL_SIZE // 2
+
+    if piece == 1:
+        # 黑棋
+        pygame.draw.circle(surface, BLACK, (center_x, center_y), CELL_SIZE // 2 - 2)
+    elif piece == 2:
+        # 白棋
+        pygame.draw.circle(surface, WHITE, (center_x, center_y), CELL_SIZE // 2 - 2)
+
+        # 如果这颗白棋是AI刚刚下的那一子，则额外绘制一个红色圆环标识
+        if ai_last_move is not None and (i, j) == ai_last_move:
+            pygame.draw.circle(
+                surface,
+                RED,
+                (center_x, center_y),
+                CELL_SIZE // 2 - 2,
+                width=2,  # 圆环边框宽度
+            )
 
 
-def highlight_square():
-    """根据鼠标位置高亮当前方格"""
-    if current_player == 1 and not game_ended:
+def cell_rect(i, j):
+    """(i, j) 格子在屏幕上的区域（含右侧和下方的网格线）"""
+    return pygame.Rect(i * CELL_SIZE, j * CELL_SIZE, CELL_SIZE + 1, CELL_SIZE + 1)
+
+
+def redraw_cell(surface, i, j):
+    """在棋盘图层上重画单个格子：底色、四条边线与棋子"""
+    left, top = i * CELL_SIZE, j * CELL_SIZE
+    right, bottom = left + CELL_SIZE, top + CELL_SIZE
+    pygame.draw.rect(surface, GRAY, (left, top, CELL_SIZE, CELL_SIZE))
+    pygame.draw.line(surface, BLACK, (left, top), (right, top), 1)
+    pygame.draw.line(surface, BLACK, (left, top), (left, bottom), 1)
+    if right < BOARD_WIDTH:
+        pygame.draw.line(surface, BLACK, (right, top), (right, bottom), 1)
+    if bottom < BOARD_HEIGHT:
+        pygame.draw.line(surface, BLACK, (left, bottom), (right, bottom), 1)
+    draw_piece(surface, i, j)
+
+
+def sync_board_layer():
+    """
+    让缓存的棋盘图层与当前对局一致，返回需要重绘的屏幕区域。
+    网格只在新对局开始时画一次，之后每手棋（包括悔棋、重做与跳转）只重画增减了棋子的格子
+    和 AI 标记移动过的格子。
+    """
+    global board_layer, layer_game, layer_moves, layer_marker
+    moves = tuple(game.moves)
+    if board_layer is None or layer_game is not game:
+        if board_layer is None:
+            board_layer = pygame.Surface((BOARD_WIDTH, BOARD_HEIGHT))
+        draw_board(board_layer)
+        for i in range(GRID_SIZE):
+            for j in range(GRID_SIZE):
+                draw_piece(board_layer, i, j)
+        layer_game = game
+        layer_moves = moves
+        layer_marker = ai_last_move
+        return [pygame.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT)]
+
+    # 图层上的落子与当前落子的公共前缀之后，撤掉的和新下的格子都要重画
+    common = 0
+    limit = min(len(layer_moves), len(moves))
+    while common < limit and layer_moves[common] == moves[common]:
+        common += 1
+    cells = list(layer_moves[common:] + moves[common:])
+    if layer_marker != ai_last_move:
+        cells += [move for move in (layer_marker, ai_last_move) if move is not None]
+    for i, j in cells:
+        redraw_cell(board_layer, i, j)
+    layer_moves = moves
+    layer_marker = ai_last_move
+    return [cell_rect(i, j) for i, j in cells]
+
+
+def hover_cell():
+    """轮到玩家时鼠标所在的格子，否则为 None"""
+    if game.current_player == 1 and not game.ended:
         mouse_x, mouse_y = pygame.mouse.get_pos()
         # 仅在棋盘区域内才执行
         if 0 <= mouse_x < BOARD_WIDTH and 0 <= mouse_y < BOARD_HEIGHT:
-            row = mouse_x // CELL_SIZE
-            col = mouse_y // CELL_SIZE
-            rect_x = row * CELL_SIZE
-            rect_y = col * CELL_SIZE
-            pygame.draw.rect(screen, BLACK, (rect_x, rect_y, CELL_SIZE, CELL_SIZE), 3)
+            return (mouse_x // CELL_SIZE, mouse_y // CELL_SIZE)
+    return None
+
+
+def highlight_square():
+    """根据鼠标位置高亮当前方格"""
+    cell = hover_cell()
+    if cell is not None:
+        rect_x = cell[0] * CELL_SIZE
+        rect_y = cell[1] * CELL_SIZE
+        pygame.draw.rect(screen, BLACK, (rect_x, rect_y, CELL_SIZE, CELL_SIZE), 3)
 
 
 def display_info():
     """显示顶部文字信息：当前玩家、难度等"""
-    if current_player == 1:
+    if game.current_player == 1:
         player_text = "黑棋"
     else:
         player_text = "白棋 (AI)"
-    txt = font_small.render(
-        f"当前玩家: {player_text}   难度: {selected_difficulty}", True, RED
+    txt = render_text(
+        font_small, f"当前玩家: {player_text}   难度: {selected_difficulty}", RED
     )
     screen.blit(txt, (10, 10))
 
 
+def history_window():
+    """
+    面板中显示的记录 (起始手数, 记录)：当前分支（含可重做的棋）中最多 HISTORY_ROWS 行，
+    尽量让当前所在的一手留在窗口中
+    """
+    line = game.line
+    end = min(len(line), len(game.history) + HISTORY_ROWS // 2)
+    start = max(0, end - HISTORY_ROWS)
+    return start, line[start : start + HISTORY_ROWS]
+
+
 def display_history():
-    """在右侧区域显示走棋历史"""
-    pygame.draw.rect(
-        screen, WHITE, (BOARD_WIDTH, 0, SCREEN_WIDTH - BOARD_WIDTH, SCREEN_HEIGHT)
+    """
+    在右侧区域显示走棋历史（面板缓存为一张 Surface，记录变化时才重画）。
+    当前所在的一手标为蓝色，悔掉可以重做的棋为灰色
+    """
+    global history_pane, history_pane_key
+    current = len(game.history)
+    start, recent_moves = history_window()
+    key = (start, current, tuple(entry["move"] for entry in recent_moves))
+    if history_pane_key != key:
+        if history_pane is None:
+            history_pane = pygame.Surface((SCREEN_WIDTH - BOARD_WIDTH, SCREEN_HEIGHT))
+        width, height = history_pane.get_size()
+        pygame.draw.rect(history_pane, WHITE, (0, 0, width, height))
+        pygame.draw.rect(history_pane, BLACK, (0, 0, width, height), 2)
+
+        title = render_text(font_medium, "对局记录", BLACK)
+        history_pane.blit(title, (10, 10))
+
+        # 每一行的文字只与步数和落子有关，滚动时旧行直接取缓存，只有新增的一行需要渲染
+        for idx, entry in enumerate(recent_moves):
+            player = "黑棋" if entry["player"] == 1 else "白棋"
+            move = entry["move"]
+            move_txt = f"{start+idx+1}. {player} -> ({move[0]}, {move[1]})"
+            if start + idx + 1 == current:
+                color = BLUE
+            elif start + idx + 1 > current:
+                color = (150, 150, 150)
+            else:
+                color = BLACK
+            text = render_text(font_small, move_txt, color)
+            history_pane.blit(text, (10, HISTORY_TOP + idx * HISTORY_ROW_HEIGHT))
+        history_pane_key = key
+    screen.blit(history_pane, (BOARD_WIDTH, 0))
+
+
+def click_history(pos):
+    """鼠标在 pos 处松开：点中对局记录的某一行时跳到该手之后"""
+    mx, my = pos
+    if mx < BOARD_WIDTH or my < HISTORY_TOP:
+        return
+    start, recent_moves = history_window()
+    idx = (my - HISTORY_TOP) // HISTORY_ROW_HEIGHT
+    if idx < len(recent_moves):
+        navigate(start + idx + 1)
+
+
+def navigate(ply):
+    """
+    悔棋/重做/跳转到第 ply 手之后（0 为空棋盘），会取消 AI 正在进行的计算。
+    回到分支末尾且轮到 AI 时继续由 AI 落子；停在中间时只浏览，玩家落子后从该处开始新分支
+    """
+    global ai_last_move
+    ply = max(0, min(ply, len(game.history) + len(game.redo_stack)))
+    if ply == len(game.history):
+        return
+    cancel_ai()
+    game.jump_to(ply)
+    # AI 标记跟随到当前局面中 AI 的最后一手
+    ai_last_move = next(
+        (entry["move"] for entry in reversed(game.history) if entry["player"] == 2),
+        None,
     )
-    pygame.draw.rect(
-        screen, BLACK, (BOARD_WIDTH, 0, SCREEN_WIDTH - BOARD_WIDTH, SCREEN_HEIGHT), 2
+    if not game.redo_stack and not game.ended:
+        if game.current_player == 2:
+            start_ai_turn()
+        else:
+            start_pondering()
+
+
+def overlay_state():
+    """棋盘中央提示文字的状态：思考中（含省略号动画）、AI 出错、胜负，或无提示"""
+    if game.current_player == 2 and ai_thinking and not game.ended:
+        return ("thinking", pygame.time.get_ticks() // 400 % 4)
+    if ai_error is not None and not game.ended:
+        return ("error", ai_error)
+    if game.ended:
+        return ("ended", game.winner)
+    return None
+
+
+def display_overlay():
+    """在棋盘中央显示“AI 正在思考...”、AI 出错或胜负提示"""
+    state = overlay_state()
+    if state is None:
+        return
+    kind, value = state
+    if kind == "thinking":
+        # 显示“AI 正在思考...”文字，省略号随时间变化
+        text = render_text(font_medium, f"AI 正在思考{'.' * value}", BLUE)
+    elif kind == "error":
+        text = render_text(font_medium, "AI 计算出错，请悔棋(←)重算或认输", RED)
+    elif value == 1:
+        text = render_text(font_large, "黑棋 获胜!", RED)
+    elif value == 2:
+        text = render_text(font_large, "白棋 (AI) 获胜!", RED)
+    else:
+        text = render_text(font_large, "和棋", RED)
+    screen.blit(
+        text,
+        (
+            BOARD_WIDTH // 2 - text.get_width() // 2,
+            BOARD_HEIGHT // 2 - text.get_height() // 2,
+        ),
     )
 
-    title = font_medium.render("对局记录", True, BLACK)
-    screen.blit(title, (BOARD_WIDTH + 10, 10))
-
-    recent_moves = history[-20:]  # 显示最近20步
-    for idx, entry in enumerate(recent_moves):
-        player = "黑棋" if entry["player"] == 1 else "白棋"
-        move = entry["move"]
-        move_txt = f"{len(history)-len(recent_moves)+idx+1}. {player} -> ({move[0]}, {move[1]})"
-        text = font_small.render(move_txt, True, BLACK)
-        screen.blit(text, (BOARD_WIDTH + 10, 50 + idx * 20))
-
-
-def add_to_history(player, move):
-    """将移动添加到历史中"""
-    history.append({"player": player, "move": move})
-
-
-def check_winner(board, player):
-    """检查是否五连珠"""
-    for x in range(GRID_SIZE):
-        for y in range(GRID_SIZE):
-            if board[x][y] == player:
-                # 横向
-                if y <= GRID_SIZE - 5 and all(
-                    board[x][y + k] == player for k in range(5)
-                ):
-                    return True
-                # 纵向
-                if x <= GRID_SIZE - 5 and all(
-                    board[x + k][y] == player for k in range(5)
-                ):
-                    return True
-                # 主对角线
-                if (
-                    x <= GRID_SIZE - 5
-                    and y <= GRID_SIZE - 5
-                    and all(board[x + k][y + k] == player for k in range(5))
-                ):
-                    return True
-                # 副对角线
-                if (
-                    x <= GRID_SIZE - 5
-                    and y >= 4
-                    and all(board[x + k][y - k] == player for k in range(5))
-                ):
-                    return True
-    return False
 
+def frame_state():
+    """
+    当前帧各界面区域的状态，与上一帧比较即可知道哪些区域需要重绘：
+    (界面, 悬停格子, 顶部信息, 中央提示, 右侧面板, 性能叠加层)
+    """
+    if game_state == "menu":
+        hovered = [
+            pygame.Rect(b[1:5]).collidepoint(pygame.mouse.get_pos())
+            for b in menu_buttons()
+        ]
+        return ("menu", None, selected_difficulty, None, tuple(hovered), None)
+    mouse = pygame.mouse.get_pos()
+    buttons = tuple(
+        (b[0], pygame.Rect(b[1:5]).collidepoint(mouse)) for b in playing_buttons()
+    )
+    return (
+        "playing",
+        hover_cell(),
+        game.current_player,
+        overlay_state(),
+        (len(game.history), game.last_move, len(game.redo_stack), buttons),
+        tuple(profiler.overlay_lines()) if show_profile else None,
+    )
+
+
+def dirty_regions(previous, current):
+    """比较前后两帧的状态，返回需要重绘的屏幕区域；返回 None 表示整屏重绘"""
+    if previous is None or previous[0] != current[0] or current[0] == "menu":
+        return None if previous != current else []
+    regions = []
+    if previous[1] != current[1]:
+        # 悬停方框从旧格子移到新格子
+        for cell in (previous[1], current[1]):
+            if cell is not None:
+                regions.append(cell_rect(*cell))
+    if previous[2] != current[2]:
+        regions.append(INFO_RECT)
+    if previous[3] != current[3]:
+        regions.append(OVERLAY_RECT)
+    if previous[4] != current[4]:
+        regions.append(HISTORY_RECT)
+    if previous[5] != current[5]:
+        regions.append(PROFILE_RECT)
+    return regions
+
+
+def draw_playing():
+    """绘制对局界面；调用方可以先设置裁剪区域，只重绘其中的一部分"""
+    screen.blit(board_layer, (0, 0))
+    highlight_square()
+
+    # 右侧历史战绩
+    display_history()
+
+    # 顶部文字（当前玩家、难度）
+    display_info()
+
+    # 若AI正在"思考"或对局已结束，则显示提示
+    display_overlay()
+
+    # 半透明按钮
+    for button in playing_buttons():
+        draw_button(*button)
+
+    if show_profile:
+        display_profile()
+
+
+def display_profile():
+    """在棋盘右上角显示性能叠加层：帧耗时分位数与最近一步 AI 的统计"""
+    x, y, w, h = PROFILE_RECT
+    panel = pygame.Surface((w, h), pygame.SRCALPHA)
+    panel.fill((255, 255, 255, 200))
+    screen.blit(panel, (x, y))
+    for i, line in enumerate(profiler.overlay_lines()):
+        screen.blit(render_text(font_small, line, BLACK), (x + 8, y + 5 + i * 23))
+
+
+def start_ai_turn():
+    """切换到 AI 回合，并在后台线程中开始计算，主循环不会被阻塞"""
+    global ai_thinking, ai_move_time, ai_result_ready, ai_pending_move, ai_thread
+    global ai_error
+    ai_thinking = True
+    ai_error = None
+    ai_move_time = time.time() + AI_DELAY
+    ai_result_ready = False
+    ai_pending_move = None
+    # 工作线程只使用对局副本，绘制时不会看到搜索中临时落下的棋子
+    start = time.perf_counter()
+    snapshot = game.copy()
+    copy_ms = (time.perf_counter() - start) * 1000
+    ai_thread = threading.Thread(
+        target=ai_worker, args=(ai_token, snapshot, copy_ms), daemon=True
+    )
+    ai_thread.start()
+
+
+def ai_worker(token, snapshot, copy_ms):
+    """
+    工作线程入口：计算落子，连同本步的统计放入结果队列。
+    计算出错时放入 (token, None, {"source": "error", ...})，界面据此结束思考状态并提示
+    """
+    start = time.perf_counter()
+    try:
+        move = snapshot.choose_ai_move()
+        wall_ms = (time.perf_counter() - start) * 1000
+        report_ai_move(snapshot, move)
+        if snapshot.difficulty == "测试":
+            stats = {"source": "random"}
+        else:
+            stats = dict(snapshot.engine.last_stats)
+        stats.update(copy_ms=copy_ms, wall_ms=wall_ms)
+    except Exception as e:
+        traceback.print_exc()
+        move = None
+        stats = {"source": "error", "error": f"{type(e).__name__}: {e}"}
+    ai_results.put((token, move, stats))
+    try:
+        pygame.event.post(pygame.event.Event(AI_DONE_EVENT))
+    except pygame.error:
+        pass  # 窗口已关闭
+
+
+def report_ai_move(snapshot, move):
+    """在控制台输出本次 AI 计算的情况"""
+    engine = snapshot.engine
+    if snapshot.difficulty == "测试":
+        return
+    if engine.last_threat is not None:
+        print(f"AI 威胁求解: {engine.last_threat.kind} -> {move}")
+        return
+    if engine.last_book_move is not None:
+        print(f"AI 开局库: {move}")
+        return
+    result = engine.last_result
+    print(
+        f"AI 搜索深度: {result.depth}  节点数: {result.nodes}  "
+        f"耗时: {result.elapsed * 1000:.0f}ms  速度: {result.nps:.0f} 节点/秒  "
+        f"置换表命中: {engine.tt.hits}"
+    )
+
+
+def cancel_ai():
+    """
+    取消正在进行的 AI 计算（含后台思考）并等待工作线程退出，之后才能在同一个引擎上开始新的搜索；
+    已发出的结果会因 token 过期而被丢弃
+    """
+    global ai_token, ai_thinking, ai_thread, ai_error
+    ai_token += 1
+    ponderer.stop()
+    thread, engine = ai_thread, game.engine
+    # 搜索开始时会清除停止请求，因此反复请求直到线程退出（同 Ponderer.stop）
+    while thread is not None and thread.is_alive():
+        engine.stop()
+        thread.join(0.01)
+    ai_thread = None
+    ai_thinking = False
+    ai_error = None
 
-def heuristic_score(board, player):
-    """简单启发式评分函数"""
-    directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
-    score = 0
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            if board[i][j] != player:
-                continue
-            for d in directions:
-                count = 1
-                for k in range(1, 5):
-                    nx = i + d[0] * k
-                    ny = j + d[1] * k
-                    if not (0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE):
-                        break
-                    if board[nx][ny] == player:
-                        count += 1
-                    else:
-                        break
-                if count == 2:
-                    score += 10
-                elif count == 3:
-                    score += 100
-                elif count == 4:
-                    score += 1000
-                elif count >= 5:
-                    score += 100000
-    return score
-
-
-def ai_move():
+
+def start_pondering():
+    """轮到玩家时开始后台思考"""
+    if ponder_enabled:
+        ponderer.start(game)
+
+
+def reply_to_player():
+    """玩家落子后：后台思考已算好这一手的应对时立即落子，否则在后台线程中开始计算"""
+    answer = ponderer.take(game)
+    if answer is None:
+        start_ai_turn()
+        return
+    move, stats = answer
+    print(f"AI 预想命中: {move}")
+    if profiler is not None:
+        profiler.record_move(len(game.history) + 1, move, stats)
+    ai_move(move)
+
+
+def poll_ai():
+    """
+    主循环每次醒来时调用：取出属于当前对局的计算结果，等到显示延迟结束后落子；
+    计算出错时结束思考状态并显示错误，玩家可以悔棋重算或认输
+    """
+    global ai_result_ready, ai_pending_move, ai_thinking, ai_error
+    while True:
+        try:
+            token, move, stats = ai_results.get_nowait()
+        except queue.Empty:
+            break
+        if token == ai_token and stats["source"] == "error":
+            print(f"AI 计算出错: {stats['error']}")
+            ai_thinking = False
+            ai_error = stats["error"]
+            return
+        if token == ai_token:
+            if profiler is not None:
+                profiler.record_move(len(game.history) + 1, move, stats)
+            ai_result_ready = True
+            ai_pending_move = move
+    if ai_result_ready and time.time() >= ai_move_time:
+        ai_result_ready = False
+        ai_move(ai_pending_move)
+
+
+def ai_move(move):
     """AI 落子逻辑"""
-    global current_player, winner, game_ended
     global ai_thinking, ai_move_time, ai_last_move  # 注意声明
 
-    diff = selected_difficulty
-
-    # Common：略微攻防
-    if diff == "Common":
-        move = ai_move_heuristic(1.0, 1.1)
-    # Medium：更强调进攻(1.5 : 1.2)
-    elif diff == "Medium":
-        move = ai_move_heuristic(1.5, 1.2)
-    # Hard：更加强调进攻(2.0 : 1.3)
-    elif diff == "Hard":
-        move = ai_move_heuristic(2.0, 1.3)
-    # 完全随机
-    elif diff == "测试":
-        move = ai_move_random()
-
     if not move:
         return
 
-    board[move[0]][move[1]] = 2  # 白棋
+    game.place(move[0], move[1])  # 白棋，落子后自动切回黑棋
     ai_last_move = (move[0], move[1])  # 记录AI最后一手
-    add_to_history(2, move)
 
     # 检查是否胜利
-    if check_winner(board, 2):
-        winner = 2
-        game_ended = True
+    if game.ended:
+        finish_game()
     else:
-        # 切回黑棋
-        current_player = 1
         ai_thinking = False
         ai_move_time = 0
+        start_pondering()
 
 
-def ai_move_random():
-    """AI随机落子"""
-    empty_cells = [
-        (x, y) for x in range(GRID_SIZE) for y in range(GRID_SIZE) if board[x][y] == 0
-    ]
-    if not empty_cells:
-        return None
-    return random.choice(empty_cells)
-
-
-def ai_move_heuristic(attack_factor=1.0, defend_factor=1.1):
-    """使用启发式评分，考虑进攻和防守"""
-    best_score = -float("inf")
-    best_moves = []
-    empty_cells = [
-        (x, y) for x in range(GRID_SIZE) for y in range(GRID_SIZE) if board[x][y] == 0
-    ]
-    if not empty_cells:
+def wait_timeout():
+    """
+    主循环最多空等多少毫秒；None 表示没有定时任务，一直等到有输入。
+    定时任务有：AI 思考提示的省略号动画与落子延迟、对局结束后按钮的出现。
+    """
+    now = time.time()
+    if game_state != "playing":
         return None
-
-    for x, y in empty_cells:
-        # AI落子分数
-        board[x][y] = 2
-        score_ai = heuristic_score(board, 2)
-        # 玩家潜在分数
-        board[x][y] = 1
-        score_player = heuristic_score(board, 1)
-        # 还原为空
-        board[x][y] = 0
-
-        # 综合分数：更注重进攻(attack_factor) 和 防守(defend_factor)
-        total_score = attack_factor * score_ai + defend_factor * score_player
-        if total_score > best_score:
-            best_score = total_score
-            best_moves = [(x, y)]
-        elif abs(total_score - best_score) < 1e-9:
-            best_moves.append((x, y))
-
-    return random.choice(best_moves)
-
-
-# --- 主循环 ---
-while not game_quit:
-    clock.tick(60)  # FPS限制
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            game_quit = True
-
-        # 菜单状态时只响应按钮点击
-        if game_state == "menu":
-            pass
-
-        # 对局状态
-        elif game_state == "playing":
-            if not game_ended:
-                # 玩家下子
-                if (
-                    event.type == pygame.MOUSEBUTTONDOWN
-                    and current_player == 1
-                    and not ai_thinking
-                ):
-                    mx, my = pygame.mouse.get_pos()
-                    if 0 <= mx < BOARD_WIDTH and 0 <= my < BOARD_HEIGHT:
-                        row = mx // CELL_SIZE
-                        col = my // CELL_SIZE
-                        if board[row][col] == 0:
-                            board[row][col] = 1
-                            add_to_history(1, (row, col))
-                            # 如果玩家形成五连珠
-                            if check_winner(board, 1):
-                                winner = 1
-                                time.sleep(0.3)  # 等待0.3秒，防止立即点击到按钮
-                                game_ended = True
-                            else:
-                                # 切换到 AI
-                                current_player = 2
-                                ai_thinking = True
-                                ai_move_time = time.time() + AI_DELAY
-            else:
-                # 对局结束后，处理“重新开始”或“退出游戏”按钮点击
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pass
-
-    # --- 绘制逻辑 ---
-    screen.fill(GRAY)
-
-    if game_state == "menu":
-        draw_menu()
+    if ai_thinking and not game.ended:
+        # 下一次省略号变化（每 400ms）
+        timeout = 400 - pygame.time.get_ticks() % 400
+        if ai_result_ready:
+            timeout = min(timeout, int((ai_move_time - now) * 1000) + 1)
+        return max(1, timeout)
+    if game.ended and now - game_end_time <= BUTTON_GUARD_TIME:
+        return max(1, int((game_end_time + BUTTON_GUARD_TIME - now) * 1000) + 1)
+    return None
+
+
+def wait_events(timeout):
+    """阻塞到有事件或超时，返回这段时间内的全部事件（超时则为空列表）"""
+    if timeout is None:
+        event = pygame.event.wait()
     else:
-        # 绘制棋盘
-        draw_board()
-        draw_pieces()
-        highlight_square()
-
-        # 右侧历史战绩
-        display_history()
-
-        # 顶部文字（当前玩家、难度）
-        display_info()
-
-        # 若AI正在"思考"，则显示提示
-        if current_player == 2 and ai_thinking and not game_ended:
-            # 显示“AI 正在思考...”文字
-            thinking_txt = font_medium.render("AI 正在思考...", True, BLUE)
-            screen.blit(
-                thinking_txt,
-                (
-                    BOARD_WIDTH // 2 - thinking_txt.get_width() // 2,
-                    BOARD_HEIGHT // 2 - thinking_txt.get_height() // 2,
-                ),
-            )
-
-            now = time.time()
-            if now >= ai_move_time:
-                ai_move()
-
-        # 如果对局已结束，显示胜者并绘制半透明按钮
-        if game_ended and winner is not None:
-            if winner == 1:
-                text = font_large.render("黑棋 获胜!", True, RED)
+        event = pygame.event.wait(timeout)
+    events = [] if event.type == pygame.NOEVENT else [event]
+    return events + pygame.event.get()
+
+
+def main(argv=None):
+    """主循环"""
+    global game, game_quit, profiler, profile_path, show_profile, search_workers
+    global ponder_enabled
+    parser = argparse.ArgumentParser(description="五子棋 - 人机对战")
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="记录 AI 每步统计与帧耗时，退出时写入 JSON/CSV",
+    )
+    parser.add_argument(
+        "--overlay", action="store_true", help="在棋盘上显示性能叠加层（F3 切换）"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Hard 难度并行搜索的进程数，默认为 CPU 核数，1 表示不并行",
+    )
+    parser.add_argument(
+        "--no-ponder",
+        action="store_true",
+        help="轮到玩家时不在后台预先计算 AI 的应对",
+    )
+    args = parser.parse_args(argv)
+    search_workers = args.workers
+    ponder_enabled = not args.no_ponder
+    if args.profile or args.overlay:
+        profiler = Profiler()
+        profile_path = args.profile
+        show_profile = args.overlay
+
+    game = Game()
+    init_display()
+    last_state = None  # 上一帧的界面状态，用于判断哪些区域需要重绘
+    while not game_quit:
+        # 空闲时阻塞等待输入、AI 结果或定时任务，不再每秒空转 60 帧
+        for event in wait_events(wait_timeout()):
+            if event.type == pygame.QUIT:
+                save_record()
+                game_quit = True
+
+            elif (
+                event.type == pygame.KEYDOWN
+                and event.key == pygame.K_F3
+                and profiler is not None
+            ):
+                show_profile = not show_profile
+
+            # 对局记录导航：← 悔一手，→ 重做一手，Home/End 跳到开头/末尾
+            elif (
+                game_state == "playing"
+                and event.type == pygame.KEYDOWN
+                and event.key in NAVIGATION_KEYS
+            ):
+                navigate(NAVIGATION_KEYS[event.key](len(game.history)))
+
+            # 按钮与对局记录在鼠标左键松开时触发
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                if not click_button(event.pos) and game_state == "playing":
+                    click_history(event.pos)
+
+            # 对局状态：玩家下子
+            elif (
+                game_state == "playing"
+                and not game.ended
+                and event.type == pygame.MOUSEBUTTONDOWN
+                and event.button == 1
+                and game.current_player == 1
+                and not ai_thinking
+            ):
+                mx, my = event.pos
+                if 0 <= mx < BOARD_WIDTH and 0 <= my < BOARD_HEIGHT:
+                    row = mx // CELL_SIZE
+                    col = my // CELL_SIZE
+                    if game.is_legal(row, col):
+                        game.place(row, col)
+                        # 如果玩家形成五连珠
+                        if game.ended:
+                            finish_game()
+                        else:
+                            # 切换到 AI（预想命中时立即落子，否则后台线程计算）
+                            reply_to_player()
+
+        # AI 结果
+        if game_state == "playing" and ai_thinking:
+            poll_ai()
+
+        # --- 绘制逻辑：只重绘发生变化的区域 ---
+        frame_start = time.perf_counter()
+        state = frame_state()
+        if game_state == "menu":
+            regions = dirty_regions(last_state, state)
+            if regions is None:
+                screen.fill(GRAY)
+                draw_menu()
+                pygame.display.flip()
+            drawn = regions is None or bool(regions)
+        else:
+            regions = sync_board_layer()
+            changed = dirty_regions(last_state, state)
+            if changed is None:
+                screen.fill(GRAY)
+                draw_playing()
+                pygame.display.flip()
+                drawn = True
             else:
-                text = font_large.render("白棋 (AI) 获胜!", True, RED)
-
-            screen.blit(
-                text,
-                (
-                    BOARD_WIDTH // 2 - text.get_width() // 2,
-                    BOARD_HEIGHT // 2 - text.get_height() // 2,
-                ),
-            )
-
-            # 半透明按钮
-            btn_w = 150
-            btn_h = 50
-            space = 20
-
-            x_restart = BOARD_WIDTH + 20
-            y_restart = BOARD_HEIGHT // 2 + 200
-            draw_button(
-                "返回主菜单",
-                x_restart,
-                y_restart,
-                btn_w,
-                btn_h,
-                BUTTON_BG_COLOR,
-                BUTTON_HOVER_COLOR,
-                back_to_menu,
-                transparent=True,
-            )
-
-            x_quit = BOARD_WIDTH + 20
-            y_quit = BOARD_HEIGHT // 2 + 280
-            draw_button(
-                "退出游戏",
-                x_quit,
-                y_quit,
-                btn_w,
-                btn_h,
-                BUTTON_BG_COLOR,
-                BUTTON_HOVER_COLOR,
-                quit_game,
-                transparent=True,
-            )
-
-    pygame.display.flip()
-
-pygame.quit()
-sys.exit()
+                regions += changed
+                for rect in regions:
+                    screen.set_clip(rect)
+                    draw_playing()
+                screen.set_clip(None)
+                if regions:
+                    pygame.display.update(regions)
+                drawn = bool(regions)
+        # 只统计实际发生了绘制的帧
+        if profiler is not None and drawn:
+            profiler.record_frame(time.perf_counter() - frame_start)
+        last_state = state
+        clock.tick(60)  # 连续输入（如鼠标移动）时限制重绘频率
+
+    if profile_path:
+        profiler.write(profile_path)
+        print(f"性能记录已写入 {profile_path}")
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    # 打包成可执行文件后，并行搜索的子进程也从这里启动
+    multiprocessing.freeze_support()
+    main()
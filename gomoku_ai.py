@@ -0,0 +1,559 @@
+"""
+五子棋 AI：胜负判定、增量评分、候选点生成与 alpha-beta 搜索。
+
+本模块不依赖 pygame，可以在无界面环境下导入、对弈或做基准测试。
+棋盘为 GRID_SIZE x GRID_SIZE 的二维列表，board[x][y] 取值 0=空，1=黑棋，2=白棋。
+"""
+
+import time
+from collections import namedtuple
+
+import bitboard
+import symmetry
+from line_patterns import LineShapes
+from opening_book import load_book
+from threat_solver import ThreatSolver
+from zobrist import EXACT, LOWER, UPPER, TranspositionTable, ZobristHash
+
+# 棋盘网格
+GRID_SIZE = 25
+
+CANDIDATE_RADIUS = 2  # AI 只考虑距离已有棋子不超过该格数的空位
+
+
+def _numpy_backend(board):
+    """
+    board 为 NumPy 数组时返回 numpy_board 模块（可选：用于离线批量分析），否则返回 None。
+    列表棋盘不会触发 numpy 的导入，保证无界面启动足够快。
+    """
+    if isinstance(board, list):
+        return None
+    try:
+        import numpy_board
+    except ImportError:
+        return None
+    return numpy_board if numpy_board.is_array(board) else None
+
+
+# 各难度的搜索预算：每步时间(毫秒)与最大深度，棋力随机器性能提升；
+# parallel 表示界面在多核机器上为该难度使用多进程并行搜索（见 parallel_search.make_engine）
+DIFFICULTY_BUDGETS = {
+    "Common": {"time_ms": 300, "max_depth": 2},
+    "Medium": {"time_ms": 800, "max_depth": 4},
+    "Hard": {"time_ms": 2000, "max_depth": 10, "parallel": True},
+}
+
+
+def check_winner(board, player):
+    """检查是否五连珠（全盘扫描，仅作校验用，对局中请用 check_winner_at）"""
+    backend = _numpy_backend(board)
+    if backend is not None:
+        return backend.check_winner(board, player)
+    return bitboard.has_five(bitboard.from_board(board)[player])
+
+
+def check_winner_at(board, x, y, player):
+    """检查 (x, y) 处刚落下的棋子是否形成五连珠，只沿经过该点的四条线计数"""
+    for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        count = 1
+        # 正方向
+        nx, ny = x + dx, y + dy
+        while 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and board[nx][ny] == player:
+            count += 1
+            nx += dx
+            ny += dy
+        # 反方向
+        nx, ny = x - dx, y - dy
+        while 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and board[nx][ny] == player:
+            count += 1
+            nx -= dx
+            ny -= dy
+        if count >= 5:
+            return True
+    return False
+
+
+def heuristic_score(board, player):
+    """
+    简单启发式评分函数：每颗棋子沿四个方向向前数连续的己方棋子，
+    数到 2/3/4/5 颗分别计 10/100/1000/100000 分（用位棋盘的移位与按位与统计）
+    """
+    backend = _numpy_backend(board)
+    if backend is not None:
+        return backend.heuristic_score(board, player)
+    return bitboard.pattern_score(bitboard.from_board(board)[player])
+
+
+# 连子长度 -> heuristic_score 中对应的分值
+RUN_SCORES = {2: 10, 3: 100, 4: 1000, 5: 100000}
+
+# 长度为 L 的极大连子在 heuristic_score 中的总分：
+# 连子中每颗棋子向前数到的长度依次为 L, L-1, ..., 1（最多数到 5）
+RUN_TOTALS = [
+    sum(RUN_SCORES.get(min(length - k, 5), 0) for k in range(length))
+    for length in range(GRID_SIZE + 1)
+]
+
+
+class PatternEvaluator:
+    """
+    增量维护的棋型评分表，与 heuristic_score 的结果完全一致。
+    按方向记录双方每种长度的极大连子数量，落子/提子时只更新经过该点的四条线，
+    因此可以直接算出某一候选点落子后的分数变化，而不必重新扫描全盘。
+    """
+
+    DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+    def __init__(self, board):
+        self.board = board
+        # run_counts[player][length]：该方极大连子（四个方向合计）的数量
+        self.run_counts = {1: [0] * (GRID_SIZE + 1), 2: [0] * (GRID_SIZE + 1)}
+        self.scores = {1: 0, 2: 0}
+        self._rebuild()
+
+    def _rebuild(self):
+        """从当前棋盘全量统计一次连子"""
+        for i in range(GRID_SIZE):
+            for j in range(GRID_SIZE):
+                player = self.board[i][j]
+                if player == 0:
+                    continue
+                for dx, dy in self.DIRECTIONS:
+                    px, py = i - dx, j - dy
+                    # 只从连子的起点开始数
+                    if (
+                        0 <= px < GRID_SIZE
+                        and 0 <= py < GRID_SIZE
+                        and self.board[px][py] == player
+                    ):
+                        continue
+                    length = 1
+                    nx, ny = i + dx, j + dy
+                    while (
+                        0 <= nx < GRID_SIZE
+                        and 0 <= ny < GRID_SIZE
+                        and self.board[nx][ny] == player
+                    ):
+                        length += 1
+                        nx += dx
+                        ny += dy
+                    self.run_counts[player][length] += 1
+                    self.scores[player] += RUN_TOTALS[length]
+
+    def _arms(self, x, y, player):
+        """依次返回四个方向上 (x, y) 两侧紧邻的己方连子长度"""
+        board = self.board
+        for dx, dy in self.DIRECTIONS:
+            a = 0
+            nx, ny = x + dx, y + dy
+            while (
+                0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and board[nx][ny] == player
+            ):
+                a += 1
+                nx += dx
+                ny += dy
+            b = 0
+            nx, ny = x - dx, y - dy
+            while (
+                0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and board[nx][ny] == player
+            ):
+                b += 1
+                nx -= dx
+                ny -= dy
+            yield a, b
+
+    def score(self, player):
+        """当前局面下 player 的启发式分数"""
+        return self.scores[player]
+
+    def delta(self, x, y, player):
+        """在空位 (x, y) 落下 player 的棋子后，player 分数的变化量（不修改状态）"""
+        total = 0
+        for a, b in self._arms(x, y, player):
+            total += RUN_TOTALS[a + b + 1] - RUN_TOTALS[a] - RUN_TOTALS[b]
+        return total
+
+    def place(self, x, y, player):
+        """记录 (x, y) 处落下 player 的棋子（棋盘本身由调用方修改）"""
+        counts = self.run_counts[player]
+        for a, b in self._arms(x, y, player):
+            if a:
+                counts[a] -= 1
+            if b:
+                counts[b] -= 1
+            counts[a + b + 1] += 1
+            self.scores[player] += RUN_TOTALS[a + b + 1] - RUN_TOTALS[a] - RUN_TOTALS[b]
+
+    def remove(self, x, y, player):
+        """撤销 (x, y) 处 player 的棋子（place 的逆操作）"""
+        counts = self.run_counts[player]
+        for a, b in self._arms(x, y, player):
+            if a:
+                counts[a] += 1
+            if b:
+                counts[b] += 1
+            counts[a + b + 1] -= 1
+            self.scores[player] -= RUN_TOTALS[a + b + 1] - RUN_TOTALS[a] - RUN_TOTALS[b]
+
+
+class CandidateGenerator:
+    """
+    候选落子点生成器：与任意棋子距离（横竖斜）不超过 radius 的空位。
+    棋子位置保存为位棋盘，落子/悔棋只翻转一位，候选点由邻域扩张的移位运算一次求出。
+    """
+
+    def __init__(self, board, radius=CANDIDATE_RADIUS):
+        self.radius = radius
+        masks = bitboard.from_board(board)
+        self.occupied = masks[1] | masks[2]
+
+    def place(self, x, y):
+        """(x, y) 处落子后更新候选集合"""
+        self.occupied |= bitboard.bit(x, y)
+
+    def remove(self, x, y):
+        """(x, y) 处的棋子被撤销后更新候选集合"""
+        self.occupied &= ~bitboard.bit(x, y)
+
+    @property
+    def mask(self):
+        """候选点的位棋盘"""
+        occupied = self.occupied
+        return bitboard.neighbourhood(occupied, self.radius) & ~occupied
+
+    def moves(self):
+        """按坐标排序的候选点列表（保证结果可复现）"""
+        return bitboard.cells(self.mask)
+
+
+class Position:
+    """
+    棋盘连同随之增量维护的评分表、候选点、Zobrist 哈希与棋型窗口编码。
+    make/unmake 同步更新全部状态，每步只触及落子点附近，不必重建；
+    对局引擎的落子、悔棋、重做与搜索中的试走都通过这一对操作完成。
+    """
+
+    def __init__(
+        self, board, evaluator=None, candidates=None, zobrist=None, shapes=None
+    ):
+        self.board = board
+        self.evaluator = evaluator if evaluator is not None else PatternEvaluator(board)
+        self.candidates = (
+            candidates if candidates is not None else CandidateGenerator(board)
+        )
+        self.zobrist = zobrist if zobrist is not None else ZobristHash(board)
+        self.shapes = shapes if shapes is not None else LineShapes(board)
+
+    def make(self, x, y, player):
+        """player 在空位 (x, y) 落子"""
+        self.board[x][y] = player
+        self.evaluator.place(x, y, player)
+        self.candidates.place(x, y)
+        self.zobrist.toggle(x, y, player)
+        self.shapes.place(x, y, player)
+
+    def unmake(self, x, y, player):
+        """撤销 player 在 (x, y) 的落子"""
+        self.board[x][y] = 0
+        self.evaluator.remove(x, y, player)
+        self.candidates.remove(x, y)
+        self.zobrist.toggle(x, y, player)
+        self.shapes.remove(x, y, player)
+
+
+# 必胜/必败局面的分值，远大于任何启发式分数
+WIN_SCORE = 10**9
+# 分数绝对值超过该值即为必胜/必败（分数中含有到达终局的步数）
+WIN_THRESHOLD = WIN_SCORE - GRID_SIZE * GRID_SIZE
+
+# 一次搜索的结果：最佳落子、分数、完成的深度、搜索节点数、耗时(秒)、每秒节点数
+SearchResult = namedtuple(
+    "SearchResult", ["move", "score", "depth", "nodes", "elapsed", "nps"]
+)
+
+
+class SearchTimeout(Exception):
+    """搜索用完时间预算时抛出，用于从递归中直接退出"""
+
+
+class SearchEngine:
+    """
+    negamax + alpha-beta 剪枝搜索，按棋型表（line_patterns）查得的进攻与防守分值排序候选点，
+    迭代加深直到达到最大深度或用完每步的时间预算（毫秒）。
+    搜索过程中通过 Position.make/unmake 在棋盘上试走，评分表、候选点与 Zobrist 哈希随之同步；
+    置换表在多次搜索之间保留，迭代加深的每一轮和后续几步都能复用之前的结果。
+    搜索前先用 ThreatSolver 检查必胜（VCF/VCT）与必须应对的冲四，命中时直接落子；
+    没有威胁时再查开局库，库中有当前局面则直接落子。
+    """
+
+    def __init__(
+        self,
+        time_ms=1000,
+        max_depth=6,
+        max_moves=12,
+        tt_bits=16,
+        use_threats=True,
+        use_book=True,
+    ):
+        self.time_ms = time_ms
+        self.max_depth = max_depth
+        self.max_moves = max_moves  # 每个节点最多展开的候选点数
+        self.tt = TranspositionTable(tt_bits)
+        self.threat_solver = ThreatSolver() if use_threats else None
+        self.book = load_book() if use_book else None
+        self.nodes = 0
+        self.deadline = 0.0
+        self.stop_requested = False
+        self.last_result = None
+        self.last_threat = None  # 最近一次由威胁求解器给出的结果
+        self.last_book_move = None  # 最近一次由开局库给出的落子
+        # 统计：评分过的候选点数、静态评估次数，以及最近一次搜索的各项统计（见 _finish）
+        self.scored = 0
+        self.evaluations = 0
+        self.threat_time = 0.0  # 最近一次搜索中威胁求解的耗时（秒）
+        self.last_stats = None
+
+    def stop(self):
+        """请求正在进行的搜索尽快结束（可从其他线程调用），返回已完成深度的结果"""
+        self.stop_requested = True
+
+    def search(self, board, evaluator, candidates, player, zobrist=None, shapes=None):
+        """
+        为 player 搜索最佳落子，返回 SearchResult（无处可下时 move 为 None）
+        :param zobrist: 与 board 同步维护的 ZobristHash，省略时根据棋盘现算
+        :param shapes: 与 board 同步维护的 LineShapes，省略时根据棋盘现算
+        """
+        self._prepare(board, evaluator, candidates, zobrist, shapes)
+        start = time.perf_counter()
+        self.deadline = start + self.time_ms / 1000
+        if self._forced_move(player, start):
+            return self.last_result
+
+        root_moves = self._ordered_moves(player)
+        if not root_moves:
+            # 棋盘上还没有棋子时下天元
+            center = (GRID_SIZE // 2, GRID_SIZE // 2)
+            root_moves = [center] if board[center[0]][center[1]] == 0 else []
+        best_move = root_moves[0] if root_moves else None
+        best_score = 0
+        depth_done = 0
+
+        for depth in range(1, self.max_depth + 1):
+            # 没有可选落子或只有唯一选择时无需搜索
+            if len(root_moves) <= 1:
+                break
+            # 上一轮的最佳落子放在最前面，提高剪枝效率
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+            try:
+                score, move = self._search_root(root_moves, depth, player)
+            except SearchTimeout:
+                break
+            best_score, best_move = score, move
+            depth_done = depth
+            # 已经找到必胜或必败，不必再加深
+            if abs(best_score) >= WIN_THRESHOLD:
+                break
+
+        elapsed = time.perf_counter() - start
+        nps = self.nodes / elapsed if elapsed > 0 else 0.0
+        self.last_result = SearchResult(
+            best_move, best_score, depth_done, self.nodes, elapsed, nps
+        )
+        self._finish("search", self.threat_time)
+        return self.last_result
+
+    def _forced_move(self, player, start):
+        """
+        搜索前的捷径：威胁求解器找到必胜或必须应对的一手，或开局库中有当前局面时，
+        直接以它作为 last_result 并返回 True
+        """
+        board = self.board
+        self.last_threat = None
+        self.last_book_move = None
+        self.threat_time = 0.0
+        if self.threat_solver is not None:
+            # 威胁求解有自己的时间预算，这里只让它响应 stop()
+            threat = self.threat_solver.solve(
+                board,
+                player,
+                self.candidates,
+                self.zobrist,
+                lambda: self.stop_requested,
+            )
+            self.threat_time = time.perf_counter() - start
+            if threat is not None:
+                self.last_threat = threat
+                # 堵冲四与化解对方 VCF 只是必须应对，不代表胜负已定
+                score = WIN_SCORE if threat.kind in ("win", "vcf", "vct") else 0
+                elapsed = time.perf_counter() - start
+                self.last_result = SearchResult(
+                    threat.move, score, 0, self.threat_solver.nodes, elapsed, 0.0
+                )
+                self._finish("threat", self.threat_time)
+                return True
+
+        if self.book is not None:
+            move = self.book.lookup(
+                board, player, self.candidates.occupied.bit_count(), self.zobrist
+            )
+            if move is not None:
+                self.last_book_move = move
+                elapsed = time.perf_counter() - start
+                self.last_result = SearchResult(move, 0, 0, 0, elapsed, 0.0)
+                self._finish("book", self.threat_time)
+                return True
+        return False
+
+    def _prepare(self, board, evaluator, candidates, zobrist=None, shapes=None):
+        """为一次搜索绑定局面并清零统计"""
+        self.board = board
+        self.evaluator = evaluator
+        self.candidates = candidates
+        self.zobrist = zobrist if zobrist is not None else ZobristHash(board)
+        self.position = Position(board, evaluator, candidates, self.zobrist, shapes)
+        self.tt.new_search()
+        self.stop_requested = False
+        self.nodes = 0
+        self.scored = 0
+        self.evaluations = 0
+
+    def _should_stop(self):
+        """是否应当中止搜索：收到 stop() 请求或超过时间预算"""
+        return self.stop_requested or time.perf_counter() > self.deadline
+
+    def _finish(self, source, threat_time):
+        """
+        记录本次搜索的统计 last_stats：落子来源（threat/book/search）、总耗时与威胁求解耗时(毫秒)、
+        完成深度、节点数、评分过的候选点数、评分调用次数（增量评分 + 静态评估）与置换表命中
+        """
+        result = self.last_result
+        self.last_stats = {
+            "source": source,
+            "total_ms": result.elapsed * 1000,
+            "threat_ms": threat_time * 1000,
+            "threat_nodes": self.threat_solver.nodes if self.threat_solver else 0,
+            "depth": result.depth,
+            "nodes": self.nodes,
+            "candidates": self.scored,
+            "heuristic_calls": 2 * self.scored + self.evaluations,
+            "tt_hits": self.tt.hits,
+        }
+
+    def _ordered_moves(self, player):
+        """
+        按进攻+防守的棋型分值从高到低排序候选点，最多保留 max_moves 个。
+        棋型表能看出跳子与被堵的一端，每个候选点只需八次查表
+        """
+        score = self.position.shapes.score
+        opponent = 3 - player
+        scored = [
+            (score(x, y, player) + score(x, y, opponent), (x, y))
+            for x, y in self.candidates.moves()
+        ]
+        self.scored += len(scored)
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored[: self.max_moves]]
+
+    def _evaluate(self, player):
+        """
+        静态评估：以 player 的视角计算双方棋型分值之差。
+        棋型取自 line_patterns 的查表结果，跳活三、冲四与被堵的一端都与连续的棋子区别计分
+        """
+        self.evaluations += 1
+        shapes = self.position.shapes
+        return shapes.total(player) - shapes.total(3 - player)
+
+    def _search_root(self, moves, depth, player):
+        alpha = -WIN_SCORE - 1
+        beta = WIN_SCORE + 1
+        best_move = moves[0]
+        for x, y in moves:
+            score = self._score_move(x, y, depth, alpha, beta, player, 1)
+            if score > alpha:
+                alpha = score
+                best_move = (x, y)
+        return alpha, best_move
+
+    def _score_move(self, x, y, depth, alpha, beta, player, ply):
+        """在 (x, y) 落子后以 player 的视角返回该分支的分数"""
+        self.nodes += 1
+        if self.nodes & 255 == 0 and self._should_stop():
+            raise SearchTimeout
+        self.position.make(x, y, player)
+        try:
+            if check_winner_at(self.board, x, y, player):
+                # 越早获胜分数越高
+                return WIN_SCORE - ply
+            return -self._negamax(depth - 1, -beta, -alpha, 3 - player, ply + 1)
+        finally:
+            self.position.unmake(x, y, player)
+
+    def _negamax(self, depth, alpha, beta, player, ply):
+        if depth == 0:
+            return self._evaluate(player)
+
+        # 置换表以归一化局面为键，对称的局面共用条目，落子按变换换算坐标
+        key, sym = self.zobrist.canonical(player)
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            if entry.move is not None:
+                tt_move = symmetry.from_canonical(entry.move, sym, GRID_SIZE)
+            if entry.depth >= depth:
+                score = _score_from_tt(entry.score, ply)
+                if entry.flag == EXACT:
+                    return score
+                if entry.flag == LOWER and score >= beta:
+                    return score
+                if entry.flag == UPPER and score <= alpha:
+                    return score
+
+        moves = self._ordered_moves(player)
+        if not moves:
+            return 0  # 棋盘已满，和棋
+        # 置换表记录的最佳落子优先搜索
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        alpha_orig = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for x, y in moves:
+            score = self._score_move(x, y, depth, alpha, beta, player, ply)
+            if score > best_score:
+                best_score = score
+                best_move = (x, y)
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if best_move is not None:
+            best_move = symmetry.to_canonical(best_move, sym, GRID_SIZE)
+        self.tt.store(key, depth, _score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+
+def _score_to_tt(score, ply):
+    """必胜/必败分数改为相对当前节点的步数后再存入置换表"""
+    if score >= WIN_THRESHOLD:
+        return score + ply
+    if score <= -WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score, ply):
+    if score >= WIN_THRESHOLD:
+        return score - ply
+    if score <= -WIN_THRESHOLD:
+        return score + ply
+    return score
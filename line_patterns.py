@@ -0,0 +1,324 @@
+"""
+棋型查表：以某个空位为中心、沿一个方向的 9 格窗口，落子后在这条线上形成的棋型。
+
+窗口中除中心外的 8 格每格用 2 位编码（0=空，1=黑棋，2=白棋，3=棋盘外），共 4^8 种，
+分别以黑棋、白棋为落子方预先算出每种编码的棋型（成五、活四、冲四、活三、跳活三、眠三……），
+能识别跳子与被堵的一端，而 heuristic_score 只数连续的棋子。
+表只需生成一次，保存在 line_patterns.bin 中，之后启动时直接读入：
+    python line_patterns.py build
+
+LineShapes 随棋盘增量维护每个格子四个方向的窗口编码，落子/悔棋只改动经过该点的 32 个编码，
+评估一个空位就是四次查表。同一张表以棋子所在的格子为中心查，得到的就是经过这颗棋子的棋型，
+LineShapes 据此同时维护双方全部棋子的棋型分值之和，用作搜索的静态评估。
+"""
+
+import argparse
+import os
+import struct
+from functools import lru_cache
+
+TABLE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "line_patterns.bin"
+)
+
+MAGIC = b"GMKP"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+
+WINDOW = 9
+HALF = WINDOW // 2
+CODES = 4 ** (WINDOW - 1)
+OFF_BOARD = 3
+
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# 棋型，数值越大威胁越大
+NONE = 0
+TWO = 1  # 眠二：再下一子成眠三
+OPEN_TWO = 2  # 活二：再下一子成活三
+THREE = 3  # 眠三：再下一子成冲四
+SPLIT_THREE = 4  # 跳活三：如 _XX_X_，再下一子成活四
+OPEN_THREE = 5  # 连活三：_XXX_
+FOUR = 6  # 冲四：只有一个成五点
+OPEN_FOUR = 7  # 活四：两个成五点
+FIVE = 8
+
+SHAPE_NAMES = (
+    "none",
+    "two",
+    "open_two",
+    "three",
+    "split_three",
+    "open_three",
+    "four",
+    "open_four",
+    "five",
+)
+
+# 各棋型的分值，用于候选点排序与静态评估；冲四与活三同时出现等组合由四个方向的分值相加体现
+SHAPE_SCORES = (0, 5, 20, 50, 400, 500, 600, 10000, 100000)
+
+# 窗口中的格子：0=空，1=己方，2=对方或棋盘外
+_EMPTY, _OWN, _BLOCKED = 0, 1, 2
+
+
+def _slot(k):
+    """窗口偏移 k（-4..4，不含 0）在编码中的序号"""
+    return k + HALF if k < 0 else k + HALF - 1
+
+
+def _five_points(window):
+    """中心为己方棋子时，(是否已成五, 能与中心连成五的空位集合)"""
+    points = set()
+    for start in range(HALF + 1):
+        cells = window[start : start + 5]
+        if _BLOCKED in cells:
+            continue
+        empty = [start + i for i, cell in enumerate(cells) if cell == _EMPTY]
+        if not empty:
+            return True, points
+        if len(empty) == 1:
+            points.add(empty[0])
+    return False, points
+
+
+@lru_cache(maxsize=None)
+def classify(window):
+    """9 格窗口（中心为己方棋子）的棋型"""
+    five, points = _five_points(window)
+    if five:
+        return FIVE
+    if len(points) >= 2:
+        return OPEN_FOUR
+    if points:
+        return FOUR
+    # 看再下一子能形成的最好棋型
+    best = NONE
+    for index, cell in enumerate(window):
+        if cell != _EMPTY:
+            continue
+        shape = classify(window[:index] + (_OWN,) + window[index + 1 :])
+        if shape == OPEN_FOUR:
+            # 中心所在的连子已有三颗为连活三，否则是跳活三
+            run = 1
+            i = HALF - 1
+            while i >= 0 and window[i] == _OWN:
+                run += 1
+                i -= 1
+            i = HALF + 1
+            while i < WINDOW and window[i] == _OWN:
+                run += 1
+                i += 1
+            return OPEN_THREE if run >= 3 else SPLIT_THREE
+        if shape == FOUR:
+            best = max(best, THREE)
+        elif shape in (OPEN_THREE, SPLIT_THREE):
+            best = max(best, OPEN_TWO)
+        elif shape == THREE and best < TWO:
+            best = TWO
+    return best
+
+
+def build_tables():
+    """按编码生成黑棋、白棋的棋型表，返回 [None, 黑棋表, 白棋表]（bytes，下标为编码）"""
+    tables = [None]
+    for player in (1, 2):
+        meaning = {0: _EMPTY, player: _OWN, 3 - player: _BLOCKED, OFF_BOARD: _BLOCKED}
+        table = bytearray(CODES)
+        for code in range(CODES):
+            cells = [meaning[(code >> (2 * slot)) & 3] for slot in range(WINDOW - 1)]
+            cells.insert(HALF, _OWN)
+            table[code] = classify(tuple(cells))
+        tables.append(bytes(table))
+    return tables
+
+
+def write_tables(path, tables):
+    """写入棋型表文件（先写临时文件再替换）"""
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, WINDOW))
+        f.write(tables[1])
+        f.write(tables[2])
+    os.replace(temp, path)
+
+
+def read_tables(path):
+    """读取棋型表文件，文件无效时抛出 ValueError"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) != HEADER.size + 2 * CODES:
+        raise ValueError(f"不是有效的棋型表文件: {path}")
+    magic, version, window = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or window != WINDOW:
+        raise ValueError(f"不是有效的棋型表文件: {path}")
+    start = HEADER.size
+    return [None, data[start : start + CODES], data[start + CODES :]]
+
+
+@lru_cache(maxsize=None)
+def load_tables(path=TABLE_FILE):
+    """
+    加载棋型表（同一文件只读一次）；文件不存在或无效时现场生成，
+    并尽量写回磁盘（目录不可写时只保留在内存中）
+    """
+    try:
+        return read_tables(path)
+    except (OSError, ValueError):
+        pass
+    tables = build_tables()
+    try:
+        write_tables(path, tables)
+    except OSError:
+        pass
+    return tables
+
+
+@lru_cache(maxsize=None)
+def score_tables():
+    """[None, 黑棋编码->分值, 白棋编码->分值]，由棋型表换算，查表时省去一次下标"""
+    tables = load_tables()
+    return [None] + [[SHAPE_SCORES[shape] for shape in tables[p]] for p in (1, 2)]
+
+
+@lru_cache(maxsize=None)
+def _layout(size):
+    """
+    (空棋盘的编码, 受影响的编码)：
+    编码按 方向 * size^2 + x * size + y 排成一维；空棋盘上只有棋盘外的格子不为 0。
+    affected[x * size + y] 为 (x, y) 落子时需要改动的 (编码下标, 位移, 编码所属的格子)
+    """
+    cells = size * size
+    base = [0] * (len(DIRECTIONS) * cells)
+    affected = [[] for _ in range(cells)]
+    for d, (dx, dy) in enumerate(DIRECTIONS):
+        for x in range(size):
+            for y in range(size):
+                index = d * cells + x * size + y
+                for k in range(-HALF, HALF + 1):
+                    if k == 0:
+                        continue
+                    nx, ny = x + k * dx, y + k * dy
+                    shift = 2 * _slot(k)
+                    if 0 <= nx < size and 0 <= ny < size:
+                        affected[nx * size + ny].append((index, shift, x * size + y))
+                    else:
+                        base[index] |= OFF_BOARD << shift
+    return base, [tuple(items) for items in affected]
+
+
+class LineShapes:
+    """
+    增量维护的窗口编码：每个格子四个方向各一个，落子/提子时更新经过该点的编码，
+    候选点的棋型与分值直接查表得到。
+    totals[player] 为 player 每颗棋子四个方向上棋型分值之和（能看出跳子与被堵的一端），
+    落子/提子时只重新查改动了编码的棋子
+    """
+
+    def __init__(self, board):
+        self.size = len(board)
+        self.cells = self.size * self.size
+        base, self.affected = _layout(self.size)
+        self.codes = list(base)
+        self.tables = load_tables()
+        self.scores = score_tables()
+        self.owner = bytearray(self.cells)  # 每个格子上的棋子，0 为空
+        self.totals = [0, 0, 0]
+        for x, row in enumerate(board):
+            for y, player in enumerate(row):
+                if player:
+                    self.place(x, y, player)
+
+    def place(self, x, y, player):
+        """记录 (x, y) 处落下 player 的棋子"""
+        codes = self.codes
+        owner = self.owner
+        scores = self.scores
+        totals = self.totals
+        for index, shift, cell in self.affected[x * self.size + y]:
+            old = codes[index]
+            new = codes[index] = old + (player << shift)
+            stone = owner[cell]
+            if stone:
+                table = scores[stone]
+                totals[stone] += table[new] - table[old]
+        cell = x * self.size + y
+        owner[cell] = player
+        totals[player] += self._stone_score(cell, player)
+
+    def remove(self, x, y, player):
+        """撤销 (x, y) 处 player 的棋子"""
+        cell = x * self.size + y
+        self.totals[player] -= self._stone_score(cell, player)
+        self.owner[cell] = 0
+        codes = self.codes
+        owner = self.owner
+        scores = self.scores
+        totals = self.totals
+        for index, shift, cell in self.affected[cell]:
+            old = codes[index]
+            new = codes[index] = old - (player << shift)
+            stone = owner[cell]
+            if stone:
+                table = scores[stone]
+                totals[stone] += table[new] - table[old]
+
+    def _stone_score(self, cell, player):
+        """格子 cell 上 player 的棋子四个方向棋型分值之和"""
+        table = self.scores[player]
+        codes = self.codes
+        cells = self.cells
+        return (
+            table[codes[cell]]
+            + table[codes[cell + cells]]
+            + table[codes[cell + 2 * cells]]
+            + table[codes[cell + 3 * cells]]
+        )
+
+    def total(self, player):
+        """player 全部棋子的棋型分值之和"""
+        return self.totals[player]
+
+    def shapes(self, x, y, player):
+        """player 在空位 (x, y) 落子后四个方向上的棋型"""
+        table = self.tables[player]
+        codes = self.codes
+        index = x * self.size + y
+        cells = self.cells
+        return tuple(table[codes[index + d * cells]] for d in range(len(DIRECTIONS)))
+
+    def score(self, x, y, player):
+        """player 在空位 (x, y) 落子后四个方向棋型分值之和"""
+        table = self.scores[player]
+        codes = self.codes
+        index = x * self.size + y
+        cells = self.cells
+        return (
+            table[codes[index]]
+            + table[codes[index + cells]]
+            + table[codes[index + 2 * cells]]
+            + table[codes[index + 3 * cells]]
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋棋型表")
+    parser.add_argument("command", choices=["build", "show"])
+    parser.add_argument("--out", default=TABLE_FILE, help="棋型表文件")
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        write_tables(args.out, build_tables())
+        print(f"棋型表已写入 {args.out}")
+    tables = read_tables(args.out)
+    for player, name in ((1, "黑棋"), (2, "白棋")):
+        counts = [0] * len(SHAPE_NAMES)
+        for shape in tables[player]:
+            counts[shape] += 1
+        summary = "  ".join(
+            f"{SHAPE_NAMES[shape]} {count}" for shape, count in enumerate(counts)
+        )
+        print(f"{name}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+对战服务器的压力测试：在本机用若干条连接同时进行许多局人机对局，统计每秒落子数与 AI 应答延迟
+（从发出落子到收到 AI 的应对）。客户端一方在上一手附近随机落子，超过 --max-moves 手时离开对局。
+
+    python game_server.py --workers 4
+    python load_test.py --games 2000 --connections 50 --difficulty 测试
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from game_engine import DIFFICULTIES
+from game_server import DEFAULT_HOST, DEFAULT_PORT, MAX_LINE, decode, encode
+from gomoku_ai import GRID_SIZE
+from profiler import percentile
+
+
+class LoadStats:
+    """各连接共用的统计"""
+
+    def __init__(self):
+        self.moves = 0
+        self.games = 0
+        self.errors = 0
+        self.latencies = []  # 毫秒
+
+
+def random_move(occupied, near, rng):
+    """在 near 附近随机找一个空位，找不到时在全盘的空位中随机"""
+    for _ in range(20):
+        x = near[0] + rng.randint(-2, 2)
+        y = near[1] + rng.randint(-2, 2)
+        if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE and (x, y) not in occupied:
+            return x, y
+    empty = [
+        (x, y)
+        for x in range(GRID_SIZE)
+        for y in range(GRID_SIZE)
+        if (x, y) not in occupied
+    ]
+    return rng.choice(empty)
+
+
+async def run_connection(host, port, games, difficulty, max_moves, rng, stats):
+    """用一条连接同时进行 games 局，直到全部结束"""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+    occupied = {}  # 对局 -> 已有棋子的格子
+    near = {}  # 对局 -> 下一手落在哪一手附近
+    sent = {}  # 对局 -> 发出落子的时间
+    remaining = games
+    pending = games  # 已请求、还没有回复 joined 的对局数
+
+    def finish(game_id):
+        nonlocal remaining
+        remaining -= 1
+        stats.games += 1
+        del occupied[game_id], near[game_id]
+        sent.pop(game_id, None)
+
+    def play(game_id):
+        if len(occupied[game_id]) >= max_moves:
+            writer.write(encode({"op": "leave", "game": game_id}))
+            finish(game_id)
+            return
+        x, y = random_move(occupied[game_id], near[game_id], rng)
+        sent[game_id] = time.perf_counter()
+        writer.write(encode({"op": "move", "game": game_id, "x": x, "y": y}))
+
+    for _ in range(games):
+        writer.write(encode({"op": "new", "mode": "pve", "difficulty": difficulty}))
+    await writer.drain()
+    center = GRID_SIZE // 2
+    while remaining:
+        line = await reader.readline()
+        if not line:
+            break
+        message = decode(line)
+        op = message["op"]
+        if op == "joined":
+            pending -= 1
+            game_id = message["game"]
+            occupied[game_id] = set()
+            near[game_id] = (center, center)
+            play(game_id)
+        elif op == "move":
+            game_id = message["game"]
+            move = (message["x"], message["y"])
+            occupied[game_id].add(move)
+            stats.moves += 1
+            if message["player"] == 2:
+                stats.latencies.append((time.perf_counter() - sent.pop(game_id)) * 1000)
+            if message["ended"]:
+                finish(game_id)
+            elif message["player"] == 2:
+                near[game_id] = move
+                play(game_id)
+        elif op == "over":
+            # 服务器结束了对局（如 AI 计算出错）；自己离开的对局此前已经结束
+            game_id = message["game"]
+            if game_id in occupied:
+                if message["reason"] == "error":
+                    stats.errors += 1
+                finish(game_id)
+        elif op == "error":
+            stats.errors += 1
+            game_id = message.get("game")
+            if game_id in occupied:
+                # 落子被拒绝：离开这一局，不再等它的应答
+                writer.write(encode({"op": "leave", "game": game_id}))
+                finish(game_id)
+            elif game_id is None and pending:
+                # 新开对局被拒绝
+                pending -= 1
+                remaining -= 1
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def server_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+    writer.write(encode({"op": "stats"}))
+    await writer.drain()
+    message = decode(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return message
+
+
+async def run_load(args):
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    # 对局尽量平均地分给各条连接
+    counts = [
+        args.games // args.connections + (i < args.games % args.connections)
+        for i in range(args.connections)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_connection(
+                args.host,
+                args.port,
+                count,
+                args.difficulty,
+                args.max_moves,
+                random.Random(rng.getrandbits(64)),
+                stats,
+            )
+            for count in counts
+            if count
+        )
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{args.connections} 条连接，{stats.games} 局，落子 {stats.moves} 手，"
+        f"用时 {elapsed:.1f} 秒，错误 {stats.errors}"
+    )
+    print(
+        f"每秒落子 {stats.moves / elapsed:.0f}  每秒完成对局 {stats.games / elapsed:.1f}"
+    )
+    latencies = stats.latencies
+    print(
+        f"AI 应答延迟(ms)：p50 {percentile(latencies, 50):.1f}  "
+        f"p90 {percentile(latencies, 90):.1f}  p99 {percentile(latencies, 99):.1f}  "
+        f"最大 {max(latencies, default=0.0):.1f}"
+    )
+    server = await server_stats(args.host, args.port)
+    print(
+        f"服务器：进行中 {server['games']} 局，累计落子 {server['moves']}，"
+        f"AI 进程 {server['workers']}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋对战服务器压力测试")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="服务器地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="服务器端口")
+    parser.add_argument("--games", type=int, default=1000, help="总局数（同时进行）")
+    parser.add_argument("--connections", type=int, default=20, help="连接数")
+    parser.add_argument(
+        "--difficulty", default="测试", choices=DIFFICULTIES, help="AI 难度"
+    )
+    parser.add_argument("--max-moves", type=int, default=60, help="每局最多手数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args(argv)
+    asyncio.run(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+蒙特卡洛树搜索（MCTS）：UCT 选择 + 成批的模拟对局（rollout），需要 numpy（可选依赖）。
+
+树上每个节点的子节点按棋型表（line_patterns）的进攻与防守分值排序，只展开分值最高的 max_moves 个；
+有成五点时只展开成五，对方有成五点时只展开堵点。搜索之间保留最近几次搜索的树（kept_trees 棵）：
+下一次搜索时沿着双方实际下的棋找到对应的节点，继续使用其中的统计。后台思考对玩家的每一种预想
+各搜索一次，各自的树都保留下来，玩家下了其中任何一手都能接着用。
+
+模拟对局成批进行：每批先用虚拟损失（路径上的 visits 预先加上，胜场在模拟结束后补上）选出一批叶子，
+每片叶子复制若干份，所有对局在打包的位数组上一起推进——数组每个 uint64 的第 i 位属于第 i 局，
+列与 bitboard.py 相同（x * STRIDE + y，带隔离位），沿四个方向错开 k 格只是对列切片，
+成五点、堵点与邻近空位的计算都是整批数组的按位运算，不再逐局、逐格循环。
+模拟的走子策略：能成五就成五，否则堵对方的成五点，否则在已有棋子的邻格中随机落子；
+超过 max_plies 手仍未分出胜负时，轮到的一方有成五点记胜，对方有两个以上成五点记负，否则记和。
+"""
+
+import math
+import time
+
+import numpy as np
+
+import bitboard
+from gomoku_ai import GRID_SIZE, SearchEngine, SearchResult, check_winner_at
+from line_patterns import FIVE, SHAPE_SCORES
+
+LENGTH = bitboard.SIZE * bitboard.STRIDE
+BYTES = (LENGTH + 7) // 8
+# 沿任一方向错开 4 格的最大列偏移，数组两侧各补这么多列 0
+PAD = 4 * (bitboard.STRIDE + 1)
+# 八个相邻格子的列偏移
+NEIGHBOURS = tuple(s * sign for s in bitboard.SHIFTS for sign in (1, -1))
+
+# 棋盘上的有效格子（隔离位为 0）
+VALID = np.array(
+    [0 if index % bitboard.STRIDE == bitboard.SIZE else ~0 for index in range(LENGTH)],
+    dtype=np.int64,
+).astype(np.uint64)
+
+# 四个方向棋型分值之和达到该值即能成五
+FIVE_SCORE = SHAPE_SCORES[FIVE]
+
+
+def _view(padded, offset):
+    """补零数组中各格沿列错开 offset 后的视图"""
+    return padded[:, PAD + offset : PAD + offset + LENGTH]
+
+
+def _any(bits):
+    """每一行（64 局）中各局是否有任一格为 1，返回 (行数,) 的位掩码"""
+    return np.bitwise_or.reduce(bits, axis=1)
+
+
+def _first(bits):
+    """各局只保留列序号最小的一格"""
+    seen = np.bitwise_or.accumulate(bits, axis=1)
+    first = bits.copy()
+    first[:, 1:] &= ~seen[:, :-1]
+    return first
+
+
+def five_points(own, empty):
+    """own 为补零后的棋子位数组，返回各局中 own 一方下一子即成五的空位"""
+    result = np.zeros_like(empty)
+    for shift in bitboard.SHIFTS:
+        v = {k: _view(own, k * shift) for k in (-4, -3, -2, -1, 1, 2, 3, 4)}
+        ahead = v[1] & v[2]
+        behind = v[-1] & v[-2]
+        # 空位在五连中的位置依次为第 1~5 格
+        result |= ahead & v[3] & v[4]
+        result |= v[-1] & ahead & v[3]
+        result |= behind & ahead
+        result |= behind & v[-3] & v[1]
+        result |= behind & v[-3] & v[-4]
+    return result & empty
+
+
+def _pick(candidates, rng, rounds=3):
+    """各局在候选格中随机选一格：先随机稀疏几轮，再从随机的起点取第一格"""
+    for _ in range(rounds):
+        thin = candidates & rng.bit_generator.random_raw(candidates.shape)
+        keep = _any(thin)[:, None]
+        candidates = (thin & keep) | (candidates & ~keep)
+    offset = int(rng.integers(LENGTH))
+    rolled = np.roll(candidates, -offset, axis=1)
+    return np.roll(_first(rolled), offset, axis=1)
+
+
+def rollouts(first_stones, second_stones, rng, max_plies=40):
+    """
+    成批模拟对局。first_stones/second_stones 为 (行数, LENGTH) 的 uint64 位数组，
+    第 i 位为第 i 局中先走一方/另一方的棋子。返回 (先走方获胜, 后走方获胜) 两个位掩码，其余为和
+    """
+    words = first_stones.shape[0]
+    mine = np.zeros((words, LENGTH + 2 * PAD), np.uint64)
+    theirs = np.zeros_like(mine)
+    _view(mine, 0)[:] = first_stones
+    _view(theirs, 0)[:] = second_stones
+    done = np.zeros(words, np.uint64)
+    wins = [np.zeros(words, np.uint64), np.zeros(words, np.uint64)]
+    side = 0
+    for _ in range(max_plies):
+        occupied = mine | theirs
+        empty = VALID & ~_view(occupied, 0)
+        win = five_points(mine, empty)
+        block = five_points(theirs, empty)
+        near = np.zeros_like(empty)
+        for offset in NEIGHBOURS:
+            near |= _view(occupied, offset)
+        has_win = _any(win)
+        has_block = _any(block) & ~has_win
+        free = ~(has_win | has_block)
+        candidates = win | (block & has_block[:, None]) | (near & empty & free[:, None])
+        candidates &= ~done[:, None]
+        moving = _any(candidates)
+        done |= ~moving  # 无处可下，记和
+        if not moving.any():
+            break
+        _view(mine, 0)[:] |= _pick(candidates, rng)
+        won = has_win & moving
+        wins[side] |= won
+        done |= won
+        mine, theirs = theirs, mine
+        side ^= 1
+
+    # 手数用完：轮到的一方有成五点记胜，对方有两个以上成五点（堵不过来）记负
+    live = ~done
+    empty = VALID & ~_view(mine | theirs, 0)
+    win = five_points(mine, empty)
+    block = five_points(theirs, empty)
+    has_win = _any(win) & live
+    wins[side] |= has_win
+    wins[side ^ 1] |= _any(block & ~_first(block)) & live & ~has_win
+    return wins[0], wins[1]
+
+
+def pack(masks, repeat, words):
+    """
+    把位棋盘（Python 整数，见 bitboard.from_board）各复制 repeat 份，打包成 (words, LENGTH) 的位数组，
+    第 i 份放在第 i // 64 行的第 i % 64 位；不足的位为空棋盘
+    """
+    data = b"".join(mask.to_bytes(BYTES, "little") for mask in masks)
+    bits = np.unpackbits(
+        np.frombuffer(data, np.uint8).reshape(len(masks), BYTES),
+        axis=1,
+        count=LENGTH,
+        bitorder="little",
+    )
+    full = np.zeros((words * 64, LENGTH), np.uint8)
+    full[: len(masks) * repeat] = np.repeat(bits, repeat, axis=0)
+    packed = np.packbits(full, axis=0, bitorder="little").reshape(words, 8, LENGTH)
+    return (
+        np.ascontiguousarray(packed.transpose(0, 2, 1))
+        .view("<u8")[..., 0]
+        .astype(np.uint64)
+    )
+
+
+def unpack(mask, count):
+    """pack 的逆操作（只针对 (words,) 的位掩码）：返回前 count 局的布尔数组"""
+    bits = (mask[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    return bits.reshape(-1)[:count].astype(bool)
+
+
+class Node:
+    """搜索树节点；wins 为走出 move 的一方在经过该节点的模拟中的得分（和棋记 0.5）"""
+
+    __slots__ = ("move", "children", "untried", "visits", "wins", "terminal")
+
+    def __init__(self, move=None, terminal=False):
+        self.move = move
+        self.children = []
+        self.untried = None  # 尚未展开的落子，按分值升序，pop() 取最好的一个
+        self.visits = 0
+        self.wins = 0.0
+        self.terminal = terminal  # move 已成五
+
+
+class MCTSEngine(SearchEngine):
+    """
+    UCT 蒙特卡洛树搜索，接口与 SearchEngine 相同（可以直接作为 Game 的 engine）。
+    威胁求解与开局库的捷径与 SearchEngine 一致；搜索随时可以停止：用完 time_ms、
+    模拟局数达到 max_playouts（None 为不限）或收到 stop() 时返回访问次数最多的落子。
+    SearchResult 的 score 为该落子的胜率（千分比），depth 为树的最大深度，nodes 为模拟局数。
+    """
+
+    def __init__(
+        self,
+        time_ms=1000,
+        max_playouts=None,
+        max_moves=10,
+        exploration=1.0,
+        leaves_per_batch=128,
+        rollouts_per_leaf=16,
+        max_plies=40,
+        use_threats=True,
+        use_book=True,
+        seed=None,
+        kept_trees=8,
+    ):
+        super().__init__(
+            time_ms, max_moves=max_moves, use_threats=use_threats, use_book=use_book
+        )
+        self.max_playouts = max_playouts
+        self.exploration = exploration
+        self.leaves_per_batch = leaves_per_batch
+        self.rollouts_per_leaf = rollouts_per_leaf
+        self.max_plies = max_plies
+        self.rng = np.random.default_rng(seed)
+        # 最近几次搜索的 (树, 局面, 落子方)，新的在末尾，用于在之后的搜索中复用
+        self.kept_trees = kept_trees
+        self.trees = []
+
+    def search(self, board, evaluator, candidates, player, zobrist=None, shapes=None):
+        self._prepare(board, evaluator, candidates, zobrist, shapes)
+        start = time.perf_counter()
+        self.deadline = start + self.time_ms / 1000
+        if self._forced_move(player, start):
+            return self.last_result
+
+        root = self._reuse_root(board, player)
+        self.masks = bitboard.from_board(board)
+        self.tree_depth = 0
+        batch_time = 0.0
+        while True:
+            batch_start = time.perf_counter()
+            self._run_batch(root, player)
+            batch_time = time.perf_counter() - batch_start
+            if root.untried == [] and len(root.children) <= 1:
+                break  # 只有唯一的选择
+            if self.max_playouts is not None and self.nodes >= self.max_playouts:
+                break
+            # 剩余时间不够再跑一批时提前结束
+            if self._should_stop() or time.perf_counter() + batch_time > self.deadline:
+                break
+
+        best = max(root.children, key=lambda child: child.visits, default=None)
+        if best is None:
+            # 棋盘上还没有棋子（或已下满）
+            center = (GRID_SIZE // 2, GRID_SIZE // 2)
+            move = center if board[center[0]][center[1]] == 0 else None
+            score = 0
+        else:
+            move = best.move
+            score = round(1000 * best.wins / best.visits)
+        if best is not None:
+            self.trees.append((best, [row[:] for row in board], player))
+            del self.trees[: -self.kept_trees]
+
+        elapsed = time.perf_counter() - start
+        nps = self.nodes / elapsed if elapsed > 0 else 0.0
+        self.last_result = SearchResult(
+            move, score, self.tree_depth, self.nodes, elapsed, nps
+        )
+        self._finish("mcts", self.threat_time)
+        return self.last_result
+
+    def _reuse_root(self, board, player):
+        """
+        在保留的树中（从最近的一棵开始）找到与当前局面对应的子树；
+        都对不上（悔棋、换了局面）时新建一棵树
+        """
+        for tree in reversed(self.trees):
+            node = self._descend(tree, board, player)
+            if node is not None:
+                return node
+        return Node()
+
+    def _descend(self, tree, board, player):
+        """沿保留的树搜索后双方实际下的棋找到对应的节点，对不上时返回 None"""
+        node, old, root_player = tree
+        added = []
+        for x, row in enumerate(board):
+            for y, piece in enumerate(row):
+                if old[x][y] != piece:
+                    if old[x][y]:
+                        return None
+                    added.append((x, y))
+        # 保留的树根是我方落子后的节点，接下来轮到对方
+        x, y = node.move
+        if (x, y) not in added or board[x][y] != root_player:
+            return None
+        added.remove((x, y))
+        turn = 3 - root_player
+        while added:
+            child = next(
+                (
+                    c
+                    for c in node.children
+                    if c.move in added and board[c.move[0]][c.move[1]] == turn
+                ),
+                None,
+            )
+            if child is None:
+                return None
+            added.remove(child.move)
+            node = child
+            turn = 3 - turn
+        if turn != player or node.terminal:
+            return None
+        return node
+
+    def _policy_moves(self, player):
+        """当前局面下 player 可展开的落子，按分值升序"""
+        score = self.position.shapes.score
+        opponent = 3 - player
+        moves = self.candidates.moves()
+        self.scored += len(moves)
+        wins = [(x, y) for x, y in moves if score(x, y, player) >= FIVE_SCORE]
+        if wins:
+            return wins[:1]
+        blocks = [(x, y) for x, y in moves if score(x, y, opponent) >= FIVE_SCORE]
+        if blocks:
+            return blocks
+        ranked = sorted(
+            ((score(x, y, player) + score(x, y, opponent), (x, y)) for x, y in moves),
+            reverse=True,
+        )[: self.max_moves]
+        return [move for _, move in reversed(ranked)]
+
+    def _select(self, root, player):
+        """
+        从根节点选出一片叶子（必要时展开一个子节点），路径上的 visits 预先加上本批的模拟局数。
+        返回 (路径, 叶子上轮到的一方)；棋盘在返回前已恢复
+        """
+        visits = self.rollouts_per_leaf
+        position = self.position
+        masks = self.masks
+        node = root
+        path = [root]
+        root.visits += visits
+        made = []
+        try:
+            while not node.terminal:
+                if node.untried is None:
+                    node.untried = self._policy_moves(player)
+                if node.untried:
+                    x, y = node.untried.pop()
+                    child = Node((x, y))
+                    node.children.append(child)
+                elif node.children:
+                    log_visits = math.log(node.visits)
+                    child = max(
+                        node.children,
+                        key=lambda c: c.wins / c.visits
+                        + self.exploration * math.sqrt(log_visits / c.visits),
+                    )
+                else:
+                    break  # 无处可下
+                x, y = child.move
+                position.make(x, y, player)
+                masks[player] ^= bitboard.bit(x, y)
+                made.append((x, y, player))
+                if child.visits == 0:
+                    child.terminal = check_winner_at(self.board, x, y, player)
+                child.visits += visits
+                path.append(child)
+                node = child
+                player = 3 - player
+                if node.visits == visits:
+                    break  # 新展开的节点
+            leaf_masks = (masks[player], masks[3 - player])
+        finally:
+            for x, y, stone in reversed(made):
+                position.unmake(x, y, stone)
+                masks[stone] ^= bitboard.bit(x, y)
+        self.tree_depth = max(self.tree_depth, len(path) - 1)
+        return path, player, leaf_masks
+
+    def _run_batch(self, root, player):
+        """选出一批叶子，成批模拟后把结果记回路径上的节点"""
+        repeat = self.rollouts_per_leaf
+        pending = []
+        for _ in range(self.leaves_per_batch):
+            path, leaf_player, leaf_masks = self._select(root, player)
+            leaf = path[-1]
+            if leaf.terminal:
+                self._backup(path, repeat)  # 走进叶子的一方已成五
+            elif leaf.untried == [] and not leaf.children:
+                self._backup(path, repeat / 2)  # 棋盘下满，和棋
+            else:
+                pending.append((path, leaf_masks))
+        if not pending:
+            return
+        count = len(pending) * repeat
+        words = -(-count // 64)
+        first_wins, second_wins = rollouts(
+            pack([masks[0] for _, masks in pending], repeat, words),
+            pack([masks[1] for _, masks in pending], repeat, words),
+            self.rng,
+            self.max_plies,
+        )
+        first = unpack(first_wins, count).reshape(-1, repeat).sum(axis=1)
+        second = unpack(second_wins, count).reshape(-1, repeat).sum(axis=1)
+        for (path, _), lost, won in zip(pending, first, second):
+            # 叶子上先走的一方是对手，得分从走进叶子的一方算起
+            self._backup(path, won + (repeat - lost - won) / 2)
+        self.nodes += count
+
+    def _backup(self, path, reward):
+        """reward 为走进叶子的一方在本批模拟中的得分，沿路径向上交替记入"""
+        total = self.rollouts_per_leaf
+        for node in reversed(path):
+            node.wins += reward
+            reward = total - reward
@@ -0,0 +1,91 @@
+"""
+基于 NumPy 的棋盘后端（可选依赖），用于离线批量分析局面。
+
+棋盘为 int8 数组，0=空，1=黑棋，2=白棋，下标含义与列表棋盘相同（board[x][y]）。
+所有函数既接受单个棋盘 (N, N)，也接受一批棋盘 (..., N, N)，
+四个方向的五连与连子统计都通过对补零后的数组做错位切片一次完成，不含逐格的 Python 循环。
+"""
+
+import numpy as np
+
+# 四个方向，与 heuristic_score 保持一致
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# 连子长度 -> 分值，与 gomoku_ai.RUN_SCORES 保持一致
+RUN_SCORES = {2: 10, 3: 100, 4: 1000, 5: 100000}
+
+# 每个方向最多向前看 4 格（即 5 连）
+_PAD = 4
+
+
+def new_board(size=25):
+    """创建一个空的 int8 棋盘"""
+    return np.zeros((size, size), dtype=np.int8)
+
+
+def to_array(board):
+    """把列表棋盘（或一批列表棋盘）转换成 int8 数组"""
+    return np.asarray(board, dtype=np.int8)
+
+
+def is_array(board):
+    """判断是否为 NumPy 棋盘"""
+    return isinstance(board, np.ndarray)
+
+
+def _shifts(mask):
+    """
+    返回 shifted[d][k]：第 d 个方向上向前错开 k 格后的棋子掩码视图，
+    越界部分视为空。只补零一次，其余都是对同一数组的切片。
+    """
+    n = mask.shape[-1]
+    padded = np.pad(mask, [(0, 0)] * (mask.ndim - 2) + [(_PAD, _PAD), (_PAD, _PAD)])
+    shifted = []
+    for dx, dy in DIRECTIONS:
+        views = []
+        for k in range(_PAD + 1):
+            x0 = _PAD + k * dx
+            y0 = _PAD + k * dy
+            views.append(padded[..., x0 : x0 + n, y0 : y0 + n])
+        shifted.append(views)
+    return shifted
+
+
+def forward_counts(board, player):
+    """
+    返回形如 (..., 4, N, N) 的数组：每颗 player 棋子沿各方向向前连续的己方棋子数（最多 5），
+    即 heuristic_score 中逐格数出的 count；非 player 的格子为 0。
+    """
+    mask = np.asarray(board) == player
+    counts = []
+    for views in _shifts(mask):
+        run = views[0]
+        count = run.astype(np.int8)
+        for k in range(1, _PAD + 1):
+            run = run & views[k]
+            count += run
+        counts.append(count)
+    return np.stack(counts, axis=-3)
+
+
+def pattern_counts(board, player):
+    """统计 player 在四个方向上 count 为 2/3/4/5 的次数，返回 {长度: 数量}"""
+    counts = forward_counts(board, player)
+    return {
+        length: np.count_nonzero(counts == length, axis=(-3, -2, -1))
+        for length in RUN_SCORES
+    }
+
+
+def check_winner(board, player):
+    """检查是否五连珠；批量输入时返回布尔数组"""
+    counts = forward_counts(board, player)
+    return np.any(counts == 5, axis=(-3, -2, -1))
+
+
+def heuristic_score(board, player):
+    """与 gomoku_ai.heuristic_score 等价的向量化评分；批量输入时返回分数数组"""
+    score = 0
+    for length, count in pattern_counts(board, player).items():
+        score = score + RUN_SCORES[length] * count.astype(np.int64)
+    return score
@@ -0,0 +1,308 @@
+"""
+开局库：开局前几手直接查表落子，不再搜索。
+
+局面键为 8 种旋转/翻转下 Zobrist 哈希（含行棋方）的最小值（ZobristHash.canonical），
+对称的局面共用同一条记录；记录中的落子保存在取到最小值的那个变换下，查表时再变换回当前棋盘。
+
+文件格式（小端）：
+    头部  b"GMKB"、版本 u16、最大棋子数 u16、条目数 u32
+    条目  键 u64、x u8、y u8、权重 u16，按键升序排列
+文件通过 mmap 只读映射，查表时在映射上二分查找，启动时不需要读入整个文件。
+
+构建或扩充开局库：
+    python opening_book.py build --games 400 --plies 8
+    python opening_book.py build --records games.txt --extend
+    python opening_book.py show
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+import game_record
+import symmetry
+from zobrist import ZobristHash
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+MAGIC = b"GMKB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+ENTRY = struct.Struct("<QBBH")
+MAX_WEIGHT = 0xFFFF
+
+# 默认收录的局面最多有几颗棋子
+DEFAULT_MAX_STONES = 8
+
+BookMove = namedtuple("BookMove", ["move", "weight"])
+
+
+def stones(board):
+    """棋盘上所有棋子 [(x, y, player), ...]"""
+    return [
+        (x, y, piece)
+        for x, row in enumerate(board)
+        for y, piece in enumerate(row)
+        if piece
+    ]
+
+
+def canonical_key(board, player):
+    """返回 (局面键, 变换下标)：8 种对称变换下轮到 player 走时局面键的最小值，以及对应的变换"""
+    return ZobristHash(board).canonical(player)
+
+
+class OpeningBook:
+    """只读开局库，文件通过 mmap 映射"""
+
+    def __init__(self, path=BOOK_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_stones, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的开局库文件: {path}")
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, index):
+        return struct.unpack_from("<Q", self.data, HEADER.size + index * ENTRY.size)[0]
+
+    def _lower_bound(self, key):
+        """第一个键不小于 key 的条目下标"""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def entries(self):
+        """按顺序返回全部 (键, (x, y), 权重)，用于扩充开局库"""
+        for index in range(self.count):
+            key, x, y, weight = ENTRY.unpack_from(
+                self.data, HEADER.size + index * ENTRY.size
+            )
+            yield key, (x, y), weight
+
+    def moves(self, board, player, zobrist=None):
+        """
+        当前局面的库内落子 [BookMove, ...]（已变换回当前棋盘的坐标），按权重从高到低
+        :param zobrist: 与 board 同步维护的 ZobristHash，省略时根据棋盘现算
+        """
+        if zobrist is not None:
+            key, index = zobrist.canonical(player)
+        else:
+            key, index = canonical_key(board, player)
+        size = len(board)
+        result = []
+        position = self._lower_bound(key)
+        while position < self.count:
+            entry_key, x, y, weight = ENTRY.unpack_from(
+                self.data, HEADER.size + position * ENTRY.size
+            )
+            if entry_key != key:
+                break
+            move = symmetry.from_canonical((x, y), index, size)
+            if board[move[0]][move[1]] == 0:
+                result.append(BookMove(move, weight))
+            position += 1
+        result.sort(key=lambda item: (-item[1], item[0]))
+        return result
+
+    def lookup(self, board, player, stone_count=None, zobrist=None):
+        """查找库内权重最高的一手，不在库中时返回 None"""
+        if stone_count is None:
+            stone_count = len(stones(board))
+        if stone_count > self.max_stones:
+            return None
+        found = self.moves(board, player, zobrist)
+        return found[0].move if found else None
+
+    def close(self):
+        self.data.close()
+
+
+@lru_cache(maxsize=None)
+def load_book(path=BOOK_FILE):
+    """加载开局库（同一文件只映射一次）；文件不存在或无效时返回 None"""
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError):
+        return None
+
+
+def write_book(path, weights, max_stones):
+    """把 {(键, (x, y)): 权重} 写成开局库文件"""
+    rows = sorted(
+        (key, move, min(weight, MAX_WEIGHT)) for (key, move), weight in weights.items()
+    )
+    # 先关闭已映射的旧文件，再写临时文件并替换，写到一半中断也不会损坏原来的开局库
+    book = load_book(path)
+    if book is not None:
+        book.close()
+    load_book.cache_clear()
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, max_stones, len(rows)))
+        for key, (x, y), weight in rows:
+            f.write(ENTRY.pack(key, x, y, weight))
+    os.replace(temp, path)
+
+
+def record_move(weights, board, player, move):
+    """在 weights 中为 (局面, 落子) 加一次权重，落子变换到局面键对应的坐标系"""
+    key, index = canonical_key(board, player)
+    weights[(key, symmetry.to_canonical(move, index, len(board)))] += 1
+
+
+def selfplay_game(task):
+    """
+    在工作进程中生成一局开局：随机一方在已有棋子附近随机落子，另一方由搜索引擎应对，
+    返回引擎每一手的 [(落子前的历史, 落子), ...]
+    """
+    seed, plies, depth = task
+    from game_engine import Game
+    from gomoku_ai import SearchEngine
+
+    rng = random.Random(seed)
+    engine = SearchEngine(time_ms=10**9, max_depth=depth, use_book=False)
+    game = Game(seed=seed, engine=engine)
+    engine_side = rng.choice((1, 2))
+    center = len(game.board) // 2
+    samples = []
+    while not game.ended and len(game.history) < plies:
+        if game.current_player == engine_side:
+            before = [entry["move"] for entry in game.history]
+            result = engine.search(
+                game.board,
+                game.evaluator,
+                game.candidates,
+                game.current_player,
+                game.zobrist,
+                game.shapes,
+            )
+            samples.append((before, result.move))
+            game.place(*result.move)
+        else:
+            cells = game.candidates.moves() or [(center, center)]
+            game.place(*rng.choice(cells))
+    return samples
+
+
+def read_records(path):
+    """
+    读取对局记录：game_record 格式的 .gmk 文件，
+    或每行一局、落子写成以空格分隔的 x,y 的文本文件
+    """
+    if game_record.is_record_file(path):
+        for record in game_record.read_records(path):
+            yield record.moves
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield [tuple(int(v) for v in item.split(",")) for item in line.split()]
+
+
+def add_game(weights, moves, max_stones, size):
+    """把一局的前 max_stones 手逐一记入 weights"""
+    board = [[0] * size for _ in range(size)]
+    player = 1
+    for x, y in moves[:max_stones]:
+        record_move(weights, board, player, (x, y))
+        board[x][y] = player
+        player = 3 - player
+
+
+def build(args):
+    # 只有离线生成开局库时才需要进程池，不让对局与界面的启动为它付出导入时间
+    from concurrent.futures import ProcessPoolExecutor
+
+    from gomoku_ai import GRID_SIZE
+
+    weights = Counter()
+    max_stones = args.plies
+    if args.extend:
+        book = load_book(args.out)
+        if book is not None:
+            for key, move, weight in book.entries():
+                weights[(key, move)] += weight
+            max_stones = max(max_stones, book.max_stones)
+
+    for path in args.records or []:
+        for moves in read_records(path):
+            add_game(weights, moves, args.plies, GRID_SIZE)
+
+    if args.games:
+        tasks = [
+            (args.seed * 1000003 + i, args.plies, args.depth) for i in range(args.games)
+        ]
+        workers = args.workers or os.cpu_count() or 1
+        if workers == 1:
+            results = [selfplay_game(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(selfplay_game, tasks))
+        for samples in results:
+            for before, move in samples:
+                board = [[0] * GRID_SIZE for _ in range(GRID_SIZE)]
+                for i, (x, y) in enumerate(before):
+                    board[x][y] = 1 if i % 2 == 0 else 2
+                record_move(weights, board, 1 if len(before) % 2 == 0 else 2, move)
+
+    write_book(args.out, weights, max_stones)
+    print(f"开局库已写入 {args.out}：{len(weights)} 条，最多 {max_stones} 子")
+
+
+def show(args):
+    book = load_book(args.out)
+    if book is None:
+        print(f"没有可用的开局库: {args.out}")
+        return
+    positions = len({key for key, _, _ in book.entries()})
+    size = os.path.getsize(args.out)
+    print(
+        f"{args.out}：{len(book)} 条，{positions} 个局面，最多 {book.max_stones} 子，{size} 字节"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋开局库")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="由自对弈或对局记录生成/扩充开局库")
+    build_parser.add_argument("--games", type=int, default=0, help="自对弈局数")
+    build_parser.add_argument(
+        "--plies", type=int, default=DEFAULT_MAX_STONES, help="每局收录的前几手"
+    )
+    build_parser.add_argument("--depth", type=int, default=4, help="自对弈的搜索深度")
+    build_parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    build_parser.add_argument("--workers", type=int, default=None, help="进程数")
+    build_parser.add_argument(
+        "--records",
+        nargs="+",
+        help="对局记录文件（.gmk，或每行一局、落子以空格分隔的 x,y 的文本）",
+    )
+    build_parser.add_argument(
+        "--extend", action="store_true", help="在已有开局库的基础上累加"
+    )
+    build_parser.add_argument("--out", default=BOOK_FILE, help="开局库文件")
+    show_parser = sub.add_parser("show", help="显示开局库统计")
+    show_parser.add_argument("--out", default=BOOK_FILE, help="开局库文件")
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        build(args)
+    else:
+        show(args)
+
+
+if __name__ == "__main__":
+    main()
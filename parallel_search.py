@@ -0,0 +1,294 @@
+"""
+多进程并行搜索（根节点分裂），用于 Hard 难度。
+
+Python 线程受 GIL 限制只能用到一个核，因此把根节点的候选点分给一组常驻的搜索进程：
+每一轮迭代加深中，各进程分别搜索分到的候选点，已找到的最好分数（alpha 下界）放在共享内存中，
+其他进程随时读取，用来剪掉明显更差的分支；停止标志也放在共享内存中，stop() 后各进程立即返回。
+每个进程持有自己的 SearchEngine 与置换表，在迭代加深的各轮之间、以及后续几步中复用。
+
+对比同样时间预算下串行与并行搜索达到的深度：
+    python parallel_search.py --workers 16 --time-ms 2000
+"""
+
+import argparse
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+
+from gomoku_ai import (
+    DIFFICULTY_BUDGETS,
+    WIN_SCORE,
+    CandidateGenerator,
+    PatternEvaluator,
+    SearchEngine,
+    SearchTimeout,
+)
+
+
+class _WorkerEngine(SearchEngine):
+    """搜索进程中的引擎：只搜索分到的根节点候选点，同时响应共享的停止标志"""
+
+    def __init__(self, stop_flag, tt_bits):
+        super().__init__(tt_bits=tt_bits, use_threats=False, use_book=False)
+        self.stop_flag = stop_flag
+
+    def _should_stop(self):
+        return (
+            self.stop_flag.value
+            or self.stop_requested
+            or time.perf_counter() > self.deadline
+        )
+
+    def search_moves(self, moves, depth, player, shared_alpha, deadline):
+        """
+        依次搜索根节点的 moves，返回 (是否完成, [(分数, 落子), ...], 统计)。
+        只返回分数超过当时下界的落子（即精确分数）；deadline 为 time.time() 的绝对时间
+        """
+        self.deadline = time.perf_counter() + deadline - time.time()
+        before = (self.nodes, self.scored, self.evaluations, self.tt.hits)
+        results = []
+        complete = True
+        best = -WIN_SCORE - 1
+        try:
+            for x, y in moves:
+                alpha = max(best, shared_alpha.value)
+                score = self._score_move(x, y, depth, alpha, WIN_SCORE + 1, player, 1)
+                if score > alpha:
+                    results.append((score, (x, y)))
+                    best = score
+                    with shared_alpha.get_lock():
+                        if score > shared_alpha.value:
+                            shared_alpha.value = score
+        except SearchTimeout:
+            complete = False
+        after = (self.nodes, self.scored, self.evaluations, self.tt.hits)
+        stats = tuple(a - b for a, b in zip(after, before))
+        return complete, results, stats
+
+
+def _worker_main(conn, shared_alpha, stop_flag, tt_bits):
+    """搜索进程入口：循环接收任务，收到 None 时退出"""
+    engine = _WorkerEngine(stop_flag, tt_bits)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        board, player, depth, moves, max_moves, deadline = task
+        if board is not None:
+            # 新的一次搜索：换上新局面
+            engine._prepare(board, PatternEvaluator(board), CandidateGenerator(board))
+        engine.max_moves = max_moves
+        conn.send(engine.search_moves(moves, depth, player, shared_alpha, deadline))
+
+
+class WorkerPool:
+    """
+    一组常驻的搜索进程，每个进程一条管道；同一时刻只服务一次搜索（lock）。
+    用 spawn 方式启动，界面的工作线程中发起搜索也不会复制 pygame 的状态
+    """
+
+    def __init__(self, workers, tt_bits):
+        context = multiprocessing.get_context("spawn")
+        self.alpha = context.Value("q", 0)
+        self.stop = context.RawValue("b", 0)
+        self.lock = threading.Lock()
+        self.connections = []
+        self.processes = []
+        for _ in range(workers):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child, self.alpha, self.stop, tt_bits),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def __len__(self):
+        return len(self.processes)
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.connections:
+            conn.close()
+
+
+# (进程数, 置换表位数) -> WorkerPool，各局共用，程序退出时关闭
+_pools = {}
+
+
+def get_pool(workers, tt_bits):
+    key = (workers, tt_bits)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = WorkerPool(workers, tt_bits)
+    return pool
+
+
+def _discard_pool(pool):
+    """搜索进程异常退出时丢弃整组进程，下次搜索重新创建"""
+    for key, value in list(_pools.items()):
+        if value is pool:
+            del _pools[key]
+    pool.close()
+
+
+@atexit.register
+def close_pools():
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
+
+
+class ParallelSearchEngine(SearchEngine):
+    """
+    根节点分裂的并行搜索：威胁求解、开局库与迭代加深的框架仍在本进程中运行，
+    每一轮的根节点候选点按顺序轮流分给各搜索进程（最佳候选点总在第一个进程的最前面）。
+    :param workers: 搜索进程数，默认为 CPU 核数
+    """
+
+    def __init__(
+        self,
+        time_ms=1000,
+        max_depth=6,
+        max_moves=12,
+        tt_bits=16,
+        use_threats=True,
+        use_book=True,
+        workers=None,
+    ):
+        super().__init__(time_ms, max_depth, max_moves, tt_bits, use_threats, use_book)
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_bits = tt_bits
+        # 提前启动搜索进程，第一次搜索时不必再等进程导入模块
+        self.pool = get_pool(self.workers, tt_bits)
+        self.active_pool = None
+        self.board_sent = False
+
+    def stop(self):
+        super().stop()
+        pool = self.active_pool
+        if pool is not None:
+            pool.stop.value = 1
+
+    def search(self, board, evaluator, candidates, player, zobrist=None, shapes=None):
+        if self.pool.processes[0].exitcode is not None:
+            _discard_pool(self.pool)
+            self.pool = get_pool(self.workers, self.tt_bits)
+        with self.pool.lock:
+            self.pool.stop.value = 0
+            self.active_pool = self.pool
+            self.board_sent = False
+            try:
+                return super().search(
+                    board, evaluator, candidates, player, zobrist, shapes
+                )
+            finally:
+                self.active_pool = None
+
+    def _search_root(self, moves, depth, player):
+        pool = self.pool
+        count = min(len(pool), len(moves))
+        # 第一轮把局面发给各进程，之后各轮只发深度与候选点
+        board = None if self.board_sent else [row[:] for row in self.board]
+        self.board_sent = True
+        pool.alpha.value = -WIN_SCORE - 1
+        deadline = time.time() + self.deadline - time.perf_counter()
+        for i in range(count):
+            pool.connections[i].send(
+                (board, player, depth, moves[i::count], self.max_moves, deadline)
+            )
+
+        complete = True
+        results = []
+        try:
+            for conn in pool.connections[:count]:
+                done, found, stats = conn.recv()
+                complete = complete and done
+                results += found
+                nodes, scored, evaluations, hits = stats
+                self.nodes += nodes
+                self.scored += scored
+                self.evaluations += evaluations
+                self.tt.hits += hits
+        except (EOFError, OSError):
+            _discard_pool(pool)
+            self.pool = get_pool(self.workers, self.tt_bits)
+            raise SearchTimeout
+        if not complete or not results:
+            raise SearchTimeout
+        # 分数相同时取排序靠前的候选点（被共享下界剪掉的同分候选点不在 results 中）
+        order = {move: i for i, move in enumerate(moves)}
+        score, move = max(results, key=lambda item: (item[0], -order[item[1]]))
+        return score, move
+
+
+def make_engine(difficulty, workers=1):
+    """
+    按难度创建搜索引擎：DIFFICULTY_BUDGETS 中标记了 parallel 的难度在 workers > 1 时
+    使用 ParallelSearchEngine（会启动搜索进程），其余使用串行的 SearchEngine。
+    :param workers: 搜索进程数，默认 1 即不并行；None 为 CPU 核数
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if DIFFICULTY_BUDGETS.get(difficulty, {}).get("parallel") and workers > 1:
+        return ParallelSearchEngine(workers=workers)
+    return SearchEngine()
+
+
+def main(argv=None):
+    from benchmark import POSITIONS, make_position
+
+    parser = argparse.ArgumentParser(
+        description="串行与并行搜索在同样时间预算下的深度对比"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="搜索进程数"
+    )
+    parser.add_argument(
+        "--time-ms", type=int, default=2000, help="每步时间预算（毫秒）"
+    )
+    parser.add_argument("--max-depth", type=int, default=20, help="最大深度")
+    args = parser.parse_args(argv)
+
+    engines = {
+        "串行": SearchEngine(
+            args.time_ms, args.max_depth, use_threats=False, use_book=False
+        ),
+        f"并行x{args.workers}": ParallelSearchEngine(
+            args.time_ms,
+            args.max_depth,
+            use_threats=False,
+            use_book=False,
+            workers=args.workers,
+        ),
+    }
+    # 等搜索进程启动完毕，避免把启动时间算进第一次搜索
+    time.sleep(2)
+    for position, params in POSITIONS.items():
+        board = make_position(*params)
+        for name, engine in engines.items():
+            engine.tt.clear()
+            result = engine.search(
+                board, PatternEvaluator(board), CandidateGenerator(board), 1
+            )
+            print(
+                f"{position:9} {name:8} 深度 {result.depth:2}  节点 {result.nodes:8}"
+                f"  耗时 {result.elapsed * 1000:6.0f}ms  落子 {result.move}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+后台思考（pondering）：轮到玩家时，AI 猜测玩家最可能的几手，在后台线程中预先算好对每一手的应对。
+
+玩家实际的落子在预想之中时直接取出算好的应对，不必再等搜索；不在预想之中时照常搜索，
+此前搜索留在置换表中的结果仍可复用。MCTSEngine 为每一种预想各保留一棵搜索树（见 kept_trees），
+玩家下了其中任何一手，之后的搜索都能接着用对应的树。
+后台计算与正常的 AI 计算共用同一个搜索引擎，因此开始正常计算前必须先 stop()。
+"""
+
+import threading
+import time
+
+# 最多预想玩家的几手（按棋型分值从高到低依次计算，玩家落子或被取消时停止）
+PONDER_REPLIES = 6
+
+
+def predict_replies(game, count=PONDER_REPLIES):
+    """当前玩家最可能的 count 手：按进攻与防守的棋型分值之和从高到低"""
+    score = game.shapes.score
+    player = game.current_player
+    opponent = 3 - player
+    ranked = sorted(
+        (
+            (score(x, y, player) + score(x, y, opponent), (x, y))
+            for x, y in game.candidates.moves()
+        ),
+        key=lambda item: (-item[0], item[1]),
+    )
+    return [move for _, move in ranked[:count]]
+
+
+class Ponderer:
+    """
+    在玩家思考时预先计算 AI 的应对。
+    start(game) 在轮到玩家时调用；玩家落子后用 take(game) 取出预先算好的应对
+    """
+
+    def __init__(self, replies=PONDER_REPLIES):
+        self.replies = replies
+        self.thread = None
+        self.engine = None
+        self.stopped = threading.Event()
+        self.line = None  # 开始预想时的落子顺序
+        self.answers = {}  # 玩家的落子 -> (AI 的应对, 统计)
+
+    def start(self, game):
+        """从 game 的当前局面（轮到玩家）开始后台计算；“测试”难度不搜索，不做预想"""
+        self.stop()
+        self.answers = {}
+        self.line = None
+        if game.ended or game.difficulty == "测试":
+            return
+        self.line = game.moves
+        self.engine = game.engine
+        self.stopped = threading.Event()
+        # 后台线程只在副本上落子，与界面看到的棋盘互不干扰
+        snapshot = game.copy()
+        self.thread = threading.Thread(
+            target=self._run, args=(snapshot, self.stopped, self.answers), daemon=True
+        )
+        self.thread.start()
+
+    def _run(self, snapshot, stopped, answers):
+        for reply in predict_replies(snapshot, self.replies):
+            if stopped.is_set():
+                return
+            snapshot.place(*reply)
+            if not snapshot.ended:
+                start = time.perf_counter()
+                move = snapshot.choose_ai_move()
+                wall_ms = (time.perf_counter() - start) * 1000
+                # 被中途停止的搜索结果不完整，不保留
+                if stopped.is_set():
+                    return
+                stats = dict(snapshot.engine.last_stats)
+                stats.update(source="ponder", wall_ms=wall_ms, copy_ms=0.0)
+                answers[reply] = (move, stats)
+            snapshot.undo()
+            snapshot.redo_stack.clear()
+
+    def stop(self):
+        """停止后台计算并等待线程退出"""
+        thread = self.thread
+        if thread is None:
+            return
+        self.stopped.set()
+        # 搜索开始时会清除停止请求，因此反复请求直到线程退出
+        while thread.is_alive():
+            self.engine.stop()
+            thread.join(0.01)
+        self.thread = None
+
+    def take(self, game):
+        """
+        停止后台计算；game 的最后一手是玩家在预想开始的局面上下的、且已预先算好应对时，
+        返回 (应对, 统计)，否则返回 None
+        """
+        self.stop()
+        answers, line = self.answers, self.line
+        self.answers = {}
+        self.line = None
+        moves = game.moves
+        if line is None or len(moves) != len(line) + 1 or moves[:-1] != line:
+            return None
+        return answers.get(moves[-1])
@@ -0,0 +1,130 @@
+"""
+可选的性能记录：每步 AI 的耗时与搜索统计，以及界面每帧绘制耗时的直方图，可导出为 JSON 或 CSV。
+
+    python games_v1_pve.py --profile trace.json --overlay
+
+JSON 中 "moves" 为每步 AI 的记录，"frames" 为帧耗时的分桶统计与分位数；
+导出 CSV 时每步一行，帧耗时直方图另存为同名的 *_frames.csv。
+"""
+
+import csv
+import json
+import math
+import os
+
+# 帧耗时直方图的分桶上界（毫秒），最后一桶为超过 250ms 的帧
+FRAME_BUCKETS_MS = (1, 2, 4, 8, 16, 33, 50, 100, 250)
+
+# 计算分位数时保留的最近帧数
+RECENT_FRAMES = 1000
+
+# 每步记录的字段（CSV 的列），与 SearchEngine.last_stats 的键一致，另加落子与界面侧的耗时
+MOVE_FIELDS = (
+    "ply",
+    "x",
+    "y",
+    "source",
+    "copy_ms",
+    "wall_ms",
+    "total_ms",
+    "threat_ms",
+    "threat_nodes",
+    "depth",
+    "nodes",
+    "candidates",
+    "heuristic_calls",
+    "tt_hits",
+)
+
+
+def percentile(values, q):
+    """最近秩法分位数，q 取 0~100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Profiler:
+    """收集 AI 每步统计与界面帧耗时"""
+
+    def __init__(self):
+        self.moves = []
+        self.histogram = [0] * (len(FRAME_BUCKETS_MS) + 1)
+        self.frame_count = 0
+        self.recent_frames = []
+
+    def record_move(self, ply, move, stats):
+        """记录一步 AI：ply 为第几手，stats 为 SearchEngine.last_stats 加上界面侧的耗时"""
+        row = {field: stats.get(field) for field in MOVE_FIELDS}
+        row["ply"] = ply
+        row["x"], row["y"] = move if move is not None else (None, None)
+        self.moves.append(row)
+
+    def record_frame(self, seconds):
+        """记录一帧的绘制耗时（秒）"""
+        ms = seconds * 1000
+        bucket = 0
+        while bucket < len(FRAME_BUCKETS_MS) and ms > FRAME_BUCKETS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.frame_count += 1
+        self.recent_frames.append(ms)
+        if len(self.recent_frames) > RECENT_FRAMES:
+            del self.recent_frames[: len(self.recent_frames) - RECENT_FRAMES]
+
+    def frame_summary(self):
+        """帧耗时统计：总帧数、分桶计数与最近帧的分位数"""
+        labels = [f"<={limit}ms" for limit in FRAME_BUCKETS_MS]
+        labels.append(f">{FRAME_BUCKETS_MS[-1]}ms")
+        return {
+            "count": self.frame_count,
+            "histogram": dict(zip(labels, self.histogram)),
+            "p50_ms": percentile(self.recent_frames, 50),
+            "p95_ms": percentile(self.recent_frames, 95),
+            "max_ms": max(self.recent_frames, default=0.0),
+        }
+
+    def overlay_lines(self):
+        """界面叠加层显示的几行文字"""
+        frames = self.frame_summary()
+        lines = [
+            f"帧 p50 {frames['p50_ms']:.1f}ms  p95 {frames['p95_ms']:.1f}ms",
+        ]
+        if self.moves:
+            last = self.moves[-1]
+            lines.append(
+                f"AI {last['wall_ms'] or 0:.0f}ms ({last['source']})  "
+                f"复制 {last['copy_ms'] or 0:.1f}ms"
+            )
+            if last["source"] in ("search", "threat", "book", "ponder"):
+                lines.append(
+                    f"深度 {last['depth']}  节点 {last['nodes']}  "
+                    f"候选 {last['candidates']}"
+                )
+                lines.append(
+                    f"评分调用 {last['heuristic_calls']}  威胁 {last['threat_ms']:.0f}ms"
+                )
+        return lines
+
+    def write(self, path):
+        """导出记录：扩展名为 .csv 时写 CSV，否则写 JSON"""
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=MOVE_FIELDS)
+                writer.writeheader()
+                writer.writerows(self.moves)
+            frames_path = os.path.splitext(path)[0] + "_frames.csv"
+            with open(frames_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["bucket", "frames"])
+                writer.writerows(self.frame_summary()["histogram"].items())
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"moves": self.moves, "frames": self.frame_summary()},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
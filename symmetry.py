@@ -0,0 +1,58 @@
+"""
+棋盘的 8 种对称：4 种旋转及其镜像。
+
+以局面为键的缓存（置换表、威胁求解缓存、开局库）都用“归一化”的局面作键：
+取 8 种变换下局面哈希的最小值（见 zobrist.ZobristHash.canonical），对称的局面共用同一条记录。
+记录里的落子保存在取到最小值的那个变换下，读出时再用逆变换映射回当前棋盘。
+"""
+
+from functools import lru_cache
+
+COUNT = 8
+
+# 每种变换的逆变换在 transforms() 中的下标（旋转 90° 与 270° 互逆，其余都是自身的逆）
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+def transforms(size):
+    """8 种对称变换 (x, y) -> (x', y')，下标 0 为恒等变换"""
+    n = size - 1
+    return (
+        lambda x, y: (x, y),
+        lambda x, y: (y, n - x),
+        lambda x, y: (n - x, n - y),
+        lambda x, y: (n - y, x),
+        lambda x, y: (n - x, y),
+        lambda x, y: (x, n - y),
+        lambda x, y: (y, x),
+        lambda x, y: (n - y, n - x),
+    )
+
+
+@lru_cache(maxsize=None)
+def move_tables(size):
+    """tables[变换][x][y] -> 变换后的 (x, y)，查表代替逐次计算"""
+    return [
+        [[transform(x, y) for y in range(size)] for x in range(size)]
+        for transform in transforms(size)
+    ]
+
+
+def to_canonical(move, index, size):
+    """把当前棋盘上的落子映射到归一化局面的坐标系（index 为 canonical 返回的变换）"""
+    return move_tables(size)[index][move[0]][move[1]]
+
+
+def from_canonical(move, index, size):
+    """把归一化局面坐标系中的落子映射回当前棋盘"""
+    return move_tables(size)[INVERSE[index]][move[0]][move[1]]
+
+
+def line_to_canonical(moves, index, size):
+    table = move_tables(size)[index]
+    return [table[x][y] for x, y in moves]
+
+
+def line_from_canonical(moves, index, size):
+    table = move_tables(size)[INVERSE[index]]
+    return [table[x][y] for x, y in moves]
@@ -0,0 +1,399 @@
+"""
+威胁空间搜索：只用冲四（VCF）或冲四加活三（VCT）连续进攻，寻找强制取胜的落子序列。
+
+- 冲四：落子后在某条线上再下一子即可成五，对方只有唯一的防守点；
+- 活三：落子后在某条线上再下一子即可成活四（两个成五点），对方必须在该线上防守；
+- 防守方在活三面前也可以先冲四反击，本模块把这种应对一并考虑在内。
+
+搜索只在很小的分支内进行，并用局面哈希缓存已求解的结果，适合在常规搜索之前运行。
+"""
+
+import time
+from collections import namedtuple
+
+import symmetry
+from zobrist import ZobristHash
+
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# 求解结果：move 为应下的一手；kind 为结果类型；line 为对应的落子序列（双方交替）
+#   "win"   直接成五
+#   "block" 堵住对方的冲四（必须应对）
+#   "vcf"   连续冲四取胜
+#   "vct"   冲四/活三连续进攻取胜
+#   "defend" 对方有 VCF，下在能化解它的位置
+ThreatResult = namedtuple("ThreatResult", ["move", "kind", "line"])
+
+
+def _run(board, x, y, dx, dy, player, size):
+    """从 (x, y) 沿 (dx, dy) 方向（不含自身）数连续的 player 棋子"""
+    count = 0
+    x += dx
+    y += dy
+    while 0 <= x < size and 0 <= y < size and board[x][y] == player:
+        count += 1
+        x += dx
+        y += dy
+    return count
+
+
+def makes_five(board, x, y, player):
+    """(x, y) 处落下（或已有）player 的棋子时，是否成五"""
+    size = len(board)
+    for dx, dy in DIRECTIONS:
+        if (
+            1
+            + _run(board, x, y, dx, dy, player, size)
+            + _run(board, x, y, -dx, -dy, player, size)
+            >= 5
+        ):
+            return True
+    return False
+
+
+def line_count(board, x, y, dx, dy, player):
+    """经过 (x, y) 的线上、前后各 4 格内（遇到对方棋子或边界为止）player 的棋子数"""
+    size = len(board)
+    count = 0
+    for sign in (1, -1):
+        nx, ny = x + sign * dx, y + sign * dy
+        for _ in range(4):
+            if not (0 <= nx < size and 0 <= ny < size):
+                break
+            cell = board[nx][ny]
+            if cell == player:
+                count += 1
+            elif cell != 0:
+                break
+            nx += sign * dx
+            ny += sign * dy
+    return count
+
+
+def five_points_on_line(board, x, y, dx, dy, player):
+    """经过 (x, y) 的这条线上、距离 4 格以内能让 player 成五的空位"""
+    size = len(board)
+    points = []
+    for k in range(-4, 5):
+        nx, ny = x + k * dx, y + k * dy
+        if not (0 <= nx < size and 0 <= ny < size) or board[nx][ny] != 0:
+            continue
+        if (
+            1
+            + _run(board, nx, ny, dx, dy, player, size)
+            + _run(board, nx, ny, -dx, -dy, player, size)
+            >= 5
+        ):
+            points.append((nx, ny))
+    return points
+
+
+def five_points(board, x, y, player):
+    """(x, y) 处已有 player 的棋子时，经过它的四条线上所有的成五点"""
+    points = set()
+    for dx, dy in DIRECTIONS:
+        points.update(five_points_on_line(board, x, y, dx, dy, player))
+    return points
+
+
+def open_three_defenses(board, x, y, player):
+    """
+    (x, y) 处已有 player 的棋子时，若它在某条线上形成活三，返回该线上的防守点
+    （player 下在这些点能成四的位置）；没有活三时返回空集合。
+    """
+    size = len(board)
+    defenses = set()
+    for dx, dy in DIRECTIONS:
+        # 活三至少需要线上另有两颗己方棋子
+        if line_count(board, x, y, dx, dy, player) < 2:
+            continue
+        four_points = []
+        is_three = False
+        for k in range(-4, 5):
+            nx, ny = x + k * dx, y + k * dy
+            if not (0 <= nx < size and 0 <= ny < size) or board[nx][ny] != 0:
+                continue
+            board[nx][ny] = player
+            points = five_points_on_line(board, nx, ny, dx, dy, player)
+            board[nx][ny] = 0
+            if points:
+                four_points.append((nx, ny))
+                if len(points) >= 2:
+                    is_three = True
+        if is_three:
+            defenses.update(four_points)
+    return defenses
+
+
+def find_five_points(board, player, cells):
+    """在候选空位 cells 中找出 player 能直接成五的点"""
+    return [(x, y) for x, y in cells if makes_five(board, x, y, player)]
+
+
+class SolverBudgetExceeded(Exception):
+    """超出节点或时间预算、或被要求停止时抛出"""
+
+
+class ThreatSolver:
+    """
+    VCF / VCT 求解器。求解过程中直接在棋盘上落子/撤销，结束时棋盘恢复原状。
+    缓存以 (局面哈希, 进攻方, 类型, 剩余深度) 为键，超过上限时整体清空。
+    """
+
+    def __init__(
+        self,
+        max_vcf_depth=10,
+        max_vct_depth=3,
+        max_nodes=20000,
+        time_ms=50,
+        cache_size=100000,
+    ):
+        self.max_vcf_depth = max_vcf_depth
+        self.max_vct_depth = max_vct_depth
+        self.max_nodes = max_nodes
+        self.time_ms = time_ms
+        self.cache_size = cache_size
+        self.cache = {}
+        self.nodes = 0
+
+    # --- 对外接口 ---
+    def solve(self, board, player, candidates, zobrist=None, should_stop=None):
+        """
+        为 player 寻找必须走或必胜的一手，依次检查：
+        直接成五 -> 堵对方的冲四 -> 己方 VCF -> 化解对方 VCF -> 己方 VCT。
+        都没有时返回 None，交给常规评估。
+        :param candidates: 与 board 同步维护的候选点生成器（gomoku_ai.CandidateGenerator）
+        :param zobrist: 与 board 同步维护的 ZobristHash，省略时根据棋盘现算
+        :param should_stop: 每个节点调用一次，返回真值时放弃求解（如搜索被 stop()），返回 None
+        """
+        self.board = board
+        self.candidates = candidates
+        self.zobrist = zobrist if zobrist is not None else ZobristHash(board)
+        self.should_stop = should_stop
+        self.nodes = 0
+        self.deadline = time.perf_counter() + self.time_ms / 1000
+        opponent = 3 - player
+        cells = self._nearby_empty()
+
+        wins = find_five_points(board, player, cells)
+        if wins:
+            return ThreatResult(wins[0], "win", [wins[0]])
+        threats = find_five_points(board, opponent, cells)
+        if threats:
+            return ThreatResult(threats[0], "block", [threats[0]])
+
+        try:
+            line = self._vcf(player, self.max_vcf_depth)
+            if line:
+                return ThreatResult(line[0], "vcf", line)
+            enemy_line = self._vcf(opponent, self.max_vcf_depth)
+            if enemy_line:
+                move = self._find_defense(player, enemy_line)
+                return ThreatResult(move, "defend", enemy_line)
+            for depth in range(1, self.max_vct_depth + 1):
+                line = self._vct(player, depth)
+                if line:
+                    return ThreatResult(line[0], "vct", line)
+        except SolverBudgetExceeded:
+            pass
+        return None
+
+    # --- 内部实现 ---
+    def _nearby_empty(self):
+        """已有棋子附近的空位（按坐标排序，结果可复现）"""
+        return self.candidates.moves()
+
+    def _tick(self):
+        self.nodes += 1
+        if (
+            self.nodes > self.max_nodes
+            or time.perf_counter() > self.deadline
+            or (self.should_stop is not None and self.should_stop())
+        ):
+            raise SolverBudgetExceeded
+
+    def _place(self, x, y, player):
+        self.board[x][y] = player
+        self.candidates.place(x, y)
+        self.zobrist.toggle(x, y, player)
+
+    def _remove(self, x, y, player):
+        self.board[x][y] = 0
+        self.candidates.remove(x, y)
+        self.zobrist.toggle(x, y, player)
+
+    def _cache_key(self, attacker, kind, depth):
+        """缓存以归一化局面为键，对称的局面共用结果；返回 (键, 变换下标)"""
+        canonical, sym = self.zobrist.canonical()
+        return (canonical, attacker, kind, depth), sym
+
+    def _cache_get(self, key, sym):
+        """未缓存时返回 False；缓存的落子序列换算回当前棋盘的坐标"""
+        value = self.cache.get(key, False)
+        if value:
+            return symmetry.line_from_canonical(value, sym, len(self.board))
+        return value
+
+    def _cache_put(self, key, sym, value):
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        if value:
+            value = symmetry.line_to_canonical(value, sym, len(self.board))
+        self.cache[key] = value
+
+    def _four_moves(self, player):
+        """player 所有冲四的落子：[(落子点, 成五点集合)]，双四/活四排在前面"""
+        board = self.board
+        moves = []
+        for x, y in self._nearby_empty():
+            # 冲四至少需要某条线上另有三颗己方棋子
+            if all(
+                line_count(board, x, y, dx, dy, player) < 3 for dx, dy in DIRECTIONS
+            ):
+                continue
+            board[x][y] = player
+            points = five_points(board, x, y, player)
+            board[x][y] = 0
+            if points:
+                moves.append(((x, y), points))
+        moves.sort(key=lambda item: len(item[1]), reverse=True)
+        return moves
+
+    def _vcf(self, attacker, depth):
+        """attacker 先走，只用冲四能否取胜；能则返回落子序列，否则返回 None"""
+        if depth <= 0:
+            return None
+        key, sym = self._cache_key(attacker, "vcf", depth)
+        cached = self._cache_get(key, sym)
+        if cached is not False:
+            return cached
+        self._tick()
+
+        defender = 3 - attacker
+        wins = find_five_points(self.board, attacker, self._nearby_empty())
+        if wins:
+            self._cache_put(key, sym, [wins[0]])
+            return [wins[0]]
+
+        result = None
+        for (x, y), points in self._four_moves(attacker):
+            self._place(x, y, attacker)
+            try:
+                if len(points) >= 2:
+                    # 活四或双四，对方只能堵一个
+                    result = [(x, y)] + [sorted(points)[0]]
+                else:
+                    bx, by = next(iter(points))
+                    self._place(bx, by, defender)
+                    try:
+                        # 防守的一手若同时形成对方的冲四，连续冲四被打断
+                        if not five_points(self.board, bx, by, defender):
+                            rest = self._vcf(attacker, depth - 1)
+                            if rest:
+                                result = [(x, y), (bx, by)] + rest
+                    finally:
+                        self._remove(bx, by, defender)
+            finally:
+                self._remove(x, y, attacker)
+            if result:
+                break
+
+        self._cache_put(key, sym, result)
+        return result
+
+    def _vct(self, attacker, depth):
+        """attacker 先走，用冲四和活三连续进攻能否取胜；能则返回主要变化序列"""
+        if depth <= 0:
+            return None
+        key, sym = self._cache_key(attacker, "vct", depth)
+        cached = self._cache_get(key, sym)
+        if cached is not False:
+            return cached
+        self._tick()
+
+        result = self._vcf(attacker, self.max_vcf_depth)
+        if result is None:
+            for x, y in self._nearby_empty():
+                self._place(x, y, attacker)
+                try:
+                    defenses = open_three_defenses(self.board, x, y, attacker)
+                    if defenses and not five_points(self.board, x, y, attacker):
+                        rest = self._defender_fails(attacker, (x, y), defenses, depth)
+                        if rest is not None:
+                            result = [(x, y)] + rest
+                finally:
+                    self._remove(x, y, attacker)
+                if result:
+                    break
+
+        self._cache_put(key, sym, result)
+        return result
+
+    def _defender_fails(self, attacker, three, defenses, depth):
+        """
+        对方面对 three 处形成的活三时，所有应对（防守点或先冲四）都无法阻止进攻时，
+        返回其中一种应对后的进攻序列，否则返回 None
+        """
+        self._tick()
+        defender = 3 - attacker
+        # 防守方先冲四：进攻方被迫去堵，之后防守方仍需应对活三
+        replies = [(move, "four") for move, _ in self._four_moves(defender)]
+        replies += [(move, "block") for move in sorted(defenses)]
+        line = None
+        for (x, y), kind in replies:
+            if self.board[x][y] != 0:
+                continue
+            self._place(x, y, defender)
+            try:
+                if kind == "four":
+                    points = five_points(self.board, x, y, defender)
+                    if len(points) >= 2 or makes_five(self.board, x, y, defender):
+                        return None
+                    bx, by = next(iter(points))
+                    self._place(bx, by, attacker)
+                    try:
+                        # 冲四的棋子可能顺带破坏了活三，此时进攻方已失去先手
+                        remaining = open_three_defenses(
+                            self.board, three[0], three[1], attacker
+                        )
+                        if not remaining:
+                            return None
+                        rest = self._defender_fails(attacker, three, remaining, depth)
+                    finally:
+                        self._remove(bx, by, attacker)
+                    if rest is None:
+                        return None
+                    rest = [(bx, by)] + rest
+                else:
+                    # 防守的一手若形成对方的冲四，进攻方失去先手
+                    if five_points(self.board, x, y, defender):
+                        return None
+                    rest = self._vct(attacker, depth - 1)
+                    if rest is None:
+                        return None
+            finally:
+                self._remove(x, y, defender)
+            if line is None:
+                line = [(x, y)] + rest
+        return line
+
+    def _find_defense(self, player, enemy_line):
+        """
+        对方有 VCF 时寻找化解它的一手：依次尝试对方序列中的落子点和己方的冲四，
+        选第一个能让对方 VCF 消失的点；都不行时下在对方第一手的位置。
+        """
+        opponent = 3 - player
+        tried = set()
+        options = list(enemy_line) + [move for move, _ in self._four_moves(player)]
+        for x, y in options:
+            if (x, y) in tried or self.board[x][y] != 0:
+                continue
+            tried.add((x, y))
+            self._place(x, y, player)
+            try:
+                refuted = self._vcf(opponent, self.max_vcf_depth) is None
+            finally:
+                self._remove(x, y, player)
+            if refuted:
+                return (x, y)
+        return enemy_line[0]
@@ -0,0 +1,174 @@
+"""
+Zobrist 哈希与定长置换表。
+
+每个 (棋子颜色, x, y) 对应一个固定的 64 位随机数，局面哈希为所有棋子随机数的异或，
+落子与撤销都只需异或一次。置换表按哈希低位分槽，槽数固定，因此内存有上限。
+
+ZobristHash 同时维护棋盘在 8 种对称变换下的哈希：8 个 64 位值拼成一个 512 位整数，
+每格的随机数也预先拼好，落子时仍然只异或一次；canonical() 取其中的最小值作为归一化局面键。
+"""
+
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+import symmetry
+
+# 固定种子，保证同一局面在不同进程、不同次运行中哈希一致
+ZOBRIST_SEED = 20240601
+
+# 置换表中分数的含义
+EXACT = 0  # 精确值
+LOWER = 1  # 下界（发生了 beta 剪枝）
+UPPER = 2  # 上界（所有走法都没有超过 alpha）
+
+# 轮到白棋走时额外异或的随机数，区分同一棋形下不同的行棋方
+SIDE_KEY = random.Random(ZOBRIST_SEED + 1).getrandbits(64)
+
+HASH_BITS = 64
+HASH_MASK = (1 << HASH_BITS) - 1
+
+TTEntry = namedtuple("TTEntry", ["key", "depth", "score", "flag", "move", "age"])
+
+
+@lru_cache(maxsize=None)
+def make_keys(size, seed=ZOBRIST_SEED):
+    """生成 keys[player][x][y]（player 为 1 或 2，keys[0] 不使用），同一参数只生成一次"""
+    rng = random.Random(seed)
+    keys = [None]
+    for _ in range(2):
+        keys.append([[rng.getrandbits(64) for _ in range(size)] for _ in range(size)])
+    return keys
+
+
+def pack_keys(keys):
+    """
+    packed[player][x][y]：把 (x, y) 在 8 种对称变换下对应格子的随机数拼成一个整数，
+    第 t 个 64 位段是变换 t 的局面哈希要异或的值
+    """
+    size = len(keys[1])
+    tables = symmetry.move_tables(size)
+    packed = [None]
+    for player in (1, 2):
+        packed.append(
+            [
+                [
+                    sum(
+                        keys[player][tx][ty] << (HASH_BITS * t)
+                        for t, (tx, ty) in enumerate(table[x][y] for table in tables)
+                    )
+                    for y in range(size)
+                ]
+                for x in range(size)
+            ]
+        )
+    return packed
+
+
+@lru_cache(maxsize=None)
+def default_packed_keys(size):
+    return pack_keys(make_keys(size))
+
+
+class ZobristHash:
+    """增量维护的局面哈希（同时含 8 种对称变换下的哈希），落子和撤销都调用 toggle"""
+
+    def __init__(self, board, keys=None):
+        size = len(board)
+        self.size = size
+        if keys is None:
+            self.keys = make_keys(size)
+            self.packed_keys = default_packed_keys(size)
+        else:
+            self.keys = keys
+            self.packed_keys = pack_keys(keys)
+        self.side_key = SIDE_KEY
+        self.packed = 0
+        for x in range(size):
+            for y in range(size):
+                if board[x][y] != 0:
+                    self.packed ^= self.packed_keys[board[x][y]][x][y]
+
+    @property
+    def value(self):
+        """当前棋盘（恒等变换下）的哈希"""
+        return self.packed & HASH_MASK
+
+    def toggle(self, x, y, player):
+        """在 (x, y) 放上或拿走 player 的棋子"""
+        self.packed ^= self.packed_keys[player][x][y]
+
+    def key(self, player):
+        """轮到 player 走时的局面键"""
+        value = self.packed & HASH_MASK
+        return value ^ self.side_key if player == 2 else value
+
+    def canonical(self, player=1):
+        """
+        返回 (归一化局面键, 变换下标)：8 种对称变换下轮到 player 走时局面键的最小值，
+        以及取到最小值的变换。落子用 symmetry.to_canonical / from_canonical 换算坐标。
+        """
+        side = self.side_key if player == 2 else 0
+        packed = self.packed
+        best = (packed & HASH_MASK) ^ side
+        best_index = 0
+        for index in range(1, symmetry.COUNT):
+            packed >>= HASH_BITS
+            value = (packed & HASH_MASK) ^ side
+            if value < best:
+                best = value
+                best_index = index
+        return best, best_index
+
+
+def canonicalize(moves, size):
+    """
+    把一串落子（黑棋先行）映射到归一化的方向，返回 (变换下标, 变换后的落子列表)；
+    对称的对局得到相同的结果，用 symmetry.line_from_canonical 可以映射回去
+    """
+    board = [[0] * size for _ in range(size)]
+    for i, (x, y) in enumerate(moves):
+        board[x][y] = 1 if i % 2 == 0 else 2
+    _, index = ZobristHash(board).canonical(1 if len(moves) % 2 == 0 else 2)
+    return index, symmetry.line_to_canonical(moves, index, size)
+
+
+class TranspositionTable:
+    """
+    定长置换表：槽位数固定为 2 的幂，按哈希低位寻址。
+    替换策略：空槽、同一局面、上一次搜索留下的旧条目，或新结果搜索深度不低于旧条目时才覆盖。
+    """
+
+    def __init__(self, size_bits=16):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.slots = [None] * self.size
+        self.age = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """开始新一次搜索，之前的条目变为可优先替换"""
+        self.age += 1
+        self.hits = 0
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.age = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """查找局面，命中返回 TTEntry，否则返回 None"""
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = key & self.mask
+        old = self.slots[index]
+        if old is None or old.key == key or old.age != self.age or depth >= old.depth:
+            self.slots[index] = TTEntry(key, depth, score, flag, move, self.age)
+            self.stores += 1